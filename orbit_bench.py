@@ -0,0 +1,742 @@
+#!/usr/bin/env python3
+"""
+ORBIT Benchmarks
+----------------
+Benchmarks for the watchdog's hot paths.
+
+Usage:
+    python orbit_bench.py frontmatter [--repeat N]
+    python orbit_bench.py vault [--sizes 1000,10000] [--output results.json]
+    python orbit_bench.py memory [--sizes 100000,1000000] [--output results.json]
+    python orbit_bench.py replay JOURNAL [--vault SNAPSHOT] [--pace fast] [--output results.json]
+
+The vault suite generates synthetic vaults shaped like orbit_setup output
+(the configured domains, nested projects, .0-inbox folders and notes with
+template frontmatter) in a temporary directory and measures frontmatter
+parse throughput, orbit lookup latency (near misses and misses included),
+event-to-move latency through OrbitEventHandler, and startup time. The
+memory suite builds the daemon's in-memory orbit index for synthetic notes
+(without writing files) and reports bytes per note. The replay suite feeds
+an event journal recorded by the watchdog (--record) through the event
+pipeline against a copy of a vault snapshot, or an empty synthetic vault,
+and reports event-to-processed latency and throughput; notes it creates get
+frontmatter that files them where the recorded daemon did. Results are
+written as JSON so runs can be compared between commits.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import shutil
+import logging
+import platform
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+from functools import partial
+from pathlib import Path
+import yaml
+
+import orbit_config
+from orbit_config import config
+from orbit_events import CREATED, DELETED, MODIFIED, MOVED
+from orbit_frontmatter import read_frontmatter
+from orbit_recorder import read_events
+
+TEMPLATE_FRONTMATTER = """---
+object: note
+created: 2025-04-25
+domain: 1-Self
+orbits: ["Project Alpha"]
+stage: 0
+track_number: 7
+---
+"""
+
+COMPLEX_FRONTMATTER = """---
+object: note
+created: 2025-04-25
+domain: 1-Self
+orbits:
+  - "[[Project Alpha]]"
+  - Project Beta
+aliases: &names [alpha, beta]
+summary: >
+  A folded block scalar that needs the full YAML loader.
+stage: 0
+---
+"""
+
+BODY_SIZES = {
+    "1KB": 1024,
+    "100KB": 100 * 1024,
+    "4MB": 4 * 1024 * 1024,
+}
+
+
+def legacy_parse_frontmatter(file_path):
+    """The original whole-file read + DOTALL regex + yaml.safe_load implementation"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    frontmatter_match = re.match(r'^---\s*\n(.*?)\n---\s*\n', content, re.DOTALL)
+    if not frontmatter_match:
+        return None
+    return yaml.safe_load(frontmatter_match.group(1))
+
+
+def write_note(directory, name, frontmatter, body_size):
+    """Write a note with the given frontmatter and a body of roughly body_size bytes"""
+    line = "Lorem ipsum dolor sit amet, consectetur adipiscing elit.\n"
+    path = os.path.join(directory, f"{name}.md")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(frontmatter)
+        f.write(line * max(1, body_size // len(line)))
+    return path
+
+
+def time_per_call(func, path, repeat):
+    """Return the mean seconds per call of func(path)"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(path)
+    return (time.perf_counter() - start) / repeat
+
+
+def bench_frontmatter(args):
+    """Compare the bounded reader against the legacy whole-file parser"""
+    print(f"{'case':<24}{'legacy (us)':>14}{'bounded (us)':>14}{'speedup':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for kind, frontmatter in (("template", TEMPLATE_FRONTMATTER), ("complex", COMPLEX_FRONTMATTER)):
+            for size_name, size in BODY_SIZES.items():
+                path = write_note(directory, f"{kind}-{size_name}", frontmatter, size)
+                assert legacy_parse_frontmatter(path) == read_frontmatter(path)
+
+                # Large bodies are slow on the legacy path; keep total time bounded
+                repeat = args.repeat if size < 1024 * 1024 else max(1, args.repeat // 100)
+                legacy = time_per_call(legacy_parse_frontmatter, path, repeat)
+                bounded = time_per_call(read_frontmatter, path, repeat)
+                print(
+                    f"{kind + ' / ' + size_name:<24}"
+                    f"{legacy * 1e6:>14.1f}{bounded * 1e6:>14.1f}{legacy / bounded:>9.1f}x"
+                )
+
+
+WORDS = [
+    "alpha", "atlas", "beacon", "cedar", "compass", "delta", "ember", "falcon",
+    "garden", "harbor", "horizon", "island", "juniper", "kernel", "lantern",
+    "meadow", "nebula", "orchid", "pioneer", "quartz", "river", "summit",
+    "tundra", "umbra", "vertex", "willow", "zenith", "journal", "reading",
+    "habit", "research", "draft", "review", "sketch", "recipe", "workout",
+]
+
+
+def use_vault(vault_path):
+    """Point the ORBIT configuration at a different vault"""
+    orbit_config.VAULT_PATH = str(vault_path)
+    config["vault_path"] = str(vault_path)
+
+
+def note_body(rng):
+    """A markdown body of a few hundred bytes to a few kilobytes"""
+    paragraph = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * rng.randint(2, 8)
+    return "\n\n".join(paragraph for _ in range(rng.randint(1, 10)))
+
+
+def write_text(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def generate_vault(root, notes, seed=0):
+    """Create a synthetic vault with roughly the given number of notes
+
+    Returns a dict describing what was generated: the project names and the
+    (name, directory) of each project, for use in lookup benchmarks.
+    """
+    rng = random.Random(seed)
+    root = Path(root)
+    inbox = config["hidden_inbox"]
+    created = "2025-04-25"
+
+    domains = []
+    for domain_num, domain_name in config["domains"].items():
+        domain_dir = root / f"{domain_num}-{domain_name}"
+        (domain_dir / inbox).mkdir(parents=True, exist_ok=True)
+        write_text(
+            domain_dir / f"{domain_name}.md",
+            f"---\nobject: domain\ncreated: {created}\ndomain: {domain_name}\ntrack_number: 7\n---\n\n"
+            f"# {domain_name} Dashboard\n",
+        )
+        domains.append(domain_dir)
+
+    # Roughly one project per 50 notes, some nested inside other projects
+    projects = []
+    for i in range(max(len(domains), notes // 50)):
+        if projects and rng.random() < 0.3:
+            parent_dir = rng.choice(projects)[1]
+        else:
+            parent_dir = domains[i % len(domains)]
+        name = f"{rng.choice(WORDS)}-{rng.choice(WORDS)}-{i}"
+        project_dir = parent_dir / name
+        (project_dir / inbox).mkdir(parents=True)
+        write_text(
+            project_dir / f"{name}.md",
+            f"---\nobject: project\ncreated: {created}\nsatellites: []\n"
+            f"domain: {parent_dir.name}\norbits: []\nstage: 1\n---\n\n# {name} Project\n",
+        )
+        write_text(project_dir / config["hidden_index"], "---\nobject: index\n---\n")
+        projects.append((name, project_dir))
+
+    # Notes are generated already filed: stage 0 in the inbox, stage 1 next
+    # to the project note, sources in the source folder
+    for i in range(max(0, notes - len(projects) - len(domains))):
+        name, project_dir = rng.choice(projects)
+        title = f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {i}"
+        roll = rng.random()
+        if roll < 0.7:
+            object_type, stage, directory = "note", 0, project_dir / inbox
+        elif roll < 0.9:
+            object_type, stage, directory = "note", 1, project_dir
+        else:
+            object_type, stage, directory = "source", 1, project_dir / config["source_dir_name"]
+            directory.mkdir(exist_ok=True)
+        write_text(
+            directory / f"{title}.md",
+            f"---\nobject: {object_type}\ncreated: {created}\ndomain: {project_dir.parts[len(root.parts)]}\n"
+            f'orbits: ["{name}"]\nstage: {stage}\n---\n\n# {title}\n\n{note_body(rng)}\n',
+        )
+
+    return {"projects": projects}
+
+
+def percentiles(samples, scale=1.0):
+    """Summarize latency samples as p50/p90/p99/max, multiplied by scale"""
+    ordered = sorted(samples)
+    if not ordered:
+        return {}
+
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * scale, 3)
+
+    return {"p50": pick(0.5), "p90": pick(0.9), "p99": pick(0.99), "max": round(ordered[-1] * scale, 3)}
+
+
+def measure_parse(vault_path, sample):
+    """Frontmatter parse throughput of the bounded reader and the legacy parser"""
+    paths = [
+        os.path.join(root, file)
+        for root, _, files in os.walk(vault_path)
+        for file in files if file.endswith('.md')
+    ][:sample]
+    results = {"notes": len(paths)}
+    for label, func in (("notes_per_s", read_frontmatter), ("legacy_notes_per_s", legacy_parse_frontmatter)):
+        start = time.perf_counter()
+        for path in paths:
+            func(path)
+        results[label] = round(len(paths) / (time.perf_counter() - start), 1)
+    return results
+
+
+def measure_lookups(handler, projects, sample, seed=0):
+    """Orbit lookup latency (microseconds) by kind of name
+
+    Exact, prefix and substring names go through find_orbit_path. Mistyped
+    names (near_miss) and names nothing resembles (miss) go through the
+    fuzzy match behind the "did you mean" suggestions and queries.
+    """
+    rng = random.Random(seed)
+    names = [name for name, _ in rng.sample(projects, min(sample, len(projects)))]
+    queries = {
+        "exact": names,
+        "prefix": [name.rsplit("-", 1)[0] for name in names],
+        "substring": [name[2:-1] for name in names],
+        "near_miss": [name[:3] + name[4:] for name in names],
+        "miss": [f"zq{rng.choice(WORDS)}x{i}vk" for i in range(len(names))],
+    }
+    results = {}
+    for kind, batch in queries.items():
+        if kind in ("near_miss", "miss"):
+            lookup = partial(handler.orbit_index.match, fuzzy=True)
+        else:
+            lookup = handler.find_orbit_path
+        samples = []
+        found = 0
+        for query in batch:
+            start = time.perf_counter()
+            found += lookup(query) is not None
+            samples.append(time.perf_counter() - start)
+        results[kind] = dict(percentiles(samples, 1e6), found=found)
+    return results
+
+
+def measure_events(watchdog_module, handler, projects, count, settle_time, seed=0):
+    """Latency from writing a misfiled note to the daemon having moved it (milliseconds)"""
+    from watchdog.observers import Observer
+
+    rng = random.Random(seed)
+    written = {}
+    moved = {}
+    original_move = handler.move_file
+
+    def timed_move(source, destination):
+        result = original_move(source, destination)
+        if result:
+            moved[str(source)] = time.perf_counter()
+        return result
+
+    handler.move_file = timed_move
+    scheduler = watchdog_module.SettleScheduler(handler.process_change, settle_time, config["worker_count"])
+    event_handler = watchdog_module.OrbitEventHandler(handler, scheduler)
+    observer = Observer()
+
+    start = time.perf_counter()
+    observer.schedule(event_handler, path=config["vault_path"], recursive=True)
+    scheduler.start()
+    observer.start()
+    observer_start = time.perf_counter() - start
+
+    try:
+        domain_dir = Path(config["vault_path"]) / f"{next(iter(config['domains']))}-{next(iter(config['domains'].values()))}"
+        for i in range(count):
+            name = rng.choice(projects)[0]
+            path = domain_dir / f"bench event {i}.md"
+            written[str(path)] = time.perf_counter()
+            write_text(path, f'---\nobject: note\norbits: ["{name}"]\nstage: 0\n---\n\nbody\n')
+
+        deadline = time.perf_counter() + settle_time + 30
+        while len(moved) < count and time.perf_counter() < deadline:
+            time.sleep(0.01)
+    finally:
+        observer.stop()
+        observer.join()
+        scheduler.stop()
+        handler.move_file = original_move
+
+    samples = [moved[path] - written[path] for path in written if path in moved]
+    return {
+        "events": count,
+        "moved": len(samples),
+        "settle_time_s": settle_time,
+        "observer_start_s": round(observer_start, 3),
+        "latency_ms": percentiles(samples, 1e3),
+    }
+
+
+def bench_vault_size(notes, args):
+    """Run the vault suite against one synthetic vault size"""
+    import orbit_watchdog
+
+    result = {"notes": notes}
+    with tempfile.TemporaryDirectory() as vault_path:
+        start = time.perf_counter()
+        generated = generate_vault(vault_path, notes, args.seed)
+        result["generate_s"] = round(time.perf_counter() - start, 3)
+        use_vault(vault_path)
+
+        # Cold start: empty persistent index, every note is parsed
+        start = time.perf_counter()
+        handler = orbit_watchdog.OrbitFileHandler()
+        result["index_build_s"] = round(time.perf_counter() - start, 3)
+        handler.catch_up()
+        result["startup_cold_s"] = round(time.perf_counter() - start, 3)
+        handler.store.close()
+        handler.journal.close()
+
+        # Warm start: the persistent index is up to date
+        start = time.perf_counter()
+        handler = orbit_watchdog.OrbitFileHandler()
+        handler.catch_up()
+        result["startup_warm_s"] = round(time.perf_counter() - start, 3)
+
+        result["parse"] = measure_parse(vault_path, args.parse_sample)
+        result["find_orbit_path_us"] = measure_lookups(handler, generated["projects"], args.lookup_sample, args.seed)
+        result["event_to_move"] = measure_events(
+            orbit_watchdog, handler, generated["projects"], args.events, args.settle_time, args.seed
+        )
+        handler.store.close()
+        handler.journal.close()
+    return result
+
+
+def synthetic_notes(root, count, seed=0):
+    """Yield (path, frontmatter) for notes shaped like generate_vault's, without writing them"""
+    rng = random.Random(seed)
+    inbox = config["hidden_inbox"]
+    domains = [os.path.join(root, f"{num}-{name}") for num, name in config["domains"].items()]
+    projects = []
+    for i in range(max(len(domains), count // 50)):
+        if projects and rng.random() < 0.3:
+            parent_dir = rng.choice(projects)[1]
+        else:
+            parent_dir = domains[i % len(domains)]
+        name = f"{rng.choice(WORDS)}-{rng.choice(WORDS)}-{i}"
+        projects.append((name, os.path.join(parent_dir, name)))
+        yield os.path.join(parent_dir, name, f"{name}.md"), {
+            "object": "project", "created": "2025-04-25",
+            "domain": os.path.basename(parent_dir), "orbits": [], "stage": 1,
+        }
+    for i in range(max(0, count - len(projects))):
+        name, project_dir = rng.choice(projects)
+        roll = rng.random()
+        if roll < 0.7:
+            object_type, stage, directory = "note", 0, os.path.join(project_dir, inbox)
+        elif roll < 0.9:
+            object_type, stage, directory = "note", 1, project_dir
+        else:
+            object_type, stage, directory = "source", 1, os.path.join(project_dir, config["source_dir_name"])
+        # Built from fresh strings, the way parsed YAML would be
+        yield os.path.join(directory, f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {i}.md"), {
+            "object": f"{object_type}", "created": "2025-04-25",
+            "domain": f"{os.path.relpath(project_dir, root).split(os.sep)[0]}",
+            "orbits": [f"{name}"], "stage": stage,
+        }
+
+
+def traced_bytes(build):
+    """Bytes still allocated after build() returns, with its result kept alive"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        allocated = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del result
+    return allocated
+
+
+def bench_memory_size(notes, args):
+    """Bytes per note of a dict per note against the orbit index"""
+    import orbit_index
+
+    root = os.path.join(tempfile.gettempdir(), "orbit-bench-vault")
+
+    def dicts():
+        return {
+            path: {key: frontmatter.get(key) for key in ("object", "domain", "orbits", "stage")}
+            for path, frontmatter in synthetic_notes(root, notes, args.seed)
+        }
+
+    def index():
+        built = orbit_index.OrbitIndex(root)
+        built.build(path for path, _ in synthetic_notes(root, notes, args.seed))
+        return built
+
+    result = {"notes": notes}
+    for label, build in (("dict_per_note", dicts), ("orbit_index", index)):
+        start = time.perf_counter()
+        allocated = traced_bytes(build)
+        result[label] = {
+            "bytes_per_note": round(allocated / notes, 1),
+            "total_mb": round(allocated / 2 ** 20, 1),
+            "build_s": round(time.perf_counter() - start, 2),
+        }
+    return result
+
+
+def bench_memory(args):
+    """Run the memory suite for each requested size and write JSON results"""
+    report = new_report()
+    for notes in args.sizes:
+        print(f"Measuring note structures for {notes} synthetic notes...", file=sys.stderr)
+        report["results"].append(bench_memory_size(notes, args))
+    write_report(report, args.output)
+
+
+def filed_as(recorded):
+    """Guess the frontmatter of recorded notes from where the daemon filed them
+
+    The journal holds no note content, but an echo move shows where the
+    recorded daemon put a note: an inbox means stage 0 of the project above
+    it, a source directory a source of that project, any other directory
+    stage 1 of the project it is named after.
+    """
+    frontmatter = {}
+    for _, kind, is_dir, echo, _, src, dest in recorded:
+        if kind != MOVED or not echo or is_dir or src in frontmatter:
+            continue
+        directory = os.path.dirname(dest)
+        name = os.path.basename(directory)
+        if name == config["hidden_inbox"]:
+            frontmatter[src] = ("note", os.path.basename(os.path.dirname(directory)), 0)
+        elif name == config["source_dir_name"]:
+            frontmatter[src] = ("source", os.path.basename(os.path.dirname(directory)), 1)
+        else:
+            frontmatter[src] = ("note", name, 1)
+    return frontmatter
+
+
+def synthetic_note(size, filed=None):
+    """Note text of roughly size bytes, for files a replayed journal creates"""
+    object_type, orbit, stage = filed or ("note", None, 0)
+    orbits = f'orbits: ["{orbit}"]\n' if orbit else ""
+    text = f"---\nobject: {object_type}\n{orbits}stage: {stage}\n---\n\n"
+    return text + "x" * max(0, size - len(text) - 1) + "\n"
+
+
+def apply_event(vault_path, kind, is_dir, size, src, dest, filed=None):
+    """Make a recorded event's change to the replay vault; returns the watchdog event to dispatch
+
+    Returns None when the change no longer applies (e.g. the replayed daemon
+    already moved the file), so the event is skipped.
+    """
+    from watchdog import events
+
+    path = os.path.join(vault_path, src)
+    if kind == CREATED:
+        if is_dir:
+            os.makedirs(path, exist_ok=True)
+            return events.DirCreatedEvent(path)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_text(path, synthetic_note(size, filed))
+        return events.FileCreatedEvent(path)
+    if kind == MODIFIED:
+        if is_dir:
+            return events.DirModifiedEvent(path) if os.path.isdir(path) else None
+        if not os.path.isfile(path):
+            return None
+        grow = size - os.path.getsize(path)
+        if grow > 0:
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write("x" * grow)
+        else:
+            os.utime(path)
+        return events.FileModifiedEvent(path)
+    if kind == DELETED:
+        if not os.path.lexists(path):
+            return None
+        if is_dir:
+            shutil.rmtree(path)
+            return events.DirDeletedEvent(path)
+        os.remove(path)
+        return events.FileDeletedEvent(path)
+    dest_path = os.path.join(vault_path, dest)
+    if not os.path.lexists(path) or os.path.lexists(dest_path):
+        return None
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    os.rename(path, dest_path)
+    if is_dir:
+        return events.DirMovedEvent(path, dest_path)
+    return events.FileMovedEvent(path, dest_path)
+
+
+def replay_journal(vault_path, recorded, args):
+    """Replay recorded events into a watchdog for vault_path; returns the measurements"""
+    import orbit_watchdog
+    from orbit_events import FairPool
+
+    vault_settings = orbit_config.vault_config(
+        vault_path, "replay", settle_time=args.settle_time, record_events=False
+    )
+    pool = FairPool(config["worker_count"])
+    start = time.perf_counter()
+    vault = orbit_watchdog.WatchedVault(vault_settings, pool)
+    vault.start()
+    startup = time.perf_counter() - start
+
+    # Latency runs from a path's latest event to the end of its processing
+    dispatched = {}
+    latencies = []
+    process_change = vault.handler.process_change
+    process_batch = vault.handler.process_batch
+
+    def processed(path):
+        started = dispatched.pop(path, None)
+        if started is not None:
+            latencies.append(time.perf_counter() - started)
+
+    def timed_change(path):
+        try:
+            return process_change(path)
+        finally:
+            processed(path)
+
+    def timed_batch(paths):
+        try:
+            return process_batch(paths)
+        finally:
+            for path in paths:
+                processed(path)
+
+    vault.scheduler.process = timed_change
+    vault.gate.flush = timed_batch
+    pool.start()
+
+    filed = filed_as(recorded)
+    counts = {"dispatched": 0, "skipped": 0, "echoes_skipped": 0}
+    start = time.perf_counter()
+    try:
+        for seconds, kind, is_dir, echo, size, src, dest in recorded:
+            if echo:
+                # The replayed daemon makes (and suppresses) its own moves
+                counts["echoes_skipped"] += 1
+                continue
+            if args.pace == "original":
+                delay = start + seconds / args.speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            event = apply_event(vault_path, kind, is_dir, size, src, dest, filed.get(src))
+            if event is None:
+                counts["skipped"] += 1
+                continue
+            dispatched[os.path.abspath(event.dest_path if kind == MOVED else event.src_path)] = time.perf_counter()
+            vault.event_handler.dispatch(event)
+            counts["dispatched"] += 1
+        fed = time.perf_counter() - start
+
+        deadline = time.perf_counter() + args.settle_time + args.drain_timeout
+        while time.perf_counter() < deadline and (
+            vault.scheduler.pending() or vault.scheduler.backlog() or vault.gate.stats()["pending"]
+        ):
+            time.sleep(0.01)
+    finally:
+        vault.stop_intake()
+        pool.stop()
+        elapsed = time.perf_counter() - start
+        vault.close()
+
+    snapshot = vault.handler.stats.snapshot()
+    return dict(counts, **{
+        "startup_s": round(startup, 3),
+        "feed_s": round(fed, 3),
+        "replay_s": round(elapsed, 3),
+        "events_per_s": round(counts["dispatched"] / fed, 1) if fed else None,
+        "processed": len(latencies),
+        "processed_per_s": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "latency_ms": percentiles(latencies, 1e3),
+        "stage_mean_ms": {name: timing["mean_ms"] for name, timing in snapshot["timings"].items()},
+        "counters": snapshot["counters"],
+        "backpressure": {key: value for key, value in snapshot["gauges"].items() if key.startswith("backpressure_")},
+    })
+
+
+def bench_replay(args):
+    """Replay a recorded event journal against a copy of a vault and write JSON results"""
+    logging.getLogger().setLevel(getattr(logging, args.log_level))
+    logging.getLogger("orbit_watchdog").setLevel(getattr(logging, args.log_level))
+
+    header, recorded = read_events(args.journal)
+    report = new_report()
+    with tempfile.TemporaryDirectory() as root:
+        vault_path = os.path.join(root, "vault")
+        if args.vault:
+            # The daemon's state is rebuilt, so the replay starts from a cold index
+            shutil.copytree(args.vault, vault_path, ignore=shutil.ignore_patterns(".orbit"))
+        else:
+            os.makedirs(vault_path)
+        print(f"Replaying {len(recorded)} events from {args.journal}...", file=sys.stderr)
+        result = {
+            "journal": os.path.abspath(args.journal),
+            "recorded_vault": header.get("vault"),
+            "snapshot": os.path.abspath(args.vault) if args.vault else None,
+            "pace": args.pace,
+            "speed": args.speed if args.pace == "original" else None,
+            "settle_time_s": args.settle_time,
+            "events": len(recorded),
+            "recorded_s": round(recorded[-1][0], 3) if recorded else 0,
+        }
+        result.update(replay_journal(vault_path, recorded, args))
+        report["results"].append(result)
+    write_report(report, args.output)
+
+
+def git_commit():
+    """The current commit of this checkout, if available"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def new_report():
+    """An empty result report tagged with the commit and environment"""
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": [],
+    }
+
+
+def write_report(report, output=None):
+    """Print a report as JSON, also writing it to output if given"""
+    text = json.dumps(report, indent=2)
+    if output:
+        Path(output).write_text(text + "\n")
+    print(text)
+
+
+def bench_vault(args):
+    """Run the synthetic vault suite for each requested size and write JSON results"""
+    logging.getLogger().setLevel(getattr(logging, args.log_level))
+    logging.getLogger("orbit_watchdog").setLevel(getattr(logging, args.log_level))
+
+    report = new_report()
+    for notes in args.sizes:
+        print(f"Benchmarking synthetic vault with {notes} notes...", file=sys.stderr)
+        report["results"].append(bench_vault_size(notes, args))
+    write_report(report, args.output)
+
+
+def main():
+    """Run the selected benchmark"""
+    parser = argparse.ArgumentParser(description="ORBIT benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    frontmatter = subparsers.add_parser("frontmatter", help="frontmatter reader throughput")
+    frontmatter.add_argument("--repeat", type=int, default=2000)
+    frontmatter.set_defaults(func=bench_frontmatter)
+
+    vault = subparsers.add_parser("vault", help="synthetic vault suite for the watchdog hot paths")
+    vault.add_argument(
+        "--sizes", type=lambda text: [int(size) for size in text.split(",")], default=[1000, 10000],
+        help="comma-separated note counts, e.g. 1000,10000,100000,500000"
+    )
+    vault.add_argument("--output", help="also write the JSON results to this file")
+    vault.add_argument("--seed", type=int, default=0)
+    vault.add_argument("--parse-sample", type=int, default=5000, help="notes parsed for throughput")
+    vault.add_argument("--lookup-sample", type=int, default=500, help="orbit names looked up per kind")
+    vault.add_argument("--events", type=int, default=200, help="notes written for the event benchmark")
+    vault.add_argument("--settle-time", type=float, default=config["settle_time"])
+    vault.add_argument("--log-level", default="WARNING", help="log level while benchmarking")
+    vault.set_defaults(func=bench_vault)
+
+    memory = subparsers.add_parser("memory", help="bytes per note of the in-memory orbit index")
+    memory.add_argument(
+        "--sizes", type=lambda text: [int(size) for size in text.split(",")], default=[100000, 1000000],
+        help="comma-separated note counts"
+    )
+    memory.add_argument("--output", help="also write the JSON results to this file")
+    memory.add_argument("--seed", type=int, default=0)
+    memory.set_defaults(func=bench_memory)
+
+    replay = subparsers.add_parser("replay", help="replay a recorded event journal through the watchdog")
+    replay.add_argument("journal", help="event journal written with orbit_watchdog.py --record")
+    replay.add_argument("--vault", help="vault snapshot to replay against (copied first); default an empty vault")
+    replay.add_argument(
+        "--pace", choices=("original", "fast"), default="original",
+        help="keep the recorded timing, or dispatch every event as fast as possible"
+    )
+    replay.add_argument("--speed", type=float, default=1.0, help="with --pace original, replay this many times faster")
+    replay.add_argument("--settle-time", type=float, default=config["settle_time"])
+    replay.add_argument("--drain-timeout", type=float, default=60, help="seconds to wait for processing to finish")
+    replay.add_argument("--output", help="also write the JSON results to this file")
+    replay.add_argument("--log-level", default="WARNING", help="log level while replaying")
+    replay.set_defaults(func=bench_replay)
+
+    args = parser.parse_args()
+    args.func(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
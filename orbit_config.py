@@ -1,10 +1,30 @@
 # ORBIT System Configuration
 
+import os
 from pathlib import Path
 
 # Path to your Obsidian vault - UPDATED PATH
 VAULT_PATH = "/Users/austinavent/Nextcloud/Obsidian/Ventura_Orbit"
 
+# Several vaults in one watchdog: a YAML file listing the vaults to watch, e.g.
+#   vaults:
+#     - path: /Users/me/Notes/Work
+#       name: work
+#       settle_time: 1
+# Entries may override any of the VAULT_SETTINGS below. None watches VAULT_PATH alone
+VAULTS_FILE = None
+
+# Settings a vault in VAULTS_FILE may override; the rest are shared by every vault
+VAULT_SETTINGS = (
+    "fuzzy_orbit_match", "fuzzy_match_ratio", "stage_dirs", "source_dir_name",
+    "parse_cache_size", "journal_max_bytes", "debounce_time", "settle_time",
+    "coalesce_ttl", "coalesce_max_entries", "batch_enter_rate", "batch_exit_rate",
+    "batch_quiet_time", "batch_max_wait", "use_polling", "poll_min_interval",
+    "poll_max_interval", "poll_full_scan_every", "reconcile_chunk_size",
+    "materialized_views", "view_settle_time", "view_recent_limit",
+    "maintain_satellites", "stats_interval", "record_events",
+)
+
 # Domain folders (core organizational structure)
 DOMAINS = {
     "0": "Origins",
@@ -23,6 +43,13 @@ DOMAINS = {
 # Project numbering increment
 PROJECT_INCREMENT = 10
 
+# Orbit name matching: when no note contains the orbit name, queries fall back
+# to the closest note name differing by at most this fraction of its
+# characters. Notes are never filed by such a near miss; it is only suggested
+# in the warning.
+FUZZY_ORBIT_MATCH = True
+FUZZY_MATCH_RATIO = 0.25
+
 # Reserved satellite numbers
 INBOX_NUMBER = "0"
 SOURCE_NUMBER = "source"  # Special folder for source materials
@@ -36,12 +63,79 @@ HIDDEN_INBOX = ".0-inbox"
 # Hidden index file name
 HIDDEN_INDEX = ".index.md"
 
+# Frontmatter reading: give up if the closing --- isn't found within this many bytes
+FRONTMATTER_MAX_BYTES = 64 * 1024
+
+# Number of parsed frontmatter blocks kept in memory
+PARSE_CACHE_SIZE = 4096
+
+# Persistent vault index (stored in the vault's .orbit directory)
+INDEX_DB_NAME = "index.sqlite3"
+
+# Write-ahead journal of moves (in .orbit), replayed on startup after a crash
+JOURNAL_NAME = "moves.journal"
+JOURNAL_MAX_BYTES = 1024 * 1024  # truncate once this large and no move is in flight
+
+# Manifest of the files orbit_setup.py generated (in .orbit), with their content hashes
+SETUP_MANIFEST_NAME = "setup-manifest.json"
+
 # Log settings
 LOG_LEVEL = "INFO"
 LOG_FILE = "orbit_manager.log"
+LOG_FORMAT = "text"  # "text" or "json" (one JSON object per line, with event IDs and stage timings)
+LOG_MAX_BYTES = 10 * 1024 * 1024  # rotate the log file at this size
+LOG_BACKUP_COUNT = 5  # rotated log files to keep
+LOG_RATE_LIMIT = 10  # INFO lines per file per LOG_RATE_PERIOD; warnings and errors are never limited
+LOG_RATE_PERIOD = 60  # seconds
 
 # File watching settings
 DEBOUNCE_TIME = 1  # seconds
+SETTLE_TIME = 0.5  # seconds a file must be quiet before it is processed
+COALESCE_TTL = 300  # seconds before an unprocessed pending change is dropped
+COALESCE_MAX_ENTRIES = 10000  # cap on paths tracked by the event coalescer
+WORKER_COUNT = 4  # threads that parse and move notes concurrently (shared by all vaults)
+
+# Backpressure: above this event rate, changes are gathered and handled as one batch
+BATCH_ENTER_RATE = 200  # events per second that switch to batch mode
+BATCH_EXIT_RATE = 20  # events per second below which the storm counts as over
+BATCH_QUIET_TIME = 2  # seconds below BATCH_EXIT_RATE before the batch is processed
+BATCH_MAX_WAIT = 30  # seconds a batch may gather during a long storm before it is processed anyway
+
+# Polling mode, for synced or network vaults where native events are unreliable
+USE_POLLING = False  # also enabled with --poll
+POLL_MIN_INTERVAL = 1  # seconds between polls while the vault is changing
+POLL_MAX_INTERVAL = 15  # seconds between polls once it has been quiet for a while
+POLL_FULL_SCAN_EVERY = 10  # every Nth poll re-lists every directory, changed or not
+
+# Reconcile (one-shot batch) settings
+RECONCILE_PROCESSES = None  # frontmatter parser processes; None uses every CPU
+RECONCILE_CHUNK_SIZE = 256  # notes handed to a parser process at a time
+
+# Materialized tables in domain dashboards and .index.md files
+MATERIALIZED_VIEWS = True
+VIEW_SETTLE_TIME = 2  # seconds a dashboard must go untouched before its tables are rewritten
+VIEW_RECENT_LIMIT = 10  # rows in the recent activity and inbox tables
+
+# Keep each project's satellites property listing the notes that orbit it
+MAINTAIN_SATELLITES = True
+
+# Stats (counters and stage timings, written to the vault's .orbit directory)
+STATS_FILE_NAME = "stats.json"
+STATS_INTERVAL = 10  # seconds between rewrites of the stats file
+STATS_HOST = "127.0.0.1"
+STATS_PORT = 9464  # Prometheus text endpoint at /metrics; None disables it
+
+# Opt-in journal of the raw file events (in .orbit), for replaying with orbit_bench.py replay
+RECORD_EVENTS = False  # also enabled with --record
+EVENT_LOG_NAME = "events.log"
+EVENT_LOG_MAX_BYTES = 64 * 1024 * 1024  # rotated to events.log.1 at this size
+
+# Reload this file while the watchdog runs (restart-only settings wait for a restart)
+CONFIG_RELOAD = True
+CONFIG_RELOAD_INTERVAL = 2  # seconds between checks of the file
+
+# Local note-creation API on the same server (POST /notes and /notes/bulk); off by default
+NOTE_API = False
 
 # Property names for frontmatter
 PROP_OBJECT = "object"
@@ -69,19 +163,88 @@ def get_fallback_path() -> Path:
     """Returns the fallback path for unprocessed notes."""
     return Path(VAULT_PATH) / ".orbit" / "fallback"
 
+def get_index_path() -> Path:
+    """Returns the path of the persistent vault index database."""
+    return Path(VAULT_PATH) / ".orbit" / INDEX_DB_NAME
+
+def get_journal_path() -> Path:
+    """Returns the path of the write-ahead move journal."""
+    return Path(VAULT_PATH) / ".orbit" / JOURNAL_NAME
+
+def get_stats_path() -> Path:
+    """Returns the path of the periodically rewritten stats file."""
+    return Path(VAULT_PATH) / ".orbit" / STATS_FILE_NAME
+
+def get_event_log_path() -> Path:
+    """Returns the path of the raw event journal."""
+    return Path(VAULT_PATH) / ".orbit" / EVENT_LOG_NAME
+
+def get_setup_manifest_path() -> Path:
+    """Returns the path of the manifest of files generated by setup."""
+    return Path(VAULT_PATH) / ".orbit" / SETUP_MANIFEST_NAME
+
+def stage_keys(stage_dirs):
+    """Returns stage_dirs keyed by the stage as a string, however it was written (0 or "0")."""
+    if not isinstance(stage_dirs, dict):
+        return stage_dirs
+    return {str(stage): name for stage, name in stage_dirs.items()}
+
 # Global configuration dictionary
 config = {
     "vault_path": VAULT_PATH,
+    "vault_name": None,
+    "vaults_file": VAULTS_FILE,
     "domains": DOMAINS,
     "project_increment": PROJECT_INCREMENT,
+    "fuzzy_orbit_match": FUZZY_ORBIT_MATCH,
+    "fuzzy_match_ratio": FUZZY_MATCH_RATIO,
     "inbox_number": INBOX_NUMBER,
     "source_number": SOURCE_NUMBER,
     "max_satellites": MAX_SATELLITES,
     "hidden_inbox": HIDDEN_INBOX,
     "hidden_index": HIDDEN_INDEX,
+    "frontmatter_max_bytes": FRONTMATTER_MAX_BYTES,
+    "parse_cache_size": PARSE_CACHE_SIZE,
+    "index_db_name": INDEX_DB_NAME,
+    "journal_name": JOURNAL_NAME,
+    "journal_max_bytes": JOURNAL_MAX_BYTES,
+    "setup_manifest_name": SETUP_MANIFEST_NAME,
     "log_level": LOG_LEVEL,
     "log_file": LOG_FILE,
+    "log_format": LOG_FORMAT,
+    "log_max_bytes": LOG_MAX_BYTES,
+    "log_backup_count": LOG_BACKUP_COUNT,
+    "log_rate_limit": LOG_RATE_LIMIT,
+    "log_rate_period": LOG_RATE_PERIOD,
     "debounce_time": DEBOUNCE_TIME,
+    "settle_time": SETTLE_TIME,
+    "coalesce_ttl": COALESCE_TTL,
+    "coalesce_max_entries": COALESCE_MAX_ENTRIES,
+    "worker_count": WORKER_COUNT,
+    "batch_enter_rate": BATCH_ENTER_RATE,
+    "batch_exit_rate": BATCH_EXIT_RATE,
+    "batch_quiet_time": BATCH_QUIET_TIME,
+    "batch_max_wait": BATCH_MAX_WAIT,
+    "use_polling": USE_POLLING,
+    "poll_min_interval": POLL_MIN_INTERVAL,
+    "poll_max_interval": POLL_MAX_INTERVAL,
+    "poll_full_scan_every": POLL_FULL_SCAN_EVERY,
+    "reconcile_processes": RECONCILE_PROCESSES,
+    "reconcile_chunk_size": RECONCILE_CHUNK_SIZE,
+    "materialized_views": MATERIALIZED_VIEWS,
+    "view_settle_time": VIEW_SETTLE_TIME,
+    "view_recent_limit": VIEW_RECENT_LIMIT,
+    "maintain_satellites": MAINTAIN_SATELLITES,
+    "stats_file_name": STATS_FILE_NAME,
+    "stats_interval": STATS_INTERVAL,
+    "stats_host": STATS_HOST,
+    "stats_port": STATS_PORT,
+    "record_events": RECORD_EVENTS,
+    "event_log_name": EVENT_LOG_NAME,
+    "event_log_max_bytes": EVENT_LOG_MAX_BYTES,
+    "config_reload": CONFIG_RELOAD,
+    "config_reload_interval": CONFIG_RELOAD_INTERVAL,
+    "note_api": NOTE_API,
     "prop_object": PROP_OBJECT,
     "prop_orbit": PROP_ORBIT,
     "prop_satellites": PROP_SATELLITES,
@@ -89,8 +252,66 @@ config = {
     "prop_domain": PROP_DOMAIN,
     "prop_track_number": PROP_TRACK_NUMBER,
     "prop_created": PROP_CREATED,
-    "stage_dirs": STAGE_DIRS,
+    "stage_dirs": stage_keys(STAGE_DIRS),
     "source_dir_name": SOURCE_DIR_NAME,
     "get_vault_path": get_vault_path,
-    "get_fallback_path": get_fallback_path
-}
\ No newline at end of file
+    "get_fallback_path": get_fallback_path,
+    "get_index_path": get_index_path,
+    "get_journal_path": get_journal_path,
+    "get_stats_path": get_stats_path,
+    "get_event_log_path": get_event_log_path,
+    "get_setup_manifest_path": get_setup_manifest_path
+}
+
+def vault_config(vault_path, name=None, **overrides):
+    """Returns the configuration of one vault: the global settings plus its overrides."""
+    unknown = sorted(set(overrides) - set(VAULT_SETTINGS))
+    if unknown:
+        raise ValueError(f"Not a per-vault setting: {', '.join(unknown)}")
+    vault_path = os.path.abspath(os.path.expanduser(str(vault_path)))
+    state_dir = Path(vault_path) / ".orbit"
+    settings = dict(config)
+    settings.update(overrides)
+    settings["stage_dirs"] = stage_keys(settings["stage_dirs"])
+    settings.update({
+        "vault_path": vault_path,
+        "vault_name": str(name or os.path.basename(vault_path)),
+        "vault_overrides": tuple(sorted(overrides)),
+        "get_vault_path": lambda: Path(vault_path),
+        "get_fallback_path": lambda: state_dir / "fallback",
+        "get_index_path": lambda: state_dir / settings["index_db_name"],
+        "get_journal_path": lambda: state_dir / settings["journal_name"],
+        "get_stats_path": lambda: state_dir / settings["stats_file_name"],
+        "get_event_log_path": lambda: state_dir / settings["event_log_name"],
+        "get_setup_manifest_path": lambda: state_dir / settings["setup_manifest_name"],
+    })
+    return settings
+
+def load_vaults(path=None):
+    """Returns the configuration of every vault in a vaults file, or [config] without one."""
+    path = path or VAULTS_FILE
+    if not path:
+        return [config]
+    import yaml
+    with open(path, 'r', encoding='utf-8') as f:
+        data = yaml.safe_load(f)
+    entries = data.get("vaults") if isinstance(data, dict) else data
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f"{path} does not list any vaults")
+    
+    vaults = []
+    for entry in entries:
+        if not isinstance(entry, dict) or not entry.get("path"):
+            raise ValueError(f"Each vault in {path} needs a path")
+        overrides = dict(entry)
+        vault_path = overrides.pop("path")
+        vaults.append(vault_config(vault_path, overrides.pop("name", None), **overrides))
+    
+    names = [vault["vault_name"] for vault in vaults]
+    for vault in vaults:
+        if names.count(vault["vault_name"]) > 1:
+            raise ValueError(f"Two vaults are named {vault['vault_name']}")
+        for other in vaults:
+            if other is not vault and (other["vault_path"] + os.sep).startswith(vault["vault_path"] + os.sep):
+                raise ValueError(f"Vault {other['vault_path']} lies inside {vault['vault_path']}")
+    return vaults
@@ -0,0 +1,100 @@
+"""
+ORBIT Note Creation
+-------------------
+Renders new notes the way the C1yaml.md template does, for the watchdog's
+local note-creation API. The watchdog resolves the destination from the
+orbit index and writes the note straight to it, so a note created through
+the API is never written to an inbox and moved afterwards.
+"""
+
+import re
+import time
+
+from orbit_config import config
+from orbit_frontmatter import flow_list, flow_scalar
+
+UNSAFE = re.compile(r'[\\/:*?"<>|]')
+# Newlines and other control characters would break the frontmatter, heading or file name
+CONTROL = re.compile(r'[\x00-\x1f\x7f]')
+
+
+def sanitize_title(title):
+    """File name for a note title, with the characters the template replaces swapped for dashes"""
+    return UNSAFE.sub('-', title)
+
+
+def _text_field(request, name, default=None):
+    """Return a string field of a request, rejecting other types and control characters"""
+    value = request.get(name, default)
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"{name} must be a string")
+    if CONTROL.search(value):
+        raise ValueError(f"{name} must not contain control characters")
+    return value
+
+
+def parse_request(request):
+    """Validate one creation request; returns (title, orbits, object type, stage, domain, body)
+
+    Raises ValueError for anything the API should reject.
+    """
+    if not isinstance(request, dict):
+        raise ValueError("Each note must be a JSON object")
+    title = _text_field(request, "title")
+    if title is None or not title.strip():
+        raise ValueError("title is required")
+    title = title.strip()
+    if sanitize_title(title).startswith('.'):
+        raise ValueError(f"Invalid title {title}")
+
+    orbits = request.get("orbit", request.get("orbits"))
+    if isinstance(orbits, str):
+        orbits = [orbits]
+    if not orbits or not all(isinstance(orbit, str) and orbit for orbit in orbits):
+        raise ValueError("orbit is required (a name or a list of names)")
+    if any(CONTROL.search(orbit) for orbit in orbits):
+        raise ValueError("orbit must not contain control characters")
+
+    object_type = _text_field(request, "object", "note")
+    if not object_type:
+        raise ValueError("object must not be empty")
+    stage = request.get("stage", 0)
+    if not isinstance(stage, int) or isinstance(stage, bool):
+        try:
+            stage = int(stage)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid stage {stage}")
+    domain = _text_field(request, "domain")
+    body = request.get("body")
+    if body is not None and not isinstance(body, str):
+        raise ValueError("body must be a string")
+    return title, list(orbits), object_type, stage, domain, body
+
+
+def render_note(title, orbits, object_type="note", stage=0, domain="", body=None, created=None):
+    """Render a note with the frontmatter and sections of the C1yaml.md template"""
+    created = created or time.strftime("%Y-%m-%d")
+    if body is None:
+        body = f"*Your notes about {title} here...*"
+    links = ", ".join(f"[[{orbit}]]" for orbit in orbits)
+    return (
+        f"---\n"
+        f"{config['prop_object']}: {flow_scalar(object_type)}\n"
+        f"{config['prop_created']}: {created}\n"
+        f"{config['prop_domain']}: {flow_scalar(domain or '')}\n"
+        f"{config['prop_orbit']}: {flow_list(orbits)}\n"
+        f"{config['prop_stage']}: {stage}\n"
+        f"---\n"
+        f"\n"
+        f"# {title}\n"
+        f"\n"
+        f"## Notes\n"
+        f"\n"
+        f"{body}\n"
+        f"\n"
+        f"## Relations\n"
+        f"\n"
+        f"- Orbits: {links}\n"
+    )
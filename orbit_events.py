@@ -0,0 +1,644 @@
+"""
+ORBIT Event Pipeline
+--------------------
+Decouples the watchdog observer thread from file processing. Event handlers
+drop the echoes of the daemon's own moves, record everything else in a
+coalescing store and schedule its path; a dispatcher holds the path until it
+has been quiet for the settle time and then hands it to a processing stage,
+which acts on the merged change once.
+"""
+
+import os
+import time
+import heapq
+import queue
+import logging
+import threading
+from collections import OrderedDict, deque
+
+logger = logging.getLogger(__name__)
+
+CREATED = "created"
+MODIFIED = "modified"
+MOVED = "moved"
+DELETED = "deleted"
+
+
+class PendingChange:
+    """The merged result of every event seen for one path since it was last processed"""
+
+    __slots__ = ("path", "action", "moved_from", "events", "history", "last_seen")
+
+    def __init__(self, path, now):
+        self.path = path
+        self.action = None
+        self.moved_from = None
+        self.events = 0
+        self.history = []
+        self.last_seen = now
+
+    def merge(self, kind, now):
+        """Fold one more event into the final action"""
+        self.events += 1
+        self.last_seen = now
+        if not self.history or self.history[-1] != kind:
+            self.history.append(kind)
+
+        if kind == DELETED:
+            # Created and deleted before we got to it: nothing left to do
+            self.action = None if self.action == CREATED else DELETED
+        elif kind == CREATED:
+            self.action = MODIFIED if self.action == DELETED else CREATED
+        elif kind == MODIFIED:
+            self.action = CREATED if self.action == CREATED else MODIFIED
+        elif kind == MOVED:
+            # Content changes carry over to the new path; a bare rename stays a rename
+            if self.action not in (CREATED, MODIFIED):
+                self.action = MOVED
+
+    def describe(self):
+        """Human-readable event sequence, e.g. 'created then modified then moved from X'"""
+        steps = [
+            f"moved from {self.moved_from}" if kind == MOVED and self.moved_from else kind
+            for kind in self.history
+        ]
+        return " then ".join(steps)
+
+
+class EventCoalescer:
+    """Bounded store of pending changes, one per path
+
+    Every entry expires after a time-to-live, and the oldest entries are
+    evicted once max_entries is reached, so memory stays flat no matter how
+    many distinct paths the vault sees.
+    """
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._pending = OrderedDict()  # path -> PendingChange, oldest first
+        self._lock = threading.Lock()
+        self.coalesced = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _prune(self, now):
+        """Drop expired entries, then evict the oldest while over the size cap"""
+        while self._pending and next(iter(self._pending.values())).last_seen + self.ttl <= now:
+            self._pending.popitem(last=False)
+            self.expired += 1
+        while len(self._pending) > self.max_entries:
+            # An evicted change is still processed (as a modification) when its path settles
+            self._pending.popitem(last=False)
+            self.evictions += 1
+
+    def record(self, kind, path, dest_path=None):
+        """Merge an event into the pending change for its path
+
+        Returns the path to schedule. Moves re-key the pending change under
+        dest_path.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            target = dest_path if kind == MOVED else path
+
+            change = self._pending.pop(path, None)
+            if change is None:
+                change = PendingChange(target, now)
+                if kind == MOVED:
+                    change.moved_from = path
+            else:
+                self.coalesced += 1
+                if kind == MOVED:
+                    change.path = target
+                    change.moved_from = change.moved_from or path
+            change.merge(kind, now)
+            self._pending[target] = change
+            self._prune(now)
+            return target
+
+    def take(self, path):
+        """Remove and return the pending change for path, or None"""
+        with self._lock:
+            return self._pending.pop(path, None)
+
+    def stats(self):
+        """Return the store's size and eviction counters"""
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "coalesced": self.coalesced,
+                "expired": self.expired,
+                "evictions": self.evictions,
+            }
+
+
+class MoveRegistry:
+    """Tracks the daemon's own moves so the events they generate can be dropped
+
+    A move is registered before it starts and kept for a short window after it
+    finishes, since the observer may deliver its events late. Modifications of
+    a destination only count as echoes while the file still has the stat
+    signature the move left it with, so a real edit right after a move is
+    still processed.
+    """
+
+    SOURCE = "source"
+    DESTINATION = "destination"
+
+    def __init__(self, window):
+        self.window = window
+        self._ops = {}  # path -> [role, expiry (None while in flight), signature]
+        self._expiries = []  # heap of (expiry, path) for finished moves
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._ops)
+
+    def begin(self, src_path, dest_path):
+        """Register a move that is about to start"""
+        with self._lock:
+            self._ops[str(src_path)] = [self.SOURCE, None, None]
+            self._ops[str(dest_path)] = [self.DESTINATION, None, None]
+
+    def end(self, src_path, dest_path):
+        """Mark a move as finished; its echoes are dropped for another window seconds"""
+        try:
+            st = os.stat(dest_path)
+            signature = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            signature = None
+        expiry = time.monotonic() + self.window
+        with self._lock:
+            for path in (str(src_path), str(dest_path)):
+                op = self._ops.get(path)
+                if op is not None:
+                    op[1] = expiry
+                    heapq.heappush(self._expiries, (expiry, path))
+            op = self._ops.get(str(dest_path))
+            if op is not None:
+                op[2] = signature
+
+    def _lookup(self, path, now):
+        """Return the registered move entry for path, pruning expired ones"""
+        while self._expiries and self._expiries[0][0] <= now:
+            expiry, expired = heapq.heappop(self._expiries)
+            op = self._ops.get(expired)
+            # The path may have been registered again since this entry was pushed
+            if op is not None and op[1] == expiry:
+                del self._ops[expired]
+        return self._ops.get(path)
+
+    def is_echo(self, kind, path, dest_path=None):
+        """True if the event was caused by one of our own moves"""
+        now = time.monotonic()
+        with self._lock:
+            op = self._lookup(path, now)
+            if op is None:
+                return False
+            role, expiry, signature = op
+            if kind == MOVED:
+                dest = self._ops.get(dest_path)
+                echo = role == self.SOURCE and dest is not None and dest[0] == self.DESTINATION
+            elif kind == DELETED:
+                echo = role == self.SOURCE
+            elif kind == CREATED:
+                echo = role == self.DESTINATION
+            else:
+                echo = role == self.DESTINATION and (expiry is None or signature is None)
+            if echo:
+                self.dropped += 1
+                return True
+
+        if kind == MODIFIED and signature is not None:
+            try:
+                st = os.stat(path)
+            except OSError:
+                return False
+            if (st.st_mtime_ns, st.st_size) == signature:
+                with self._lock:
+                    self.dropped += 1
+                return True
+        return False
+
+    def stats(self):
+        """Return the number of registered moves and dropped echo events"""
+        with self._lock:
+            return {"moves": len(self._ops), "dropped": self.dropped}
+
+
+def replace_own_file(path, text, signature, moves, tmp_dir):
+    """Atomically replace a file the daemon rewrites (dashboards, project notes)
+
+    The new content is staged in tmp_dir and renamed over path, registered
+    with the move registry so its events are dropped. Returns False without
+    writing if the file no longer has the stat signature it was read with.
+    """
+    os.makedirs(tmp_dir, exist_ok=True)
+    tmp_path = os.path.join(tmp_dir, f"{os.getpid()}-{threading.get_ident()}.md")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    st = os.stat(path)
+    if (st.st_mtime_ns, st.st_size) != signature:
+        os.unlink(tmp_path)
+        return False
+    os.chmod(tmp_path, st.st_mode & 0o7777)
+    moves.begin(tmp_path, path)
+    try:
+        os.replace(tmp_path, path)
+    finally:
+        moves.end(tmp_path, path)
+    return True
+
+
+def create_own_file(path, text, moves, tmp_dir):
+    """Atomically create a file the daemon writes (notes made through the API)
+
+    The content is staged in tmp_dir and linked into place, so the file
+    appears complete or not at all and an existing file is never replaced
+    (FileExistsError). Its events are dropped like those of a move.
+    """
+    os.makedirs(tmp_dir, exist_ok=True)
+    tmp_path = os.path.join(tmp_dir, f"{os.getpid()}-{threading.get_ident()}.md")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    moves.begin(tmp_path, path)
+    try:
+        try:
+            os.link(tmp_path, path)
+        except FileExistsError:
+            raise
+        except OSError:
+            # Filesystems without hard links; the exists check is the best we can do
+            if os.path.exists(path):
+                raise FileExistsError(path)
+            os.rename(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        moves.end(tmp_path, path)
+
+
+class KeyedLocks:
+    """One lock per key (e.g. per target directory), created on first use"""
+
+    def __init__(self):
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def __call__(self, key):
+        with self._guard:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+
+
+class FairPool:
+    """Bounded worker pool shared by several schedulers (one per vault)
+
+    Each key has its own FIFO of tasks and the workers serve the keys with
+    work round-robin, so a key with a deep backlog can't starve the others.
+    """
+
+    def __init__(self, workers):
+        self.workers = max(1, workers)
+        self._queues = OrderedDict()  # key -> deque of (func, arg), in serving order
+        self._cond = threading.Condition()
+        self._running = False
+        self._threads = []
+
+    def start(self):
+        self._running = True
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"orbit-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Finish the queued tasks, then stop the workers"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+
+    def submit(self, key, func, arg):
+        """Queue func(arg) behind the other tasks of key"""
+        with self._cond:
+            tasks = self._queues.get(key)
+            if tasks is None:
+                tasks = self._queues[key] = deque()
+            tasks.append((func, arg))
+            self._cond.notify()
+
+    def map(self, key, func, items):
+        """Run func over items as tasks of key and wait for them; returns the results in order
+
+        Raises the first exception a task raised. Must not be called from one
+        of the pool's own workers, which could end up waiting on itself.
+        """
+        items = list(items)
+        results = [None] * len(items)
+        errors = []
+        done = threading.Semaphore(0)
+
+        def run(index):
+            try:
+                results[index] = func(items[index])
+            except Exception as e:
+                errors.append(e)
+            finally:
+                done.release()
+
+        for index in range(len(items)):
+            self.submit(key, run, index)
+        for _ in items:
+            done.acquire()
+        if errors:
+            raise errors[0]
+        return results
+
+    def backlog(self, key):
+        """Number of tasks of key waiting for a worker"""
+        with self._cond:
+            return len(self._queues.get(key, ()))
+
+    def _next(self):
+        """Take the next task from the first key with work and send that key to the back"""
+        for key, tasks in self._queues.items():
+            if tasks:
+                self._queues.move_to_end(key)
+                return tasks.popleft()
+        return None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                task = self._next()
+                while task is None and self._running:
+                    self._cond.wait()
+                    task = self._next()
+            if task is None:
+                return
+            func, arg = task
+            try:
+                func(arg)
+            except Exception as e:
+                logger.error(f"Error processing {arg}: {str(e)}")
+
+
+class SettleScheduler:
+    """Delay queue that releases a path once no event has touched it for settle_time
+
+    Settled paths are processed by a pool of worker threads, either its own
+    or a FairPool shared with other schedulers (under key). A path is never
+    processed by two workers at once; if it settles again while a worker is
+    still on it, it is re-armed instead.
+    """
+
+    def __init__(self, process, settle_time, workers=1, pool=None, key=None):
+        self.process = process
+        self.settle_time = settle_time
+        self.workers = 0 if pool else max(1, workers)
+        self.pool = pool
+        self.key = key
+        self._due = {}  # path -> monotonic time it becomes ready
+        self._heap = []  # (due, path), at most one entry per pending path
+        self._cond = threading.Condition()
+        self._work = queue.Queue()
+        self._active = set()
+        self._active_lock = threading.Lock()
+        self._threads = []
+        self._running = False
+
+    def start(self):
+        """Start the dispatcher and processing threads"""
+        self._running = True
+        self._threads = [threading.Thread(target=self._dispatch, name="orbit-dispatch", daemon=True)]
+        self._threads += [
+            threading.Thread(target=self._worker, name=f"orbit-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Stop accepting work and wait for the threads to finish"""
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        for _ in range(self.workers):
+            self._work.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def schedule(self, path):
+        """Hold path until it has been quiet for settle_time (re-arms if already pending)"""
+        due = time.monotonic() + self.settle_time
+        with self._cond:
+            if path not in self._due:
+                heapq.heappush(self._heap, (due, path))
+                self._cond.notify()
+            self._due[path] = due
+
+    def cancel(self, path):
+        """Stop waiting for path (e.g. it was renamed before it settled)"""
+        with self._cond:
+            self._due.pop(path, None)
+
+    def pending(self):
+        """Number of paths waiting to settle"""
+        with self._cond:
+            return len(self._due)
+
+    def backlog(self):
+        """Number of settled paths waiting to be processed"""
+        if self.pool:
+            return self.pool.backlog(self.key)
+        return self._work.qsize()
+
+    def _dispatch(self):
+        """Move settled paths from the delay queue to the processing stage"""
+        while True:
+            with self._cond:
+                while self._running:
+                    now = time.monotonic()
+                    if self._heap and self._heap[0][0] <= now:
+                        break
+                    timeout = self._heap[0][0] - now if self._heap else None
+                    self._cond.wait(timeout)
+                if not self._running:
+                    return
+
+                ready = []
+                while self._heap and self._heap[0][0] <= now:
+                    _, path = heapq.heappop(self._heap)
+                    due = self._due.get(path)
+                    if due is None:
+                        continue
+                    if due > now:
+                        # Touched again while waiting; re-arm at its new due time
+                        heapq.heappush(self._heap, (due, path))
+                    else:
+                        del self._due[path]
+                        ready.append(path)
+
+            for path in ready:
+                if self.pool:
+                    self.pool.submit(self.key, self._handle, path)
+                else:
+                    self._work.put(path)
+
+    def _worker(self):
+        """Process settled paths from the scheduler's own queue"""
+        while True:
+            path = self._work.get()
+            if path is None:
+                return
+            self._handle(path)
+
+    def _handle(self, path):
+        """Process one settled path, unless a worker is already on it"""
+        with self._active_lock:
+            busy = path in self._active
+            if not busy:
+                self._active.add(path)
+        if busy:
+            self.schedule(path)
+            return
+
+        try:
+            self.process(path)
+        except Exception as e:
+            logger.error(f"Error processing {path}: {str(e)}")
+        finally:
+            with self._active_lock:
+                self._active.discard(path)
+
+
+class BackpressureGate:
+    """Switches event handling between per-path and batch mode based on the event rate
+
+    Once more than enter_rate events per second arrive, scheduled paths are
+    gathered into a batch instead of being processed one by one. The batch is
+    handed to flush once the rate has stayed below exit_rate for quiet_time
+    seconds (which also returns to per-path mode), or after max_wait seconds
+    if the storm keeps going.
+    """
+
+    PER_EVENT = "per-event"
+    BATCH = "batch"
+
+    def __init__(self, flush, enter_rate, exit_rate, quiet_time, max_wait, window=1.0):
+        self.flush = flush
+        self.enter_rate = enter_rate
+        self.exit_rate = exit_rate
+        self.quiet_time = quiet_time
+        self.max_wait = max_wait
+        self.window = window
+        self._times = deque()
+        self._batch = {}  # path -> None, in arrival order
+        self._batching = False
+        self._started = None
+        self._quiet_since = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._monitor, name="orbit-backpressure", daemon=True)
+        self.switches = 0
+        self.batches = 0
+        self.batched = 0
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """Stop monitoring and flush whatever has been gathered"""
+        self._stop.set()
+        self._thread.join()
+        with self._lock:
+            paths = list(self._batch)
+            self._batch = {}
+            self._batching = False
+        if paths:
+            self._flush(paths)
+
+    def _rate(self, now):
+        while self._times and self._times[0] <= now - self.window:
+            self._times.popleft()
+        return len(self._times) / self.window
+
+    @property
+    def mode(self):
+        return self.BATCH if self._batching else self.PER_EVENT
+
+    def record(self, path):
+        """Count one event; returns True if path was taken into the current batch"""
+        now = time.monotonic()
+        with self._lock:
+            self._times.append(now)
+            if not self._batching:
+                rate = self._rate(now)
+                if rate < self.enter_rate:
+                    return False
+                self._batching = True
+                self._started = now
+                self._quiet_since = None
+                self.switches += 1
+                logger.info(f"Event storm ({rate:.0f} events/s): switching to batch mode")
+            self._batch[path] = None
+            return True
+
+    def _monitor(self):
+        """Hand off the batch once the storm is over (or has gone on for max_wait)"""
+        while not self._stop.wait(0.25):
+            now = time.monotonic()
+            paths = None
+            with self._lock:
+                if not self._batching:
+                    continue
+                rate = self._rate(now)
+                if rate < self.exit_rate:
+                    self._quiet_since = self._quiet_since or now
+                else:
+                    self._quiet_since = None
+                quiet = self._quiet_since is not None and now - self._quiet_since >= self.quiet_time
+                if quiet or now - self._started >= self.max_wait:
+                    paths = list(self._batch)
+                    self._batch = {}
+                    self._started = now
+                    if quiet:
+                        self._batching = False
+                        self.switches += 1
+                        logger.info(f"Event rate back to {rate:.0f} events/s: switching to per-event mode")
+            if paths:
+                self._flush(paths)
+
+    def _flush(self, paths):
+        self.batches += 1
+        self.batched += len(paths)
+        try:
+            self.flush(paths)
+        except Exception as e:
+            logger.error(f"Error processing a batch of {len(paths)} paths: {str(e)}")
+
+    def stats(self):
+        """Return the current mode, event rate and batch counters"""
+        with self._lock:
+            return {
+                "batch_mode": int(self._batching),
+                "rate": round(self._rate(time.monotonic()), 1),
+                "pending": len(self._batch),
+                "switches": self.switches,
+                "batches": self.batches,
+                "batched": self.batched,
+            }
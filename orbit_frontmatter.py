@@ -0,0 +1,372 @@
+"""
+ORBIT Frontmatter Reader
+------------------------
+Reads only the YAML frontmatter block at the top of a note, up to a byte cap,
+and parses the flat subset the ORBIT templates emit without going through the
+full YAML loader. Anything outside that subset falls back to PyYAML.
+"""
+
+import os
+import re
+import json
+import hashlib
+import datetime
+import threading
+from collections import OrderedDict
+import yaml
+
+from orbit_config import config
+
+# libyaml's loader is much faster than the pure-Python one when available
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+_FENCE = re.compile(rb'^---[ \t\r\n\f\v]*$')
+_KEY = re.compile(r'^([A-Za-z_][A-Za-z0-9_-]*):(?:[ ]+(.*))?$')
+_BLOCK_ITEM = re.compile(r'^[ ]*-[ ]+(.*)$')
+_INT = re.compile(r'^(?:0|[-+]?[1-9][0-9]*)$')
+_DATE = re.compile(r'^([0-9]{4})-([0-9]{2})-([0-9]{2})$')
+_TRUE = {"yes", "Yes", "YES", "true", "True", "TRUE", "on", "On", "ON"}
+# Characters that give a plain scalar special meaning in YAML
+_INDICATORS = set("-?:,[]{}#&*!|>'\"%@`")
+# PyYAML's implicit type resolvers, keyed by first character
+_RESOLVERS = yaml.resolver.Resolver.yaml_implicit_resolvers
+
+
+class Unsupported(Exception):
+    """Raised when a frontmatter block needs the full YAML loader"""
+
+
+def read_frontmatter_block(file_path, max_bytes=None):
+    """Return the text between the opening and closing --- fences, or None
+
+    Only reads up to the closing fence, and gives up once max_bytes have been
+    read without finding it.
+    """
+    if max_bytes is None:
+        max_bytes = config["frontmatter_max_bytes"]
+
+    with open(file_path, 'rb') as f:
+        first = f.readline(max_bytes)
+        if not _FENCE.match(first) or not first.endswith(b'\n'):
+            return None
+
+        lines = []
+        consumed = len(first)
+        while consumed < max_bytes:
+            line = f.readline(max_bytes - consumed)
+            if not line:
+                return None
+            consumed += len(line)
+            if line.endswith(b'\n') and _FENCE.match(line):
+                return b''.join(lines).decode('utf-8').replace('\r\n', '\n').rstrip('\n')
+            lines.append(line)
+
+    return None
+
+
+def _implicit_tag(text):
+    """Return the tag YAML would implicitly give a plain scalar, or None for str"""
+    for tag, regexp in _RESOLVERS.get(text[0], []) + _RESOLVERS.get(None, []):
+        if regexp.match(text):
+            return tag
+    return None
+
+
+def _scalar(text):
+    """Resolve a plain or quoted scalar the way YAML's safe loader would"""
+    if not text:
+        return None
+    if text.startswith('"'):
+        if len(text) < 2 or not text.endswith('"') or '"' in text[1:-1] or '\\' in text:
+            raise Unsupported(text)
+        return text[1:-1]
+    if text.startswith("'"):
+        if len(text) < 2 or not text.endswith("'") or "'" in text[1:-1]:
+            raise Unsupported(text)
+        return text[1:-1]
+
+    tag = _implicit_tag(text)
+    if tag is None:
+        if (
+            text[0] in _INDICATORS
+            or text.endswith(':')
+            or ': ' in text
+            or ' #' in text
+            or '\t' in text
+        ):
+            raise Unsupported(text)
+        return text
+    if tag.endswith(':null'):
+        return None
+    if tag.endswith(':bool'):
+        return text in _TRUE
+    if tag.endswith(':int') and _INT.match(text):
+        return int(text)
+    if tag.endswith(':timestamp'):
+        match = _DATE.match(text)
+        if match:
+            try:
+                return datetime.date(*(int(part) for part in match.groups()))
+            except ValueError:
+                pass
+    raise Unsupported(text)
+
+
+def _flow_list(text):
+    """Parse a single-line flow sequence such as ["A", "B"]"""
+    inner = text[1:-1].strip()
+    if not inner:
+        return []
+    items = []
+    for item in inner.split(','):
+        item = item.strip()
+        if not item or any(c in item for c in '[]{}'):
+            raise Unsupported(text)
+        items.append(_scalar(item))
+    return items
+
+
+def parse_simple(text):
+    """Parse the flat key/scalar/list subset of YAML used by ORBIT templates
+
+    Raises Unsupported for anything more complex.
+    """
+    result = {}
+    pending = None
+    indent = None
+    for line in text.split('\n'):
+        stripped = line.strip()
+        if not stripped or stripped.startswith('#'):
+            continue
+        if '\t' in line:
+            raise Unsupported(line)
+
+        item = _BLOCK_ITEM.match(line)
+        if item:
+            if pending is None:
+                raise Unsupported(line)
+            if not isinstance(result[pending], list):
+                result[pending] = []
+                indent = len(line) - len(line.lstrip(' '))
+            elif len(line) - len(line.lstrip(' ')) != indent:
+                raise Unsupported(line)
+            result[pending].append(_scalar(item.group(1).strip()))
+            continue
+
+        match = _KEY.match(line.rstrip())
+        if not match:
+            raise Unsupported(line)
+        key, value = match.group(1), (match.group(2) or "").strip()
+        if _implicit_tag(key) is not None:
+            raise Unsupported(line)
+        if not value:
+            result[key] = None
+            pending = key
+            continue
+
+        pending = None
+        if value.startswith('['):
+            if not value.endswith(']'):
+                raise Unsupported(line)
+            result[key] = _flow_list(value)
+        else:
+            result[key] = _scalar(value)
+
+    return result or None
+
+
+def parse_frontmatter_text(text):
+    """Parse a frontmatter block, using the fast path when possible"""
+    try:
+        return parse_simple(text)
+    except Unsupported:
+        return yaml.load(text, Loader=SafeLoader)
+
+
+def read_frontmatter(file_path, max_bytes=None):
+    """Read and parse the frontmatter of a markdown file, or return None"""
+    text = read_frontmatter_block(file_path, max_bytes)
+    if text is None:
+        return None
+    return parse_frontmatter_text(text)
+
+
+def flow_scalar(value):
+    """Format a value as a quoted single-line YAML scalar such as "A" (JSON strings are valid YAML)"""
+    return json.dumps(str(value), ensure_ascii=False)
+
+
+def flow_list(values):
+    """Format values as a single-line YAML flow sequence such as ["A", "B"]"""
+    return "[" + ", ".join(flow_scalar(value) for value in values) + "]"
+
+
+def set_property(text, key, value):
+    """Return note text with a top-level frontmatter property set to value (YAML text)
+
+    Only the property's own lines are replaced, so the rest of the note is
+    left byte for byte. Returns None if the note has no frontmatter block.
+    """
+    lines = text.split('\n')
+    if lines[0].rstrip() != '---':
+        return None
+    end = next((i for i in range(1, len(lines)) if lines[i].rstrip() == '---'), None)
+    if end is None:
+        return None
+
+    new_line = f"{key}: {value}"
+    start = next(
+        (i for i in range(1, end) if lines[i].rstrip() == f"{key}:" or lines[i].startswith(f"{key}: ")),
+        None,
+    )
+    if start is None:
+        lines.insert(end, new_line)
+    else:
+        # Drop the old value's block-sequence or indented continuation lines too
+        stop = start + 1
+        while stop < end and lines[stop][:1] in (' ', '\t', '-'):
+            stop += 1
+        lines[start:stop] = [new_line]
+    return '\n'.join(lines)
+
+
+def routing_key(frontmatter):
+    """Return the properties that decide where a note is filed"""
+    if not isinstance(frontmatter, dict):
+        return None
+    return tuple(
+        repr(frontmatter.get(config[prop]))
+        for prop in ("prop_object", "prop_orbit", "prop_stage", "prop_domain")
+    )
+
+
+class CacheEntry:
+    """Parsed frontmatter of one file, plus where and how it was last routed"""
+
+    __slots__ = ("path", "signature", "block_hash", "frontmatter", "routing", "processed")
+
+    def __init__(self, path, signature, block_hash, frontmatter):
+        self.path = path
+        self.signature = signature
+        self.block_hash = block_hash
+        self.frontmatter = frontmatter
+        self.routing = routing_key(frontmatter)
+        self.processed = None
+
+
+class FrontmatterCache:
+    """Bounded LRU cache of parsed frontmatter keyed by file identity
+
+    Entries are keyed on (device, inode) and validated against the file's
+    (mtime, size). When the stat signature changes the block is re-read, but
+    it is only re-parsed if its hash differs from the cached one.
+    """
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or config["parse_cache_size"]
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.block_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _identity(st):
+        return (st.st_dev, st.st_ino), (st.st_mtime_ns, st.st_size)
+
+    def load(self, file_path, st, max_bytes=None):
+        """Return (entry, hit) for a file, reading and parsing only what changed
+
+        hit is True when the stat signature matched and nothing was read.
+        """
+        key, signature = self._identity(st)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.signature == signature:
+                self._entries.move_to_end(key)
+                entry.path = file_path
+                self.hits += 1
+                return entry, True
+
+        text = read_frontmatter_block(file_path, max_bytes)
+        block_hash = None if text is None else hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+        if entry is not None and entry.block_hash == block_hash:
+            # Only the body changed; keep the parsed frontmatter
+            entry.path = file_path
+            entry.signature = signature
+            block_hit = True
+        else:
+            frontmatter = None if text is None else parse_frontmatter_text(text)
+            previous, entry = entry, CacheEntry(file_path, signature, block_hash, frontmatter)
+            if previous is not None:
+                # Keep the routing history; unchanged routing properties are still skipped
+                entry.processed = previous.processed
+            block_hit = False
+
+        with self._lock:
+            if block_hit:
+                self.block_hits += 1
+            else:
+                self.misses += 1
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry, False
+
+    @staticmethod
+    def needs_routing(entry):
+        """True unless the entry was already routed from its current path with these properties"""
+        return entry.processed != (entry.path, entry.routing)
+
+    @staticmethod
+    def mark_processed(entry):
+        """Remember that the entry's current routing properties have been handled"""
+        entry.processed = (entry.path, entry.routing)
+
+    def reset_routing(self):
+        """Forget how every cached note was routed, e.g. after the routing settings changed"""
+        with self._lock:
+            for entry in self._entries.values():
+                entry.routing = routing_key(entry.frontmatter)
+                entry.processed = None
+
+    def moved(self, src_st, dest_path):
+        """Re-point or drop the entry for a file the daemon just moved"""
+        key, signature = self._identity(src_st)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return
+            try:
+                dest_key, dest_signature = self._identity(os.stat(dest_path))
+            except OSError:
+                return
+            # A same-device rename keeps the inode; a copy across devices does not
+            if dest_key == key and dest_signature == signature:
+                entry.path = str(dest_path)
+                self._entries[key] = entry
+
+    def stats(self):
+        """Return the cache's size and hit/miss counters"""
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "block_hits": self.block_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+def read_frontmatter_safe(file_path):
+    """read_frontmatter for worker processes: returns (path, frontmatter, error)"""
+    try:
+        return file_path, read_frontmatter(file_path), None
+    except Exception as e:
+        return file_path, None, str(e)
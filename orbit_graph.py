@@ -0,0 +1,395 @@
+"""
+ORBIT Graph
+-----------
+Directed graph of orbit relationships: an edge runs from each note to every
+note its `orbits` resolve to. Notes are held as interned integer ids, with
+each path stored once, so edges are small and a moved note keeps its edges
+without rewriting them. The graph is built from the persistent index at
+startup and updated as notes change, move or disappear, and answers parent,
+child, ancestor and descendant queries without walking the vault. Orbit
+names that resolve to nothing are kept and resolved again when a matching
+note appears (or when the note they resolved to is deleted or renamed).
+Ancestor and descendant sets are memoized until the next change; a note
+whose orbits lead back to itself is reported as a cycle.
+"""
+
+import os
+import sys
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+RELATIONS = ("parents", "children", "ancestors", "descendants", "cycles")
+
+
+def _under(path, prefix):
+    return path == prefix or path.startswith(os.path.join(prefix, ""))
+
+
+def _names(orbits):
+    """The interned orbit names a note lists"""
+    if isinstance(orbits, str):
+        orbits = [orbits]
+    return tuple(sys.intern(str(orbit)) for orbit in orbits or ())
+
+
+def _stem(path):
+    return os.path.basename(path)[:-3].lower()
+
+
+class OrbitGraph:
+    """Orbit edges between notes, held as interned note ids"""
+
+    def __init__(self, orbit_index, fuzzy=True):
+        self.orbit_index = orbit_index
+        self.fuzzy = fuzzy
+        self._ids = {}  # note path -> note id
+        self._paths = []  # note id -> note path, or None once the note is gone
+        self._orbits = {}  # note id -> the orbit names the note lists
+        self._parents = {}  # note id -> tuple of the ids its orbits resolve to
+        self._children = {}  # note id -> set of the ids orbiting it
+        self._dangling = {}  # lowercased orbit name that resolves to nothing -> ids listing it
+        self._closures = {}  # (relation, id) -> frozenset, cleared on every change
+        self._lock = threading.RLock()
+        self.cycles_found = 0
+
+    def _id(self, path):
+        """Return the id of a note path, assigning one if needed"""
+        note = self._ids.get(path)
+        if note is None:
+            note = self._ids[path] = len(self._paths)
+            self._paths.append(path)
+        return note
+
+    def _forget(self, note):
+        del self._ids[self._paths[note]]
+        self._paths[note] = None
+
+    def _to_paths(self, ids):
+        return {self._paths[note] for note in ids if self._paths[note] is not None}
+
+    def _resolve(self, note, orbits):
+        """Return the ids a note's orbits resolve to, in orbit order, and the names that resolve to nothing"""
+        targets = []
+        dangling = []
+        for orbit in orbits:
+            found = self.orbit_index.locate(orbit, fuzzy=False)
+            if found is None:
+                dangling.append(orbit.lower())
+                continue
+            target = self._id(str(found))
+            if target != note and target not in targets:
+                targets.append(target)
+        return tuple(targets), dangling
+
+    def _set(self, note, targets):
+        """Point a note at new targets; returns the ids whose children changed"""
+        old = self._parents.pop(note, ())
+        if targets:
+            self._parents[note] = targets
+        for target in old:
+            children = self._children.get(target)
+            if children is not None:
+                children.discard(note)
+                if not children:
+                    del self._children[target]
+        for target in targets:
+            self._children.setdefault(target, set()).add(note)
+        if old != targets:
+            self._closures = {}
+        return set(old) ^ set(targets)
+
+    def _link(self, note, orbits):
+        """Resolve a note's orbits and point it at the results; returns the ids whose children changed"""
+        for name in self._orbits.pop(note, ()):
+            waiting = self._dangling.get(name.lower())
+            if waiting is not None:
+                waiting.discard(note)
+                if not waiting:
+                    del self._dangling[name.lower()]
+        targets, dangling = self._resolve(note, orbits)
+        if orbits:
+            self._orbits[note] = orbits
+        for name in dangling:
+            self._dangling.setdefault(name, set()).add(note)
+        return self._set(note, targets)
+
+    def _revisit(self, path):
+        """Resolve again the dangling orbits a note at path may now satisfy"""
+        stem = _stem(path)
+        waiting = set()
+        for name, notes in self._dangling.items():
+            # Orbit names resolve to notes whose name contains them
+            if name in stem:
+                waiting |= notes
+        changed = set()
+        for note in waiting:
+            changed |= self._link(note, self._orbits.get(note, ()))
+        return changed
+
+    def _relink_children(self, targets):
+        """Resolve again the orbits of every note orbiting targets"""
+        waiting = set()
+        for target in targets:
+            waiting |= self._children.get(target, set())
+        changed = set()
+        for note in waiting:
+            changed |= self._link(note, self._orbits.get(note, ()))
+        return changed
+
+    def _report_cycle(self, note):
+        if self.in_cycle(self._paths[note]):
+            self.cycles_found += 1
+            chain = " -> ".join(os.path.basename(path)[:-3] for path in self.cycle_through(self._paths[note]))
+            logger.warning(f"Orbit cycle: {chain}")
+
+    def _matching(self, path):
+        """Return the ids at path, or under it if it is a directory"""
+        note = self._ids.get(path)
+        if note is not None:
+            return [(path, note)]
+        if path.endswith(".md"):
+            return []
+        return [(p, note) for p, note in self._ids.items() if _under(p, path)]
+
+    def build(self, rows):
+        """Rebuild the graph from (path, orbits) rows"""
+        with self._lock:
+            self._ids = {}
+            self._paths = []
+            self._orbits = {}
+            self._parents = {}
+            self._children = {}
+            self._dangling = {}
+            self._closures = {}
+            for path, orbits in rows:
+                orbits = _names(orbits)
+                if orbits:
+                    self._link(self._id(str(path)), orbits)
+
+    def update(self, path, orbits):
+        """Record a note's current orbits; returns the notes whose children changed"""
+        path = str(path)
+        orbits = _names(orbits)
+        with self._lock:
+            changed = set()
+            if path not in self._ids:
+                # A note new to the graph may be what a dangling orbit was waiting for
+                changed |= self._revisit(path)
+            if orbits or path in self._ids:
+                note = self._id(path)
+                linked = self._link(note, orbits)
+                changed |= linked
+                if self._parents.get(note) and linked:
+                    self._report_cycle(note)
+            return self._to_paths(changed)
+
+    def _remove(self, gone):
+        """Forget notes; returns the ids whose children changed"""
+        changed = set()
+        for note in gone:
+            changed |= self._link(note, ())
+        orphans = set()
+        for note in gone:
+            orphans |= self._children.get(note, set())
+        for note in gone:
+            self._forget(note)
+        # Notes orbiting a deleted note look for another match, or wait for one
+        for note in orphans:
+            changed |= self._link(note, self._orbits.get(note, ()))
+        self._closures = {}
+        return changed
+
+    def remove(self, path):
+        """Forget a deleted note (or every note under a deleted directory)"""
+        with self._lock:
+            return self._to_paths(self._remove([note for _, note in self._matching(str(path))]))
+
+    def move(self, src_path, dest_path):
+        """Follow a moved note or directory; returns the notes whose children changed"""
+        src_path, dest_path = str(src_path), str(dest_path)
+        with self._lock:
+            moved = self._matching(src_path)
+            if not moved:
+                return self._to_paths(self._revisit(dest_path)) if dest_path.endswith(".md") else set()
+            dirty = set()
+            orphans = set()
+            for old_path, note in moved:
+                new_path = dest_path + old_path[len(src_path):]
+                replaced = self._ids.get(new_path)
+                if replaced is not None:
+                    # Moved over another note: it is gone, and what orbited it
+                    # is resolved again below (most likely to the moved note)
+                    dirty |= self._link(replaced, ())
+                    orphans |= self._children.get(replaced, set())
+                    self._forget(replaced)
+                del self._ids[old_path]
+                self._ids[new_path] = note
+                self._paths[note] = new_path
+                # A renamed child changes the name in its parents' lists, and
+                # a moved parent's own list follows it
+                dirty.update(self._parents.get(note, ()))
+                if note in self._children:
+                    dirty.add(note)
+            for note in orphans:
+                dirty |= self._link(note, self._orbits.get(note, ()))
+            if _stem(src_path) != _stem(dest_path) and src_path.endswith(".md"):
+                # Names that matched the old name may match another note now,
+                # and names waiting for a match may match the new one
+                note = moved[0][1]
+                dirty |= self._relink_children([note])
+                dirty |= self._revisit(dest_path)
+            self._closures = {}
+            return self._to_paths(dirty)
+
+    def orbited(self):
+        """Return every note that something orbits"""
+        with self._lock:
+            return list(self._to_paths(self._children))
+
+    def parents(self, path):
+        with self._lock:
+            note = self._ids.get(str(path))
+            return self._to_paths(self._parents.get(note, ()))
+
+    def children(self, path):
+        with self._lock:
+            note = self._ids.get(str(path))
+            return self._to_paths(self._children.get(note, ()))
+
+    def _closure(self, relation, note):
+        """Every id reachable from note along parent (ancestors) or child (descendants) edges"""
+        key = (relation, note)
+        with self._lock:
+            cached = self._closures.get(key)
+            if cached is not None:
+                return cached
+            edges = self._parents if relation == "ancestors" else self._children
+            seen = set()
+            stack = list(edges.get(note, ()))
+            while stack:
+                current = stack.pop()
+                if current in seen:
+                    continue
+                seen.add(current)
+                stack.extend(edges.get(current, ()))
+            result = self._closures[key] = frozenset(seen)
+            return result
+
+    def _related(self, relation, path):
+        with self._lock:
+            note = self._ids.get(str(path))
+            return self._to_paths(self._closure(relation, note)) if note is not None else set()
+
+    def ancestors(self, path):
+        """Every note path orbits, directly or transitively"""
+        return self._related("ancestors", path)
+
+    def descendants(self, path):
+        """Every note orbiting path, directly or transitively"""
+        return self._related("descendants", path)
+
+    def in_cycle(self, path):
+        """True if a note's orbits lead back to itself"""
+        with self._lock:
+            note = self._ids.get(str(path))
+            return note is not None and note in self._closure("ancestors", note)
+
+    def cycle_through(self, path):
+        """Return one cycle through path as a list of notes starting and ending with it"""
+        with self._lock:
+            start = self._ids.get(str(path))
+            if start is None:
+                return []
+            previous = {}
+            queue = list(self._parents.get(start, ()))
+            for note in queue:
+                previous.setdefault(note, start)
+            for note in queue:
+                if note == start:
+                    chain = [start]
+                    note = previous[start]
+                    while note != start:
+                        chain.append(note)
+                        note = previous[note]
+                    chain.append(start)
+                    return [self._paths[note] for note in reversed(chain)]
+                for parent in self._parents.get(note, ()):
+                    if parent not in previous:
+                        previous[parent] = note
+                        queue.append(parent)
+        return []
+
+    def cycles(self):
+        """Return every cycle in the graph, one list of notes per strongly connected group"""
+        with self._lock:
+            index = {}
+            low = {}
+            on_stack = set()
+            stack = []
+            groups = []
+            counter = 0
+            for start in list(self._parents):
+                if start in index:
+                    continue
+                work = [(start, iter(self._parents.get(start, ())))]
+                index[start] = low[start] = counter
+                counter += 1
+                stack.append(start)
+                on_stack.add(start)
+                while work:
+                    note, parents = work[-1]
+                    advanced = False
+                    for parent in parents:
+                        if parent not in index:
+                            index[parent] = low[parent] = counter
+                            counter += 1
+                            stack.append(parent)
+                            on_stack.add(parent)
+                            work.append((parent, iter(self._parents.get(parent, ()))))
+                            advanced = True
+                            break
+                        if parent in on_stack:
+                            low[note] = min(low[note], index[parent])
+                    if advanced:
+                        continue
+                    work.pop()
+                    if work:
+                        low[work[-1][0]] = min(low[work[-1][0]], low[note])
+                    if low[note] == index[note]:
+                        group = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            group.append(member)
+                            if member == note:
+                                break
+                        if len(group) > 1:
+                            groups.append(sorted(self._paths[member] for member in group))
+            return groups
+
+    def query(self, relation, name):
+        """Answer a relation query about the note an orbit name resolves to
+
+        Returns a dict with the relation, the name, the resolved note and the
+        sorted results (lists of notes for cycles, which take no name).
+        """
+        if relation not in RELATIONS:
+            raise ValueError(f"Unknown relation {relation}, expected one of {', '.join(RELATIONS)}")
+        if relation == "cycles":
+            return {"relation": relation, "name": None, "note": None, "results": sorted(self.cycles())}
+        found = self.orbit_index.locate(str(name), self.fuzzy) if name else None
+        note = str(found) if found is not None else None
+        results = sorted(getattr(self, relation)(note)) if note else []
+        return {"relation": relation, "name": name, "note": note, "results": results}
+
+    def stats(self):
+        """Return the number of notes with orbits, edges and cycles found"""
+        with self._lock:
+            return {
+                "notes": len(self._parents),
+                "edges": sum(len(targets) for targets in self._parents.values()),
+                "dangling": sum(len(notes) for notes in self._dangling.values()),
+                "cycles_found": self.cycles_found,
+            }
@@ -0,0 +1,354 @@
+"""
+ORBIT Orbit Index
+-----------------
+Keeps an in-memory map of lowercased note stems to the directories that
+contain them, so orbit names can be resolved without walking the vault.
+Directories are held as ids into a shared DirectoryTable rather than as
+paths. A trigram index over the stems (compact arrays of stem ids) answers
+substring and near-miss (typo) queries without scanning every name.
+"""
+
+import os
+import threading
+from array import array
+from collections import Counter
+from contextlib import contextmanager
+from itertools import chain
+from pathlib import Path
+
+from orbit_notes import DirectoryTable
+
+EXACT = "exact"
+PREFIX = "prefix"
+SUBSTRING = "substring"
+FUZZY = "fuzzy"
+
+NGRAM = 3
+
+
+def ngrams(text):
+    """Return the set of trigrams in text"""
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+def char_masks(text):
+    """Map each character of text to the bit mask of its positions"""
+    masks = {}
+    for i, char in enumerate(text):
+        masks[char] = masks.get(char, 0) | (1 << i)
+    return masks
+
+
+def edit_distance(a, b, limit, masks=None):
+    """Levenshtein distance between a and b, or limit + 1 once it exceeds limit
+
+    Bit-parallel (Myers/Hyyrö): the column of distances against a is kept as
+    bit vectors of +1/-1 steps, so each character of b costs a few integer
+    operations instead of a row of the table. masks (char_masks(a)) can be
+    passed in when a is compared against many strings.
+    """
+    over = limit + 1
+    if abs(len(a) - len(b)) > limit:
+        return over
+    if not a:
+        return len(b)
+    if masks is None:
+        masks = char_masks(a)
+    full = (1 << len(a)) - 1
+    last = 1 << (len(a) - 1)
+    plus, minus, score = full, 0, len(a)
+    remaining = len(b)
+    for char in b:
+        eq = masks.get(char, 0)
+        xv = eq | minus
+        xh = (((eq & plus) + plus) ^ plus) | eq
+        hplus = minus | ~(xh | plus)
+        hminus = plus & xh
+        if hplus & last:
+            score += 1
+        elif hminus & last:
+            score -= 1
+        remaining -= 1
+        # Each remaining character can lower the distance by at most one
+        if score - remaining > limit:
+            return over
+        hplus = (hplus << 1) | 1
+        hminus <<= 1
+        plus = (hminus | ~(xv | hplus)) & full
+        minus = hplus & xv
+    return score if score <= limit else over
+
+
+class OrbitIndex:
+    """In-memory index of note stems used to resolve orbit names"""
+
+    def __init__(self, vault_path, fuzzy_ratio=0.25, fuzzy_candidates=50, fuzzy_postings=300, directories=None):
+        self.vault_path = Path(vault_path)
+        # Near-miss matches may differ by at most this fraction of the name's length
+        self.fuzzy_ratio = fuzzy_ratio
+        self.fuzzy_candidates = fuzzy_candidates
+        # Trigrams in more stems than this are too common to narrow a near-miss lookup
+        self.fuzzy_postings = fuzzy_postings
+        self.directories = directories or DirectoryTable()
+        # stem (lowercased) -> (stem id, directory id, file name, directory id,
+        # file name, ...): one flat tuple per stem, since nearly every stem is
+        # in one directory. Directories are kept in insertion order so the first
+        # matches what a top-down os.walk would have found
+        self._dirs = {}
+        # trigram -> array of the ids of stems containing it; ids of dropped
+        # stems stay in the arrays until enough pile up to compact them
+        self._grams = {}
+        self._stems = []  # stem id -> stem, or None once dropped
+        self._lengths = array('H')  # stem id -> length of the stem
+        self._dropped = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(entry) // 2 for entry in self._dirs.values())
+
+    @staticmethod
+    def _pairs(entry):
+        """The {directory id: file name} of a stem's entry"""
+        return dict(zip(entry[1::2], entry[2::2]))
+
+    @staticmethod
+    def _entry(stem_id, pairs):
+        return (stem_id,) + tuple(chain.from_iterable(pairs.items()))
+
+    @contextmanager
+    def snapshot(self):
+        """Hold the index still, so a batch of lookups all see the same state"""
+        with self._lock:
+            yield self
+
+    def _key(self, file_path, create=True):
+        """Return the index key, parent directory id and file name of a markdown file, or None"""
+        directory, name = os.path.split(str(file_path))
+        if not name.endswith('.md'):
+            return None
+        node = self.directories.intern(directory) if create else self.directories.lookup(directory)
+        return name[:-3].lower(), node, name
+
+    def _add_stem(self, stem, directory, name):
+        """Record a stem in a directory, indexing its trigrams the first time it is seen"""
+        entry = self._dirs.get(stem)
+        if entry is None:
+            stem_id = len(self._stems)
+            self._stems.append(stem)
+            self._lengths.append(min(len(stem), 0xFFFF))
+            self._index_grams(stem, stem_id)
+            self._dirs[stem] = (stem_id, directory, name)
+            return
+        pairs = self._pairs(entry)
+        pairs[directory] = name
+        self._dirs[stem] = self._entry(entry[0], pairs)
+
+    def _index_grams(self, stem, stem_id):
+        for gram in ngrams(stem):
+            ids = self._grams.get(gram)
+            if ids is None:
+                ids = self._grams[gram] = array('I')
+            ids.append(stem_id)
+
+    def _drop_stem(self, stem):
+        """Forget a stem that no longer exists in any directory"""
+        self._stems[self._dirs.pop(stem)[0]] = None
+        self._dropped += 1
+        if self._dropped > 1024 and 4 * self._dropped > len(self._stems):
+            self._compact()
+
+    def _compact(self):
+        """Renumber the live stems and rebuild the trigram arrays without dropped ids"""
+        self._stems = [stem for stem in self._stems if stem is not None]
+        self._lengths = array('H', (min(len(stem), 0xFFFF) for stem in self._stems))
+        self._grams = {}
+        for stem_id, stem in enumerate(self._stems):
+            self._dirs[stem] = (stem_id,) + self._dirs[stem][1:]
+            self._index_grams(stem, stem_id)
+        self._dropped = 0
+
+    def build(self, paths=None):
+        """Index every markdown file, walking the vault unless paths are given"""
+        if paths is None:
+            paths = (
+                os.path.join(root, file)
+                for root, _, files in os.walk(self.vault_path)
+                for file in files
+            )
+        with self._lock:
+            self._dirs = {}
+            self._grams = {}
+            self._stems = []
+            self._lengths = array('H')
+            self._dropped = 0
+            for path in paths:
+                key = self._key(path)
+                if key is not None:
+                    self._add_stem(*key)
+
+    def add(self, file_path):
+        """Record a markdown file in the index"""
+        key = self._key(file_path)
+        if key is None:
+            return
+        with self._lock:
+            self._add_stem(*key)
+
+    def remove(self, file_path):
+        """Forget a markdown file"""
+        key = self._key(file_path, create=False)
+        if key is None:
+            return
+        stem, directory, _ = key
+        with self._lock:
+            entry = self._dirs.get(stem)
+            if entry is None:
+                return
+            pairs = self._pairs(entry)
+            if pairs.pop(directory, None) is None:
+                return
+            if pairs:
+                self._dirs[stem] = self._entry(entry[0], pairs)
+            else:
+                self._drop_stem(stem)
+
+    def move(self, src_path, dest_path):
+        """Update the index for a renamed or moved markdown file"""
+        with self._lock:
+            self.remove(src_path)
+            self.add(dest_path)
+
+    def _rewrite_tree(self, src_dir, dest_dir):
+        """Re-point (or drop, if dest_dir is None) every entry under src_dir"""
+        src_dir = os.path.abspath(str(src_dir))
+        top = self.directories.lookup(src_dir)
+        if top is None:
+            return
+        moved = {}  # directory id under src_dir -> its id under dest_dir
+        with self._lock:
+            for stem in list(self._dirs):
+                # Read afresh: dropping a stem may have compacted (renumbered) the rest
+                entry = self._dirs[stem]
+                updated = {}
+                for directory, name in self._pairs(entry).items():
+                    if self.directories.is_under(directory, top):
+                        if dest_dir is not None:
+                            if directory not in moved:
+                                relative = self.directories.path(directory)[len(src_dir):]
+                                moved[directory] = self.directories.intern(str(dest_dir) + relative)
+                            updated[moved[directory]] = name
+                    else:
+                        updated[directory] = name
+                if updated:
+                    self._dirs[stem] = self._entry(entry[0], updated)
+                else:
+                    self._drop_stem(stem)
+
+    def move_tree(self, src_dir, dest_dir):
+        """Update the index for a renamed or moved directory"""
+        self._rewrite_tree(src_dir, dest_dir)
+
+    def remove_tree(self, src_dir):
+        """Forget every file under a deleted directory"""
+        self._rewrite_tree(src_dir, None)
+
+    def _containing(self, needle):
+        """Return the stems that contain needle"""
+        if len(needle) < NGRAM:
+            # Too short for trigrams; scan the names themselves
+            return [stem for stem in self._dirs if needle in stem]
+        # Every stem containing needle is in the shortest of its trigrams' arrays
+        rarest = min(ngrams(needle), key=lambda gram: len(self._grams.get(gram, ())))
+        stems = (self._stems[stem_id] for stem_id in self._grams.get(rarest, ()))
+        return [stem for stem in stems if stem is not None and needle in stem]
+
+    def _near_misses(self, needle):
+        """Return (distance, stem) for stems within the fuzzy edit distance of needle"""
+        limit = int(len(needle) * self.fuzzy_ratio)
+        if limit < 1:
+            return []
+        # Common trigrams are skipped: their arrays would cost more to count
+        # than they narrow the candidates down
+        postings = [self._grams.get(gram, ()) for gram in ngrams(needle)]
+        postings = [ids for ids in postings if len(ids) <= self.fuzzy_postings]
+        if not postings:
+            return []
+        # Each edit destroys at most NGRAM trigrams, so a close enough stem
+        # must share at least this many of the counted ones with the needle
+        min_shared = max(1, len(postings) - NGRAM * limit)
+        counts = Counter(chain.from_iterable(postings))
+        lengths = self._lengths
+        low, high = len(needle) - limit, len(needle) + limit
+        by_count = {}
+        for stem_id, count in counts.items():
+            if count >= min_shared and low <= lengths[stem_id] <= high:
+                by_count.setdefault(count, []).append(stem_id)
+        # Most shared trigrams first, then shorter names, then by name; only
+        # as many count groups as fill the candidate list are sorted
+        candidates = []
+        for count in sorted(by_count, reverse=True):
+            stems = [stem for stem in map(self._stems.__getitem__, by_count[count]) if stem is not None]
+            stems.sort()
+            stems.sort(key=len)
+            candidates.extend(stems)
+            if len(candidates) >= self.fuzzy_candidates:
+                break
+        matches = []
+        masks = char_masks(needle)
+        for stem in candidates[:self.fuzzy_candidates]:
+            distance = edit_distance(needle, stem, limit, masks)
+            if distance <= limit:
+                matches.append((distance, stem))
+                # Only equally close or closer stems can still win
+                limit = distance
+        return matches
+
+    def match(self, orbit_name, fuzzy=True):
+        """Find the best note stem for an orbit name
+
+        Returns (stem, directory, kind) or None. Candidates are ranked
+        deterministically: an exact name, then names starting with the orbit
+        name, then the shortest name containing it, and finally (if fuzzy) the
+        closest name within the allowed edit distance. Ties break on the name.
+        """
+        needle = orbit_name.lower()
+        with self._lock:
+            entry = self._dirs.get(needle)
+            if entry:
+                return needle, self._directory(entry), EXACT
+
+            containing = self._containing(needle)
+            if containing:
+                stem = min(containing, key=lambda s: (not s.startswith(needle), len(s), s))
+                kind = PREFIX if stem.startswith(needle) else SUBSTRING
+                return stem, self._directory(self._dirs[stem]), kind
+
+            if fuzzy:
+                near = self._near_misses(needle)
+                if near:
+                    _, stem = min(near, key=lambda m: (m[0], len(m[1]), m[1]))
+                    return stem, self._directory(self._dirs[stem]), FUZZY
+
+        return None
+
+    def _directory(self, entry):
+        """The first directory of a stem's entry, as a Path"""
+        return Path(self.directories.path(entry[1]))
+
+    def resolve(self, orbit_name, fuzzy=True):
+        """Return the directory of an orbit, or None"""
+        found = self.match(orbit_name, fuzzy)
+        return found[1] if found else None
+
+    def locate(self, orbit_name, fuzzy=True):
+        """Return the path of the note an orbit name resolves to, or None"""
+        found = self.match(orbit_name, fuzzy)
+        if found is None:
+            return None
+        stem, directory, _ = found
+        node = self.directories.lookup(directory)
+        with self._lock:
+            entry = self._dirs.get(stem)
+            name = self._pairs(entry).get(node) if entry else None
+        return directory / name if name else None
@@ -0,0 +1,197 @@
+"""
+ORBIT Move Journal
+------------------
+Write-ahead journal of the daemon's moves, kept in .orbit/ so a crash in the
+middle of a move can be rolled forward on the next start. A move is recorded
+(and fsync'd) before it starts and marked finished once it is done; batches
+of moves share a single fsync.
+
+Moves within one filesystem are a single os.rename. Across filesystems the
+note is copied to a temporary name next to the destination, fsync'd, renamed
+into place and only then unlinked from the source, so neither a half-written
+note nor a lost one can result.
+"""
+
+import os
+import json
+import shutil
+import logging
+import itertools
+import threading
+
+logger = logging.getLogger(__name__)
+
+TMP_PREFIX = ".orbit-move-"
+
+
+def _fsync_dir(directory):
+    """Flush a directory entry change to disk (no-op where unsupported)"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _tmp_path(destination):
+    directory, name = os.path.split(str(destination))
+    return os.path.join(directory, f"{TMP_PREFIX}{name}")
+
+
+def move_path(source, destination):
+    """Move a file, by rename on the same device or by a durable copy otherwise"""
+    source, destination = str(source), str(destination)
+    dest_dir = os.path.dirname(destination)
+    if os.stat(source).st_dev == os.stat(dest_dir).st_dev:
+        os.rename(source, destination)
+        return
+
+    tmp_path = _tmp_path(destination)
+    try:
+        shutil.copy2(source, tmp_path)
+        with open(tmp_path, 'rb') as f:
+            os.fsync(f.fileno())
+        os.rename(tmp_path, destination)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    _fsync_dir(dest_dir)
+    os.unlink(source)
+    _fsync_dir(os.path.dirname(source))
+
+
+def _same_file_content(a, b):
+    """True if two files have identical bytes"""
+    if os.path.getsize(a) != os.path.getsize(b):
+        return False
+    with open(a, 'rb') as fa, open(b, 'rb') as fb:
+        while True:
+            chunk = fa.read(1 << 16)
+            if chunk != fb.read(1 << 16):
+                return False
+            if not chunk:
+                return True
+
+
+class MoveJournal:
+    """Append-only JSONL journal of begun and finished moves"""
+
+    def __init__(self, path, max_bytes=1 << 20):
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._open = set()  # ids of moves begun but not finished
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def _append(self, records, sync):
+        """Write records as one append, optionally fsync'd"""
+        self._file.write("".join(json.dumps(record) + "\n" for record in records))
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+
+    def begin_many(self, moves):
+        """Record (source, destination) moves that are about to start; returns their ids"""
+        with self._lock:
+            ids = [next(self._ids) for _ in moves]
+            self._append(
+                [
+                    {"op": "begin", "id": move_id, "src": str(src), "dest": str(dest)}
+                    for move_id, (src, dest) in zip(ids, moves)
+                ],
+                sync=True,
+            )
+            self._open.update(ids)
+            return ids
+
+    def begin(self, source, destination):
+        """Record one move that is about to start; returns its id"""
+        return self.begin_many([(source, destination)])[0]
+
+    def end_many(self, ids):
+        """Mark moves as finished (or abandoned after an error)"""
+        with self._lock:
+            self._append([{"op": "end", "id": move_id} for move_id in ids], sync=False)
+            self._open.difference_update(ids)
+            self._compact()
+
+    def end(self, move_id):
+        self.end_many([move_id])
+
+    def _compact(self):
+        """Truncate the journal once it is large and nothing is in flight"""
+        if self._open or self._file.tell() < self.max_bytes:
+            return
+        self._file.truncate(0)
+        self._file.seek(0)
+
+    def pending(self):
+        """Return the (id, source, destination) moves begun but never finished"""
+        begun = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A torn final line from a crash mid-append
+                        continue
+                    if record.get("op") == "begin":
+                        begun[record["id"]] = (record["src"], record["dest"])
+                    elif record.get("op") == "end":
+                        begun.pop(record["id"], None)
+        except FileNotFoundError:
+            pass
+        return [(move_id, src, dest) for move_id, (src, dest) in begun.items()]
+
+    def replay(self):
+        """Roll forward every move interrupted by a crash, then reset the journal
+
+        Returns the number of moves that were completed.
+        """
+        completed = 0
+        for _, src, dest in self.pending():
+            try:
+                tmp_path = _tmp_path(dest)
+                if os.path.exists(tmp_path):
+                    # A cross-device copy that never reached its final name
+                    os.unlink(tmp_path)
+                src_exists, dest_exists = os.path.exists(src), os.path.exists(dest)
+                if src_exists and dest_exists:
+                    if _same_file_content(src, dest):
+                        # Copied and renamed into place, but the source was never unlinked
+                        os.unlink(src)
+                        completed += 1
+                        logger.info(f"Journal: finished interrupted move of {src} to {dest}")
+                    else:
+                        logger.warning(
+                            f"Journal: {src} and {dest} both exist with different content, leaving both"
+                        )
+                elif src_exists:
+                    os.makedirs(os.path.dirname(dest), exist_ok=True)
+                    move_path(src, dest)
+                    completed += 1
+                    logger.info(f"Journal: redid interrupted move of {src} to {dest}")
+                elif not dest_exists:
+                    logger.warning(f"Journal: neither {src} nor {dest} exists, dropping move")
+            except Exception as e:
+                logger.error(f"Journal: error replaying move of {src} to {dest}: {str(e)}")
+
+        with self._lock:
+            self._file.truncate(0)
+            self._file.seek(0)
+        return completed
@@ -0,0 +1,164 @@
+"""
+ORBIT Logging
+-------------
+Shared logging setup for the ORBIT scripts. Records are handed to a queue on
+the calling thread and written (to a size-rotated log file and the console)
+by a background listener, so log I/O stays off the processing path.
+Per-file INFO lines are rate-limited; warnings and errors never are.
+"""
+
+import json
+import time
+import atexit
+import queue
+import logging
+import threading
+import multiprocessing
+from collections import OrderedDict
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from orbit_config import config
+
+TEXT_FORMAT = '%(asctime)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_context = threading.local()
+_listener = None
+_setup_lock = threading.Lock()
+
+
+@contextmanager
+def log_context(**fields):
+    """Attach fields (e.g. event_id) to every record logged by this thread inside the block"""
+    previous = getattr(_context, "fields", {})
+    _context.fields = {**previous, **fields}
+    try:
+        yield
+    finally:
+        _context.fields = previous
+
+
+class ContextFilter(logging.Filter):
+    """Copies the current thread's log context onto each record"""
+
+    def filter(self, record):
+        for key, value in getattr(_context, "fields", {}).items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+class FileRateLimitFilter(logging.Filter):
+    """Lets at most `limit` INFO (and lower) records per file through every `period` seconds
+
+    Only records logged with extra={"path": ...} are limited. When a file's
+    window reopens, the next line notes how many were suppressed.
+    """
+
+    def __init__(self, limit, period, max_paths=4096):
+        super().__init__()
+        self.limit = limit
+        self.period = period
+        self.max_paths = max_paths
+        self._windows = OrderedDict()  # path -> [window start, count, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        path = getattr(record, "path", None)
+        if path is None or record.levelno > logging.INFO or not self.limit:
+            return True
+
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.pop(path, None)
+            if window is None or now - window[0] >= self.period:
+                suppressed = window[2] if window else 0
+                window = [now, 0, 0]
+            else:
+                suppressed = 0
+            self._windows[path] = window
+            while len(self._windows) > self.max_paths:
+                self._windows.popitem(last=False)
+
+            if window[1] >= self.limit:
+                window[2] += 1
+                return False
+            window[1] += 1
+
+        if suppressed:
+            record.msg = f"{record.getMessage()} ({suppressed} earlier messages for this file suppressed)"
+            record.args = None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including the event ID and stage timings when present"""
+
+    FIELDS = ("event_id", "path", "timings")
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, DATE_FORMAT),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in self.FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def setup_logging(name):
+    """Configure queued logging once, in the main process, and return the named logger
+
+    Pool workers started with spawn re-import the main module; they leave the
+    log file to the parent rather than rotating it from several processes.
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is None and multiprocessing.parent_process() is None:
+            level = getattr(logging, config["log_level"])
+            if config["log_format"] == "json":
+                file_formatter = JsonFormatter()
+            else:
+                file_formatter = logging.Formatter(TEXT_FORMAT, DATE_FORMAT)
+
+            file_handler = RotatingFileHandler(
+                config["log_file"],
+                maxBytes=config["log_max_bytes"],
+                backupCount=config["log_backup_count"],
+                encoding='utf-8',
+            )
+            file_handler.setFormatter(file_formatter)
+            console = logging.StreamHandler()
+            console.setFormatter(logging.Formatter(TEXT_FORMAT, DATE_FORMAT))
+
+            log_queue = queue.SimpleQueue()
+            queue_handler = QueueHandler(log_queue)
+            queue_handler.addFilter(ContextFilter())
+            queue_handler.addFilter(
+                FileRateLimitFilter(config["log_rate_limit"], config["log_rate_period"])
+            )
+
+            root = logging.getLogger()
+            root.setLevel(level)
+            root.addHandler(queue_handler)
+
+            _listener = QueueListener(log_queue, file_handler, console, respect_handler_level=True)
+            _listener.start()
+            atexit.register(stop_logging)
+    return logging.getLogger(name)
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
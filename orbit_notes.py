@@ -0,0 +1,74 @@
+"""
+ORBIT Directory Table
+---------------------
+Interned directory paths for the daemon's in-memory note structures, laid
+out so a vault of a million notes stays in the low hundreds of megabytes.
+Each directory is held once, as a (parent, name) entry with interned path
+components, and notes refer to it by integer id. Note metadata itself lives
+in the persistent store (orbit_store.py), not in memory.
+"""
+
+import os
+import sys
+import threading
+
+ROOT = 0
+
+
+class DirectoryTable:
+    """Interned absolute directory paths, stored as (parent id, name) entries
+
+    Ids are never reused, so they stay valid for as long as the table lives.
+    """
+
+    def __init__(self):
+        self._parents = [-1]  # id -> parent id
+        self._names = [""]  # id -> last path component
+        self._ids = {}  # (parent id, name) -> id
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._names)
+
+    @staticmethod
+    def _components(path):
+        return [part for part in os.path.abspath(str(path)).split(os.sep) if part]
+
+    def intern(self, path):
+        """Return the id of a directory, adding it (and its parents) if needed"""
+        node = ROOT
+        with self._lock:
+            for part in self._components(path):
+                child = self._ids.get((node, part))
+                if child is None:
+                    child = len(self._names)
+                    self._parents.append(node)
+                    self._names.append(sys.intern(part))
+                    self._ids[(node, self._names[child])] = child
+                node = child
+        return node
+
+    def lookup(self, path):
+        """Return the id of a known directory, or None"""
+        node = ROOT
+        for part in self._components(path):
+            node = self._ids.get((node, part))
+            if node is None:
+                return None
+        return node
+
+    def path(self, node):
+        """Return the absolute path of a directory id"""
+        parts = []
+        while node != ROOT:
+            parts.append(self._names[node])
+            node = self._parents[node]
+        return os.sep + os.sep.join(reversed(parts))
+
+    def is_under(self, node, ancestor):
+        """True if node is ancestor or lies below it"""
+        while node != -1:
+            if node == ancestor:
+                return True
+            node = self._parents[node]
+        return False
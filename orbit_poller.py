@@ -0,0 +1,209 @@
+"""
+ORBIT Snapshot Poller
+---------------------
+A polling replacement for the watchdog Observer, for vaults on sync clients
+or network mounts where native file events are unreliable. It keeps a
+compact snapshot (inode, mtime, size) of every file and only re-lists the
+directories whose own mtime changed; a slower full sweep re-lists every
+directory, to catch in-place edits and the changes a coarse or cached
+directory mtime hides. Differences are dispatched to the normal event
+handler as watchdog events, renames (including into new directories) are
+paired up by inode, and the interval adapts to how often the vault changes.
+"""
+
+import os
+import time
+import logging
+import threading
+from watchdog.events import (
+    DirCreatedEvent, DirDeletedEvent, DirMovedEvent,
+    FileCreatedEvent, FileDeletedEvent, FileModifiedEvent, FileMovedEvent,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class DirState:
+    """Snapshot of one directory: its own stat and its direct entries"""
+
+    __slots__ = ("ino", "mtime", "files", "subdirs")
+
+    def __init__(self, ino, mtime, files, subdirs):
+        self.ino = ino
+        self.mtime = mtime
+        self.files = files  # name -> (inode, mtime_ns, size)
+        self.subdirs = subdirs  # set of names
+
+
+class SnapshotPoller:
+    """Polls a directory tree and dispatches the differences to an event handler"""
+
+    def __init__(self, handler, root, min_interval, max_interval, full_scan_every, ignore=()):
+        self.handler = handler
+        self.root = os.path.abspath(root)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.full_scan_every = max(1, full_scan_every)
+        self.ignore = {os.path.abspath(path) for path in ignore}
+        self.interval = min_interval
+        self._dirs = {}  # directory path -> DirState
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="orbit-poller", daemon=True)
+        self.polls = 0
+        self.relisted = 0
+        self.dispatched = 0
+
+    def start(self):
+        """Take the initial snapshot and start polling"""
+        start = time.time()
+        self._scan_tree(self.root)
+        logger.info(
+            f"Poller: snapshot of {len(self._dirs)} directories in {time.time() - start:.2f}s"
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+
+    def _list(self, directory):
+        """Return (DirState, subdirectory inodes) for a directory, or None if it is gone"""
+        try:
+            st = os.stat(directory)
+            files = {}
+            subdirs = {}
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.path not in self.ignore:
+                                subdirs[entry.name] = entry.inode()
+                        else:
+                            entry_st = entry.stat(follow_symlinks=False)
+                            files[entry.name] = (entry_st.st_ino, entry_st.st_mtime_ns, entry_st.st_size)
+                    except OSError:
+                        continue
+        except OSError:
+            return None
+        return DirState(st.st_ino, st.st_mtime_ns, files, set(subdirs)), subdirs
+
+    def _scan_tree(self, directory):
+        """Snapshot a directory and everything below it; returns the directories added"""
+        added = []
+        stack = [directory]
+        while stack:
+            path = stack.pop()
+            listed = self._list(path)
+            if listed is None:
+                continue
+            self._dirs[path] = listed[0]
+            added.append(path)
+            stack.extend(os.path.join(path, name) for name in listed[0].subdirs)
+        return added
+
+    def _drop_tree(self, directory):
+        """Forget a directory and everything below it"""
+        prefix = os.path.join(directory, "")
+        for path in [p for p in self._dirs if p == directory or p.startswith(prefix)]:
+            del self._dirs[path]
+
+    def poll(self):
+        """Compare the tree against the snapshot once; returns the number of events dispatched"""
+        self.polls += 1
+        full = self.polls % self.full_scan_every == 0
+        created, deleted, modified = {}, {}, []  # files: inode -> path
+        new_dirs, gone_dirs = {}, {}  # directories: inode -> path
+
+        for directory in list(self._dirs):
+            state = self._dirs.get(directory)
+            if state is None:
+                continue
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                # Gone; the parent's re-listing reports it
+                continue
+
+            if mtime == state.mtime and not full:
+                continue
+
+            listed = self._list(directory)
+            if listed is None:
+                continue
+            self.relisted += 1
+            fresh, subdir_inodes = listed
+            for name, signature in fresh.files.items():
+                path = os.path.join(directory, name)
+                old = state.files.get(name)
+                if old is None:
+                    created[signature[0]] = path
+                elif old[0] != signature[0]:
+                    # Replaced by another file (e.g. a sync client's rename over it)
+                    modified.append(path)
+                elif old != signature:
+                    modified.append(path)
+            for name, signature in state.files.items():
+                if name not in fresh.files:
+                    deleted[signature[0]] = os.path.join(directory, name)
+            for name in fresh.subdirs - state.subdirs:
+                new_dirs[subdir_inodes[name]] = os.path.join(directory, name)
+            for name in state.subdirs - fresh.subdirs:
+                path = os.path.join(directory, name)
+                gone = self._dirs.get(path)
+                gone_dirs[gone.ino if gone else -1] = path
+            state.mtime, state.files, state.subdirs = fresh.mtime, fresh.files, fresh.subdirs
+
+        events = []
+        for ino, src in gone_dirs.items():
+            dest = new_dirs.pop(ino, None)
+            self._drop_tree(src)
+            if dest is not None:
+                self._scan_tree(dest)
+                events.append(DirMovedEvent(src, dest))
+            else:
+                events.append(DirDeletedEvent(src))
+        for dest in new_dirs.values():
+            events.append(DirCreatedEvent(dest))
+            # Files in a new directory may have been moved there from elsewhere
+            for path in self._scan_tree(dest):
+                for name, signature in self._dirs[path].files.items():
+                    created[signature[0]] = os.path.join(path, name)
+        for ino, src in deleted.items():
+            dest = created.pop(ino, None)
+            events.append(FileMovedEvent(src, dest) if dest is not None else FileDeletedEvent(src))
+        events.extend(FileCreatedEvent(path) for path in created.values())
+        events.extend(FileModifiedEvent(path) for path in modified)
+
+        for event in events:
+            try:
+                self.handler.dispatch(event)
+            except Exception as e:
+                logger.error(f"Poller: error dispatching {event}: {str(e)}")
+        self.dispatched += len(events)
+        return len(events)
+
+    def _run(self):
+        """Poll until stopped, backing off while the vault is quiet"""
+        while not self._stop.wait(self.interval):
+            try:
+                changes = self.poll()
+            except Exception as e:
+                logger.error(f"Poller: error polling {self.root}: {str(e)}")
+                continue
+            if changes:
+                self.interval = max(self.min_interval, self.interval / 2)
+            else:
+                self.interval = min(self.max_interval, self.interval * 1.5)
+
+    def stats(self):
+        """Return the snapshot size, poll counters and current interval"""
+        return {
+            "directories": len(self._dirs),
+            "files": sum(len(state.files) for state in list(self._dirs.values())),
+            "polls": self.polls,
+            "relisted": self.relisted,
+            "dispatched": self.dispatched,
+            "interval_s": round(self.interval, 2),
+        }
@@ -0,0 +1,139 @@
+"""
+ORBIT Event Recorder
+--------------------
+Opt-in journal of the raw file events the watchdog receives, kept in the
+vault's .orbit directory so storms and rename cascades can be replayed and
+profiled offline (see the replay suite in orbit_bench.py). The journal starts
+with a JSON header line; every event after it is one compact JSON array:
+
+    [ms since start, kind, flags, size, path, dest path (moves only)]
+
+kind is c(reated), m(odified), d(eleted) or r (moved); flags holds "d" for a
+directory and "e" for an echo of the daemon's own move; size is the file size
+when the event arrived (-1 if it was already gone). Paths are relative to the
+vault, so a journal can be replayed against a copy of it anywhere.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+
+from orbit_events import CREATED, DELETED, MODIFIED, MOVED
+
+logger = logging.getLogger(__name__)
+
+VERSION = 1
+
+KINDS = {CREATED: "c", MODIFIED: "m", DELETED: "d", MOVED: "r"}
+KIND_NAMES = {code: kind for kind, code in KINDS.items()}
+
+# Seconds between flushes of the buffered journal
+FLUSH_INTERVAL = 1.0
+
+
+class EventRecorder:
+    """Appends the raw watchdog events of one vault to an event journal
+
+    The journal is rotated to <path>.1 once it grows past max_bytes. Events
+    under ignore (the daemon's own state directory) are never recorded.
+    """
+
+    def __init__(self, path, vault_path, max_bytes, ignore=()):
+        self.path = str(path)
+        self.vault_path = os.path.abspath(str(vault_path))
+        self.max_bytes = max_bytes
+        self.ignore = tuple(ignore)
+        self._lock = threading.Lock()
+        self._file = None
+        self._started = None
+        self._flushed = 0.0
+        self.recorded = 0
+        self.rotations = 0
+
+    def open(self):
+        """Start a new journal (any previous one is rotated out)"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._lock:
+            self._rotate()
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def _rotate(self):
+        """Move the current journal to <path>.1 and start a fresh one"""
+        if self._file:
+            self._file.close()
+        if os.path.exists(self.path) and os.path.getsize(self.path):
+            os.replace(self.path, f"{self.path}.1")
+            self.rotations += 1
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._started = time.time()
+        header = {"orbit_events": VERSION, "vault": self.vault_path, "started": self._started}
+        self._file.write(json.dumps(header) + "\n")
+        self._flushed = time.monotonic()
+
+    def _relative(self, path):
+        return os.path.relpath(os.path.abspath(path), self.vault_path)
+
+    def record(self, event, timestamp, echo=False):
+        """Append one watchdog event that arrived at timestamp (time.time())"""
+        path = os.path.abspath(event.src_path)
+        dest_path = os.path.abspath(event.dest_path) if event.event_type == MOVED else None
+        if path.startswith(self.ignore) and (dest_path or path).startswith(self.ignore):
+            return
+        kind = KINDS.get(event.event_type)
+        if kind is None:
+            return
+        try:
+            size = os.stat(dest_path or path).st_size
+        except OSError:
+            size = -1
+        flags = ("d" if event.is_directory else "") + ("e" if echo else "")
+
+        with self._lock:
+            if self._file is None:
+                return
+            entry = [round((timestamp - self._started) * 1e3, 1), kind, flags, size, self._relative(path)]
+            if dest_path:
+                entry.append(self._relative(dest_path))
+            try:
+                self._file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+                self.recorded += 1
+                now = time.monotonic()
+                if now - self._flushed >= FLUSH_INTERVAL:
+                    self._file.flush()
+                    self._flushed = now
+                if self._file.tell() >= self.max_bytes:
+                    self._rotate()
+            except Exception as e:
+                logger.error(f"Error recording event for {path}: {str(e)}")
+
+    def stats(self):
+        return {"recorded": self.recorded, "rotations": self.rotations}
+
+
+def read_events(path):
+    """Read an event journal; returns (header, [(seconds, kind, is_dir, echo, size, path, dest)])
+
+    Paths are relative to the recorded vault and kinds are the watchdog
+    event types. A truncated last line (e.g. after a crash) is skipped.
+    """
+    events = []
+    with open(path, 'r', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        if header.get("orbit_events") != VERSION:
+            raise ValueError(f"{path} is not an ORBIT event journal")
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            offset, kind, flags, size, src = entry[:5]
+            dest = entry[5] if len(entry) > 5 else None
+            events.append((offset / 1e3, KIND_NAMES[kind], "d" in flags, "e" in flags, size, src, dest))
+    return header, events
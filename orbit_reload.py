@@ -0,0 +1,165 @@
+"""
+ORBIT Config Reload
+-------------------
+Watches orbit_config.py while the watchdog runs. A changed file is loaded
+into a fresh module and validated; if it passes, the changed settings are
+swapped into the live configuration in one step and each vault re-derives
+only what depends on them: renamed properties are re-extracted from the
+frontmatter kept in the store, and only the notes whose routing could change
+are re-routed. Settings that only take effect on a restart keep their old
+values until then. A config that fails to load or validate is logged and
+ignored.
+"""
+
+import os
+import logging
+import threading
+import importlib.util
+
+logger = logging.getLogger(__name__)
+
+# Settings naming the frontmatter properties the store and note table extract
+PROPERTY_SETTINGS = frozenset(("prop_object", "prop_orbit", "prop_stage", "prop_domain", "prop_created"))
+
+# Settings that decide where an orbiting note is filed
+ROUTING_SETTINGS = frozenset(("hidden_inbox", "stage_dirs", "source_dir_name"))
+
+# Settings for the near-miss matches used by queries and suggestions
+MATCHING_SETTINGS = frozenset(("fuzzy_orbit_match", "fuzzy_match_ratio"))
+
+# Settings that are only read at startup
+RESTART_SETTINGS = frozenset((
+    "vault_path", "vaults_file", "hidden_index", "index_db_name", "journal_name",
+    "event_log_name", "stats_file_name", "setup_manifest_name", "worker_count",
+    "parse_cache_size", "coalesce_max_entries", "use_polling", "materialized_views",
+    "maintain_satellites", "record_events", "event_log_max_bytes", "journal_max_bytes",
+    "stats_host", "stats_port", "stats_interval", "note_api", "config_reload",
+    "config_reload_interval", "log_level", "log_file", "log_format", "log_max_bytes",
+    "log_backup_count", "log_rate_limit", "log_rate_period",
+))
+
+# Settings that must be non-negative numbers
+NUMBER_SETTINGS = (
+    "debounce_time", "settle_time", "coalesce_ttl", "batch_enter_rate", "batch_exit_rate",
+    "batch_quiet_time", "batch_max_wait", "poll_min_interval", "poll_max_interval",
+    "view_settle_time", "stats_interval", "fuzzy_match_ratio",
+)
+
+
+def load_config_file(path):
+    """Execute a config file in a fresh module and return its config dict"""
+    spec = importlib.util.spec_from_file_location("orbit_config_reloaded", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    settings = getattr(module, "config", None)
+    if not isinstance(settings, dict):
+        raise ValueError(f"{path} does not define a config dict")
+    return settings
+
+
+def validate_config(settings, current):
+    """Raise ValueError listing every problem with a new config"""
+    problems = [f"{key} is missing" for key in current if key not in settings]
+
+    def number(key):
+        value = settings.get(key)
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+    for key in NUMBER_SETTINGS:
+        if key in settings and not (number(key) and settings[key] >= 0):
+            problems.append(f"{key} must be a non-negative number")
+    if number("fuzzy_match_ratio") and settings["fuzzy_match_ratio"] > 1:
+        problems.append("fuzzy_match_ratio must be at most 1")
+    if number("batch_exit_rate") and number("batch_enter_rate") and settings["batch_exit_rate"] > settings["batch_enter_rate"]:
+        problems.append("batch_exit_rate must not exceed batch_enter_rate")
+
+    names = [settings.get(key) for key in sorted(PROPERTY_SETTINGS | {"prop_satellites"})]
+    if not all(isinstance(name, str) and name for name in names):
+        problems.append("property names must be non-empty strings")
+    elif len(set(names)) != len(names):
+        problems.append("property names must be distinct")
+
+    domains = settings.get("domains")
+    if not isinstance(domains, dict) or not all(isinstance(name, str) and name for name in domains.values()):
+        problems.append("domains must map numbers to names")
+    stage_dirs = settings.get("stage_dirs")
+    if not isinstance(stage_dirs, dict) or not all(isinstance(name, str) and name for name in stage_dirs.values()):
+        problems.append("stage_dirs must map stages to directory names")
+    for key in ("hidden_inbox", "source_dir_name"):
+        value = settings.get(key)
+        if value and (not isinstance(value, str) or os.sep in value):
+            problems.append(f"{key} must be a directory name")
+    if not settings.get("source_dir_name"):
+        problems.append("source_dir_name must not be empty")
+
+    if problems:
+        raise ValueError("; ".join(problems))
+
+
+def changed_settings(old, new):
+    """Return the keys whose values differ (path helpers are ignored)"""
+    return {
+        key for key, value in new.items()
+        if key in old and not callable(value) and old[key] != value
+    }
+
+
+class ConfigWatcher:
+    """Polls the config file and hands each valid new version to on_reload
+
+    Polling one file's stat signature is cheap, and works wherever the config
+    lives (it is usually outside the watched vaults).
+    """
+
+    def __init__(self, path, current, on_reload, interval):
+        self.path = str(path)
+        self.current = current
+        self.on_reload = on_reload
+        self.interval = interval
+        self.reloads = 0
+        self.rejected = 0
+        self._signature = self._stat()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="orbit-config", daemon=True)
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def check(self):
+        """Reload the config if the file changed; returns True if a new version was applied"""
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return False
+        self._signature = signature
+        try:
+            settings = load_config_file(self.path)
+            validate_config(settings, self.current)
+        except Exception as e:
+            self.rejected += 1
+            logger.error(f"Ignoring changed config {self.path}: {str(e)}")
+            return False
+        try:
+            self.on_reload(settings)
+        except Exception as e:
+            logger.error(f"Error applying reloaded config: {str(e)}")
+            return False
+        self.reloads += 1
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def stats(self):
+        return {"reloads": self.reloads, "rejected": self.rejected}
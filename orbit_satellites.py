@@ -0,0 +1,101 @@
+"""
+ORBIT Satellites
+----------------
+Keeps each project's `satellites` frontmatter list in step with the notes
+that orbit it. Which notes orbit which project comes from the orbit graph;
+whenever a project's children change it is rewritten at most once per settle
+window, atomically, and without triggering the daemon's own reprocessing.
+"""
+
+import os
+import logging
+
+from orbit_config import config
+from orbit_events import SettleScheduler, replace_own_file
+from orbit_frontmatter import flow_list, read_frontmatter, set_property
+
+logger = logging.getLogger(__name__)
+
+
+class SatelliteMaintainer:
+    """Rewrites projects' satellites lists from the orbit graph"""
+
+    def __init__(self, vault_path, store, graph, moves, settle_time):
+        self.store = store
+        self.graph = graph
+        # Our own writes are registered like moves, so their events are dropped
+        self.moves = moves
+        self.tmp_dir = os.path.join(os.path.abspath(vault_path), ".orbit", "tmp")
+        self.writes = 0
+        self.scheduler = SettleScheduler(self.write, settle_time)
+
+    def start(self):
+        """Bring every project's list up to date in the background"""
+        self.scheduler.start()
+        for project in self._projects():
+            self.scheduler.schedule(project)
+
+    def stop(self):
+        self.scheduler.stop()
+
+    def _projects(self):
+        """Every project note plus every note something orbits"""
+        projects = set(self.store.paths_with_object(("project",)))
+        projects.update(self.graph.orbited())
+        return projects
+
+    def write_all(self):
+        """Rewrite every project now (used by one-shot modes)"""
+        for project in self._projects():
+            self.write(project)
+
+    def touch(self, *projects):
+        """Schedule a rewrite of projects whose satellites changed"""
+        for project in projects:
+            self.scheduler.schedule(project)
+
+    def satellites_of(self, project):
+        """Return the sorted satellite names of a project"""
+        names = {os.path.basename(note)[:-3] for note in self.graph.children(project)}
+        return sorted(names, key=lambda name: (name.lower(), name))
+
+    def write(self, project):
+        """Rewrite a project's satellites property if it is out of date"""
+        try:
+            try:
+                st = os.stat(project)
+                frontmatter = read_frontmatter(project)
+                with open(project, 'r', encoding='utf-8') as f:
+                    text = f.read()
+            except FileNotFoundError:
+                return
+            if not isinstance(frontmatter, dict):
+                return
+            key = config["prop_satellites"]
+            if frontmatter.get(config["prop_object"]) != "project" and key not in frontmatter:
+                return
+
+            names = self.satellites_of(project)
+            current = frontmatter.get(key) or []
+            if isinstance(current, str):
+                current = [current]
+            if [str(name) for name in current] == names:
+                return
+
+            updated = set_property(text, key, flow_list(names))
+            if updated is None or updated == text:
+                return
+            if not replace_own_file(project, updated, (st.st_mtime_ns, st.st_size), self.moves, self.tmp_dir):
+                # Edited while we were reading it; try again once it settles
+                self.scheduler.schedule(project)
+                return
+            self.store.record(project, {**frontmatter, key: names})
+            self.writes += 1
+            logger.info(f"Updated satellites of {project}: {len(names)} notes", extra={"path": project})
+
+        except Exception as e:
+            logger.error(f"Error updating satellites of {project}: {str(e)}")
+
+    def stats(self):
+        """Return the number of pending rewrites and writes"""
+        return {"pending": self.scheduler.pending(), "writes": self.writes}
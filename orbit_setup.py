@@ -1,215 +1,283 @@
+"""
+ORBIT Setup
+-----------
+Creates the vault structure (domain directories and their inboxes) and
+renders the generated files (domain dashboards, domain indexes, the
+navigation page and the vault's copy of the templates) from the template
+files in Templates/.
+
+Every generated file is recorded in a manifest in .orbit/ with the hash of
+what was written, so re-running setup only writes what changed: missing files
+are created, generated files whose template or inputs changed are
+re-rendered, and files edited since they were generated are left alone.
+The tables the watchdog maintains between orbit markers don't count as edits
+and are carried over when a file is re-rendered. Files setup no longer
+generates (e.g. the dashboard of a domain removed from DOMAINS) are reported
+as stale. The filesystem work runs on a thread pool.
+"""
+
 import os
+import re
 import sys
-import shutil
+import json
 import time
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import logging
-import yaml
 from datetime import datetime
-from orbit_config import config
-
-# Setup logging
-logging.basicConfig(
-    level=getattr(logging, config["log_level"]),
-    format='%(asctime)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S',
-    filename=config["log_file"],
-    filemode='a'
-)
-logger = logging.getLogger(__name__)
-console = logging.StreamHandler()
-console.setLevel(getattr(logging, config["log_level"]))
-formatter = logging.Formatter('%(asctime)s - %(message)s')
-console.setFormatter(formatter)
-logger.addHandler(console)
-
-def create_directory_structure():
-    """Create the basic directory structure for the ORBIT system."""
-    vault_path = Path(config["vault_path"])
-    
-    # Create .orbit directory for system files
-    orbit_dir = vault_path / ".orbit"
-    orbit_dir.mkdir(exist_ok=True)
-    
-    # Create fallback directory
-    fallback_path = config["get_fallback_path"]()
-    fallback_path.mkdir(exist_ok=True, parents=True)
-    
-    # Ensure Templates directory exists
-    templates_dir = vault_path / "Templates"
-    templates_dir.mkdir(exist_ok=True)
-    
-    # Create domain directories with minimal structure
-    for domain_num, domain_name in config["domains"].items():
-        domain_dir = vault_path / f"{domain_num}-{domain_name}"
-        domain_dir.mkdir(exist_ok=True)
-        
-        # Create the inbox directory in each domain
-        inbox_dir = domain_dir / config["hidden_inbox"]
-        inbox_dir.mkdir(exist_ok=True)
-    
-    # Create navigation file
-    create_orbit_navigation(vault_path)
-    
-    logger.info("ORBIT directory structure setup complete!")
-    logger.info(f"Vault path: {vault_path}")
-
-def copy_templates(templates_dir):
-    """Copy template files from this script's directory to the vault templates directory"""
-    script_dir = Path(__file__).parent
-    template_source_dir = script_dir / "Templates"
-    
-    if template_source_dir.exists():
-        # Copy each template file
-        for template_file in template_source_dir.glob('*.md'):
-            dest_file = templates_dir / template_file.name
-            try:
-                shutil.copy2(template_file, dest_file)
-                logger.info(f"Copied template: {template_file.name}")
-            except Exception as e:
-                logger.error(f"Error copying template {template_file.name}: {str(e)}")
+from orbit_config import config, load_vaults
+from orbit_logging import setup_logging
+from orbit_views import MARKER, block
+
+# Setup logging (queued, rotated, rate-limited per file)
+logger = setup_logging(__name__)
+
+TEMPLATE_SOURCE_DIR = Path(__file__).parent / "Templates"
+
+DASHBOARD_TEMPLATE = "domaindashboard.md"
+INDEX_TEMPLATE = "folderindex.md"
+NAVIGATION_TEMPLATE = "orbitnavigation.md"
+
+# The Templater expressions setup can fill in: dates, the file title and its folder
+TEMPLATER = re.compile(r"<%\s*tp\.(?P<call>[\w.]+)(?:\((?P<args>[^)]*)\))?\s*%>")
+MOMENT_TOKENS = (("YYYY", "%Y"), ("MM", "%m"), ("DD", "%d"), ("HH", "%H"), ("mm", "%M"), ("ss", "%S"))
+
+CREATED = "created"
+UPDATED = "updated"
+UNCHANGED = "unchanged"
+MODIFIED = "modified"
+SKIPPED = "skipped"
+
+def moment_format(fmt):
+    """strftime format for a moment.js date format such as YYYY-MM-DD"""
+    for token, directive in MOMENT_TOKENS:
+        fmt = fmt.replace(token, directive)
+    return fmt
+
+def render_template(text, title, created):
+    """Fill in the Templater expressions of a template; others are left as they are"""
+    def replace(match):
+        call = match.group("call")
+        args = (match.group("args") or "").strip().strip("'\"")
+        if call in ("date.now", "file.creation_date"):
+            return created.strftime(moment_format(args or "YYYY-MM-DD"))
+        if call in ("file.title", "file.folder"):
+            return title
+        return match.group(0)
+
+    return TEMPLATER.sub(replace, text)
+
+def fill_sections(text, sections):
+    """Replace the bodies of the named orbit marker sections"""
+    def replace(match):
+        name = match.group("name")
+        return block(name, sections[name]) if name in sections else match.group(0)
+
+    return MARKER.sub(replace, text)
+
+def section_bodies(text):
+    """Return {name: body} of the orbit marker sections in a file"""
+    bodies = {}
+    for match in MARKER.finditer(text):
+        start = match.group(0).index("\n") + 1
+        bodies[match.group("name")] = match.group(0)[start:-len(f"<!-- orbit:{match.group('name')}:end -->")]
+    return bodies
+
+def content_hash(text, own=()):
+    """Hash of a generated file, ignoring the marker sections the watchdog fills in"""
+    text = MARKER.sub(
+        lambda match: match.group(0) if match.group("name") in own else block(match.group("name"), ""), text
+    )
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def planned_artifacts(vault):
+    """Every file setup generates: (path relative to the vault, template, title, sections)
+
+    A title of None copies the template verbatim. sections fills in
+    marker sections owned by setup rather than the watchdog.
+    """
+    artifacts = [
+        (f"Templates/{template.name}", template.name, None, None)
+        for template in sorted(TEMPLATE_SOURCE_DIR.glob('*.md'))
+    ]
+    links = ""
+    for domain_num, domain_name in vault["domains"].items():
+        domain_dir = f"{domain_num}-{domain_name}"
+        artifacts.append((f"{domain_dir}/{domain_name}.md", DASHBOARD_TEMPLATE, domain_name, None))
+        artifacts.append((f"{domain_dir}/{vault['hidden_index']}", INDEX_TEMPLATE, domain_name, None))
+        links += f"- [[{domain_dir}/{domain_name}|{domain_num} {domain_name}]]\n"
+    artifacts.append(("ORBIT-Navigation.md", NAVIGATION_TEMPLATE, "ORBIT Navigation", {"domains": links}))
+    return artifacts
+
+def planned_directories(vault):
+    """Every directory setup creates"""
+    vault_path = Path(vault["vault_path"])
+    directories = [vault_path / ".orbit", vault["get_fallback_path"](), vault_path / "Templates"]
+    for domain_num, domain_name in vault["domains"].items():
+        directories.append(vault_path / f"{domain_num}-{domain_name}" / vault["hidden_inbox"])
+    return directories
+
+def load_manifest(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get("files", {})
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        logger.warning(f"Ignoring unreadable setup manifest {path}: {str(e)}")
+        return {}
+
+def save_manifest(path, files):
+    """Atomically rewrite the manifest"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"version": 1, "files": files}, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def write_file(path, text):
+    """Atomically write a generated file; returns its manifest stat fields"""
+    tmp_path = f"{path}.orbit-tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+    st = os.stat(path)
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+def sync_artifact(vault_path, artifact, entry, templates, force=False):
+    """Bring one generated file up to date; returns (status, manifest entry or None)"""
+    relative, template, title, sections = artifact
+    path = os.path.join(vault_path, relative)
+    own = tuple(sections or ())
+    # Re-renders keep the creation date of the first run, so unchanged inputs render identically
+    if entry:
+        created = datetime.strptime(entry["created"], "%Y-%m-%dT%H:%M:%S")
     else:
-        logger.warning(f"Template source directory not found: {template_source_dir}")
-        print(f"Warning: Template source directory not found. Please make sure the Templates directory exists in: {script_dir}")
-
-def create_domain_dashboard(domain_dir, domain_name, domain_number):
-    """Create a domain dashboard file"""
-    dashboard_path = domain_dir / f"{domain_name}.md"
-    
-    if not dashboard_path.exists():
-        # Create domain dashboard content
-        dashboard_content = f"""---
-object: domain
-created: {datetime.now().strftime("%Y-%m-%d")}
-domain: {domain_name}
-track_number: 7
----
-
-# {domain_name} Dashboard
-
-## Overview
-
-Main dashboard for {domain_name} domain.
-
-## Create
-
-```button
-name Create Relating Note
-type append template
-action C1yaml
-```
-
-```button
-name Create Satelliting Directory 
-type append template
-action Create Satelliting Directory
-```
-
-```button
-name Create Orbiting Directory
-type append template
-action Create Orbiting Directory
-```
-
-## Designated Projects
-
-```dataview
-TABLE satellites as "Sub-Projects", created
-FROM "{str(domain_dir.relative_to(Path(config['vault_path'])))}"
-WHERE object = "project" AND contains(file.folder, "{str(domain_dir.relative_to(Path(config['vault_path'])))}")
-SORT file.name ASC
-```
-
-## Inbox Projects
-
-```dataview
-TABLE orbits as "Parent Projects", created
-FROM "{str(domain_dir.relative_to(Path(config['vault_path'])))}/.0-inbox"
-WHERE object = "project"
-SORT file.name ASC
-```
-
-## Notes in Inbox
-
-```dataview
-TABLE object, orbits as "Projects", created
-FROM "{str(domain_dir.relative_to(Path(config['vault_path'])))}/.0-inbox"
-WHERE object != "project" AND object != "domain"
-SORT created DESC
-LIMIT 10
-```
-
-## Recent Activity
-
-```dataview
-TABLE object, orbits as "Projects", created
-FROM "{str(domain_dir.relative_to(Path(config['vault_path'])))}"
-WHERE object != "project" AND object != "domain"
-SORT created DESC
-LIMIT 10
-```
-"""
-        
-        # Write domain dashboard
-        dashboard_path.write_text(dashboard_content)
-        logger.info(f"Created domain dashboard: {dashboard_path}")
+        created = datetime.now().replace(microsecond=0)
+    text = templates[template]
+    if title is not None:
+        text = fill_sections(render_template(text, title, created), sections or {})
+    digest = content_hash(text, own)
+    fields = {
+        "template": template,
+        "created": created.strftime("%Y-%m-%dT%H:%M:%S"),
+        "hash": digest,
+        # The sections the hash covers, so a later prune hashes the file the same way
+        "sections": sorted(own),
+    }
 
-def create_orbit_navigation(vault_path):
-    """Create the main navigation file for the ORBIT system."""
-    nav_content = """# ORBIT Navigation
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return CREATED, dict(fields, **write_file(path, text))
 
-## Domains
-"""
-    
-    # Add domain navigation
-    for domain_num, domain_name in config["domains"].items():
-        nav_content += f"- [[{domain_num}-{domain_name}/{domain_name}|{domain_num} {domain_name}]]\n"
-    
-    nav_content += """
-## Quick Create
-
-```button
-name Create Relating Note
-type append template
-action C1yaml
-```
-
-```button
-name Create Satelliting Directory 
-type append template
-action Create Satelliting Directory
-```
-
-```button
-name Create Orbiting Directory
-type append template
-action Create Orbiting Directory
-```
-
-## Stage Management
-- [[Set Stage to 0|Move to Inbox]]
-"""
-    
-    nav_path = vault_path / "ORBIT-Navigation.md"
-    if not nav_path.exists():
-        nav_path.write_text(nav_content)
-        logger.info(f"Created navigation file: {nav_path}")
+    untouched = entry and (st.st_mtime_ns, st.st_size) == (entry.get("mtime_ns"), entry.get("size"))
+    if untouched and digest == entry["hash"]:
+        # Up to date and untouched since the last run
+        return UNCHANGED, dict(entry, **fields)
+
+    with open(path, 'r', encoding='utf-8') as f:
+        current = f.read()
+    current_hash = content_hash(current, own)
+    stat_fields = {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+    if entry is None and current_hash != digest and not force:
+        # Not written by setup (e.g. an older dashboard); leave it alone
+        return SKIPPED, None
+    if entry is not None and current_hash != entry["hash"] and not force:
+        return MODIFIED, entry
+    if current_hash == digest:
+        # Only the watchdog's tables changed
+        return UNCHANGED, dict(fields, **stat_fields)
+
+    # Keep the tables the watchdog has filled in
+    kept = {name: body for name, body in section_bodies(current).items() if name not in own}
+    return UPDATED, dict(fields, **write_file(path, fill_sections(text, kept)))
+
+def prune_artifact(vault_path, relative, entry):
+    """Remove a stale generated file unless it was edited; returns True if it is gone"""
+    path = os.path.join(vault_path, relative)
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return True
+    if (st.st_mtime_ns, st.st_size) != (entry.get("mtime_ns"), entry.get("size")):
+        with open(path, 'r', encoding='utf-8') as f:
+            if content_hash(f.read(), tuple(entry.get("sections", ()))) != entry["hash"]:
+                return False
+    os.remove(path)
+    return True
+
+def create_directory_structure(vault=None, force=False, prune=False):
+    """Create the directory structure and generated files of a vault; returns a count per status"""
+    vault = vault or config
+    vault_path = str(vault["vault_path"])
+    start = time.perf_counter()
+
+    templates = {}
+    for template in TEMPLATE_SOURCE_DIR.glob('*.md'):
+        templates[template.name] = template.read_text(encoding='utf-8')
+    for name in (DASHBOARD_TEMPLATE, INDEX_TEMPLATE, NAVIGATION_TEMPLATE):
+        if name not in templates:
+            raise FileNotFoundError(f"Template {name} not found in {TEMPLATE_SOURCE_DIR}")
+
+    manifest_path = vault["get_setup_manifest_path"]()
+    manifest = load_manifest(manifest_path)
+    artifacts = planned_artifacts(vault)
+
+    with ThreadPoolExecutor(max_workers=config["worker_count"]) as pool:
+        list(pool.map(lambda directory: directory.mkdir(parents=True, exist_ok=True), planned_directories(vault)))
+        results = list(pool.map(
+            lambda artifact: sync_artifact(vault_path, artifact, manifest.get(artifact[0]), templates, force),
+            artifacts
+        ))
+
+    counts = {CREATED: 0, UPDATED: 0, UNCHANGED: 0, MODIFIED: 0, SKIPPED: 0, "stale": 0, "pruned": 0}
+    files = {}
+    for (relative, _, _, _), (status, entry) in zip(artifacts, results):
+        counts[status] += 1
+        if entry is not None:
+            files[relative] = entry
+        if status in (CREATED, UPDATED):
+            logger.info(f"Setup {status} {relative}")
+        elif status == MODIFIED:
+            logger.warning(f"Setup left {relative} alone: edited since it was generated (use --force)")
+        elif status == SKIPPED:
+            logger.warning(f"Setup left {relative} alone: it was not generated by setup (use --force)")
+
+    for relative, entry in manifest.items():
+        if relative in files:
+            continue
+        if prune and prune_artifact(vault_path, relative, entry):
+            counts["pruned"] += 1
+            logger.info(f"Setup removed stale {relative}")
+            continue
+        counts["stale"] += 1
+        files[relative] = entry
+        logger.warning(f"Setup no longer generates {relative} (use --prune to remove it)")
 
-def check_required_plugins():
+    if files != manifest:
+        save_manifest(manifest_path, files)
+
+    logger.info(f"ORBIT setup of {vault_path} done in {time.perf_counter() - start:.3f}s: {counts}")
+    return counts
+
+def check_required_plugins(vault=None):
     """Check if the required Obsidian plugins are likely installed"""
-    obsidian_config = Path(config["vault_path"]) / ".obsidian"
+    vault = vault or config
+    obsidian_config = Path(vault["vault_path"]) / ".obsidian"
     plugins_folder = obsidian_config / "plugins"
-    
+
     required_plugins = [
         "templater-obsidian",
         "buttons",
         "folder-note-core"
     ]
-    
+
     if plugins_folder.exists():
         installed_plugins = [d.name for d in plugins_folder.iterdir() if d.is_dir()]
         missing_plugins = [p for p in required_plugins if p not in installed_plugins]
-        
+
         if missing_plugins:
             print("WARNING: The following recommended plugins may not be installed:")
             for plugin in missing_plugins:
@@ -225,46 +293,64 @@ def check_required_plugins():
 
 def main():
     """Main function to set up the ORBIT system."""
+    parser = argparse.ArgumentParser(description="Set up the ORBIT structure in a vault")
+    parser.add_argument(
+        "--force", action="store_true",
+        help="also re-render generated files that were edited, and files setup did not generate"
+    )
+    parser.add_argument(
+        "--prune", action="store_true",
+        help="remove generated files setup no longer produces, unless they were edited"
+    )
+    parser.add_argument(
+        "--vaults", metavar="FILE", default=config["vaults_file"],
+        help="YAML file listing the vaults to set up (default: VAULTS_FILE, else VAULT_PATH)"
+    )
+    args = parser.parse_args()
     print("Setting up ORBIT system...")
-    
-    # Verify vault path
-    vault_path = Path(config["vault_path"])
-    if not vault_path.exists():
-        logger.error(f"Vault path does not exist: {vault_path}")
-        print(f"ERROR: Vault path does not exist: {vault_path}")
-        print("Please update the VAULT_PATH in orbit_config.py to a valid path.")
-        return
-    
-    # Create basic structure
+
     try:
-        create_directory_structure()
-        
-        # Check for required plugins
-        check_required_plugins()
-        
-        print("\nORBIT system setup complete!")
-        print("\nStructure created:")
-        print("- Domain directories (0-Origins, 1-Self, etc.)")
-        print("- Inbox directory (.0-inbox) in each domain")
-        print("- ORBIT-Navigation.md")
-        
-        print("\nNext steps:")
-        print("1. Ensure your templates are correctly set up in the Templates directory:")
-        print("   - C1yaml.md")
-        print("   - Create Satelliting Directory.md")
-        print("   - Create Orbiting Directory.md")
-        print("   - index.md")
-        print("2. Start the ORBIT watcher: python orbit_watchdog.py")
-        print("3. Create notes with proper frontmatter in your Obsidian vault")
-        print("4. The system will automatically organize notes based on their orbits and stage")
-        print("5. Use the index template to manually create folder indices when needed")
-    
-    except KeyboardInterrupt:
-        print("\nSetup aborted by user.")
-    except Exception as e:
-        logger.error(f"Error during setup: {str(e)}")
-        print(f"\nERROR during setup: {str(e)}")
-        print("Please check the log file for details.")
+        vaults = load_vaults(args.vaults)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    for vault in vaults:
+        # Verify vault path
+        vault_path = Path(vault["vault_path"])
+        if not vault_path.exists():
+            logger.error(f"Vault path does not exist: {vault_path}")
+            print(f"ERROR: Vault path does not exist: {vault_path}")
+            print("Please update the VAULT_PATH in orbit_config.py to a valid path.")
+            return 1
+
+        # Create basic structure
+        try:
+            counts = create_directory_structure(vault, args.force, args.prune)
+
+            # Check for required plugins
+            check_required_plugins(vault)
+
+            print(f"\nORBIT system setup complete for {vault_path}!")
+            print(", ".join(f"{count} {status}" for status, count in counts.items() if count))
+            if counts[MODIFIED] or counts[SKIPPED]:
+                print("Some files were left alone because they were edited; see the log (--force overwrites them).")
+            if counts["stale"]:
+                print("Some generated files are stale; see the log (--prune removes them).")
+
+        except KeyboardInterrupt:
+            print("\nSetup aborted by user.")
+            return 1
+        except Exception as e:
+            logger.error(f"Error during setup: {str(e)}")
+            print(f"\nERROR during setup: {str(e)}")
+            print("Please check the log file for details.")
+            return 1
+
+    print("\nNext steps:")
+    print("1. Start the ORBIT watcher: python orbit_watchdog.py")
+    print("2. Create notes with proper frontmatter in your Obsidian vault")
+    print("3. The system will automatically organize notes based on their orbits and stage")
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
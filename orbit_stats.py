@@ -0,0 +1,354 @@
+"""
+ORBIT Stats
+-----------
+Counters and per-stage timing histograms for the watchdog, exposed through a
+periodically rewritten JSON file in .orbit/ and a Prometheus text endpoint
+on localhost. The same local server answers the daemon's JSON queries. A
+daemon watching several vaults keeps one Stats per vault, labelled with the
+vault's name, and serves them as one set of metrics.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the timing histogram buckets
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PREFIX = "orbit"
+
+# Largest request body the local server accepts (bulk note creation)
+MAX_BODY = 64 * 1024 * 1024
+
+
+class Histogram:
+    """Cumulative-bucket timing histogram in the Prometheus style"""
+
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                break
+        else:
+            i = len(BUCKETS)
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def cumulative(self):
+        """Return [(upper bound label, cumulative count)], ending with +Inf"""
+        total = 0
+        result = []
+        for bound, count in zip(BUCKETS + (float("inf"),), self.counts):
+            total += count
+            result.append(("+Inf" if bound == float("inf") else repr(bound), total))
+        return result
+
+    def quantile(self, q):
+        """Estimate a quantile as the upper bound of the bucket it falls in"""
+        if not self.count:
+            return None
+        target = q * self.count
+        total = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            total += count
+            if total >= target:
+                return bound
+        return float("inf")
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+
+class Stats:
+    """Thread-safe registry of counters, timing histograms and gauges
+
+    labels (e.g. {"vault": name}) are added to every series it reports.
+    """
+
+    def __init__(self, labels=None):
+        self.labels = _labels(labels or {})
+        self._lock = threading.Lock()
+        self._counters = {}  # (name, labels) -> int
+        self._histograms = {}  # name -> Histogram
+        self._gauges = {}  # name -> callable returning a number
+        self._collectors = {}  # prefix -> callable returning {name: number}
+        self._trace = threading.local()
+        self.started = time.time()
+
+    def incr(self, name, n=1, **labels):
+        """Add n to a counter"""
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + n
+
+    def observe(self, name, seconds):
+        """Record one timing sample (seconds) for a stage"""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name):
+        """Time the enclosed block into the named stage histogram"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe(name, elapsed)
+            timings = getattr(self._trace, "timings", None)
+            if timings is not None:
+                timings[name] = round(timings.get(name, 0) + elapsed * 1e3, 3)
+
+    @contextmanager
+    def trace(self):
+        """Also collect this thread's stage timings (ms) into the yielded dict"""
+        previous = getattr(self._trace, "timings", None)
+        self._trace.timings = timings = {}
+        try:
+            yield timings
+        finally:
+            self._trace.timings = previous
+
+    def gauge(self, name, func):
+        """Register a gauge whose value is read from func() when reported"""
+        with self._lock:
+            self._gauges[name] = func
+
+    def collect(self, prefix, func):
+        """Register a callable returning a dict of values reported as prefix_<key> gauges"""
+        with self._lock:
+            self._collectors[prefix] = func
+
+    def _gauge_values(self):
+        """Read every gauge and collector; failures are skipped"""
+        with self._lock:
+            gauges = dict(self._gauges)
+            collectors = dict(self._collectors)
+        values = {}
+        for name, func in gauges.items():
+            try:
+                values[name] = func()
+            except Exception:
+                continue
+        for prefix, func in collectors.items():
+            try:
+                for key, value in func().items():
+                    values[f"{prefix}_{key}"] = value
+            except Exception:
+                continue
+        return values
+
+    def snapshot(self):
+        """Return all stats as a JSON-serializable dict"""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {
+                name: (h.count, h.sum, h.cumulative(), h.quantile(0.5), h.quantile(0.99))
+                for name, h in self._histograms.items()
+            }
+        result = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "uptime_s": round(time.time() - self.started, 1),
+            "counters": {},
+            "timings": {},
+            "gauges": self._gauge_values(),
+        }
+        for (name, labels), value in sorted(counters.items()):
+            label_text = ",".join(f"{key}={val}" for key, val in labels)
+            result["counters"][f"{name}[{label_text}]" if label_text else name] = value
+        for name, (count, total, buckets, p50, p99) in sorted(histograms.items()):
+            result["timings"][name] = {
+                "count": count,
+                "sum_s": round(total, 6),
+                "mean_ms": round(total / count * 1e3, 3) if count else None,
+                "p50_le_s": p50,
+                "p99_le_s": p99,
+                "buckets": dict(buckets),
+            }
+        return result
+
+    def families(self):
+        """Return {(metric, type): [sample lines]} in the Prometheus text format"""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {name: (h.count, h.sum, h.cumulative()) for name, h in self._histograms.items()}
+        families = {}
+        for (name, labels), value in sorted(counters.items()):
+            metric = f"{PREFIX}_{name}_total"
+            families.setdefault((metric, "counter"), []).append(
+                f"{metric}{_format_labels(self.labels, labels)} {value}")
+        for name, (count, total, buckets) in sorted(histograms.items()):
+            metric = f"{PREFIX}_{name}_seconds"
+            lines = families.setdefault((metric, "histogram"), [])
+            for bound, cumulative in buckets:
+                lines.append(f"{metric}_bucket{_format_labels(self.labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{metric}_sum{_format_labels(self.labels)} {total}")
+            lines.append(f"{metric}_count{_format_labels(self.labels)} {count}")
+        for name, value in sorted(self._gauge_values().items()):
+            if isinstance(value, (int, float)):
+                value = int(value) if isinstance(value, bool) else value
+                metric = f"{PREFIX}_{name}"
+                families.setdefault((metric, "gauge"), []).append(f"{metric}{_format_labels(self.labels)} {value}")
+        return families
+
+    def render_prometheus(self):
+        """Return all stats in the Prometheus text exposition format"""
+        return render_prometheus([self])
+
+
+def render_prometheus(stats_list):
+    """Render several Stats (one per vault) as one exposition, one TYPE line per metric"""
+    merged = {}
+    for stats in stats_list:
+        for family, lines in stats.families().items():
+            merged.setdefault(family, []).extend(lines)
+    lines = []
+    for (metric, kind), samples in sorted(merged.items()):
+        lines.append(f"# TYPE {metric} {kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+def write_stats_file(stats, path):
+    """Atomically rewrite the stats file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(stats.snapshot(), f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class StatsWriter:
+    """Background thread that rewrites the stats file every interval seconds"""
+
+    def __init__(self, stats, path, interval):
+        self.stats = stats
+        self.path = str(path)
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="orbit-stats", daemon=True)
+
+    def start(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._write()
+
+    def _write(self):
+        try:
+            write_stats_file(self.stats, self.path)
+        except Exception as e:
+            logger.error(f"Error writing stats file {self.path}: {str(e)}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._write()
+
+
+class StatsServer:
+    """Serves the stats (a Stats, or a list of them) as Prometheus text on http://host:port/metrics
+
+    routes maps "METHOD /path" to callables returning a JSON-serializable
+    answer. GET routes are passed the query parameters (the first value of
+    each), POST routes the decoded JSON body, which must be sent as
+    application/json so a web page can't post to it. Routes only answer
+    requests addressed to 127.0.0.1:port or localhost:port, so a page can't
+    reach them through DNS rebinding. A ValueError raised by a route is
+    returned as a 400.
+    """
+
+    def __init__(self, stats, host, port, routes=None):
+        stats_list = list(stats) if isinstance(stats, (list, tuple)) else [stats]
+        routes = dict(routes or {})
+        local_hosts = {f"127.0.0.1:{port}", f"localhost:{port}"}
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, status, body, content_type):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                if url.path in ("/", "/metrics"):
+                    body = render_prometheus(stats_list).encode('utf-8')
+                    self._send(200, body, "text/plain; version=0.0.4")
+                    return
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+                self._answer(f"GET {url.path}", params)
+
+            def do_POST(self):
+                url = urlsplit(self.path)
+                if self.headers.get("Content-Type", "").split(";")[0].strip() != "application/json":
+                    self.send_error(415)
+                    return
+                length = int(self.headers.get("Content-Length") or 0)
+                if length > MAX_BODY:
+                    self.send_error(413)
+                    return
+                try:
+                    body = json.loads(self.rfile.read(length) or b"null")
+                except ValueError:
+                    self._send(400, b'{"error": "Invalid JSON"}', "application/json")
+                    return
+                self._answer(f"POST {url.path}", body)
+
+            def _answer(self, key, request):
+                if self.headers.get("Host", "").lower() not in local_hosts:
+                    self.send_error(403)
+                    return
+                route = routes.get(key)
+                if route is None:
+                    self.send_error(404)
+                    return
+                try:
+                    status, answer = 200, route(request)
+                except ValueError as e:
+                    status, answer = 400, {"error": str(e)}
+                except Exception as e:
+                    logger.error(f"Error answering {key}: {str(e)}")
+                    status, answer = 500, {"error": str(e)}
+                self._send(status, json.dumps(answer).encode('utf-8'), "application/json")
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, name="orbit-metrics", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
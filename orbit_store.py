@@ -0,0 +1,294 @@
+"""
+ORBIT Vault Store
+-----------------
+Persistent SQLite index of the notes in a vault, kept under .orbit/ so the
+watchdog can warm-start and catch up on notes edited while it was down.
+Each note's frontmatter is kept alongside the extracted routing columns, so
+the columns can be re-derived when the property names are reconfigured.
+"""
+
+import os
+import json
+import sqlite3
+import threading
+
+from orbit_config import config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    object TEXT,
+    orbits TEXT,
+    stage TEXT,
+    domain TEXT,
+    created TEXT,
+    frontmatter TEXT
+)
+"""
+
+COLUMNS = "path, mtime, size, object, orbits, stage, domain, created, frontmatter"
+INSERT = f"INSERT OR REPLACE INTO notes ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+UPDATE_FIELDS = "UPDATE notes SET object = ?, orbits = ?, stage = ?, domain = ?, created = ? WHERE path = ?"
+
+
+def skipped_dir(name, keep=()):
+    """True for hidden directories (.trash, .obsidian, .orbit) other than the inbox directories in keep"""
+    return name.startswith('.') and name not in keep
+
+
+def scan_vault(vault_path, keep=()):
+    """Yield (path, mtime, size) for every markdown file in the vault
+
+    Hidden directories are skipped, except those named in keep, so notes in
+    Obsidian's trash or ORBIT's own state are never filed back into the vault.
+    """
+    stack = [str(vault_path)]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not skipped_dir(entry.name, keep):
+                            stack.append(entry.path)
+                    elif entry.name.endswith('.md'):
+                        try:
+                            st = entry.stat()
+                        except OSError:
+                            continue
+                        yield entry.path, st.st_mtime, st.st_size
+        except OSError:
+            continue
+
+
+def _text(value):
+    """Store a frontmatter scalar as text, keeping None as NULL"""
+    return None if value is None else str(value)
+
+
+class VaultStore:
+    """SQLite-backed record of each note's stat signature and routing properties"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(SCHEMA)
+        # Stores created before the created and frontmatter columns existed
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(notes)")}
+        for column in ("created", "frontmatter"):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE notes ADD COLUMN {column} TEXT")
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def signatures(self):
+        """Return {path: (mtime, size)} for every stored note"""
+        with self._lock:
+            rows = self._conn.execute("SELECT path, mtime, size FROM notes").fetchall()
+        return {path: (mtime, size) for path, mtime, size in rows}
+
+    def get(self, path):
+        """Return the stored routing properties of a note, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT object, orbits, stage, domain FROM notes WHERE path = ?", (path,)
+            ).fetchone()
+        if row is None:
+            return None
+        object_type, orbits, stage, domain = row
+        return {
+            config["prop_object"]: object_type,
+            config["prop_orbit"]: json.loads(orbits) if orbits else [],
+            config["prop_stage"]: stage,
+            config["prop_domain"]: domain,
+        }
+
+    @staticmethod
+    def _fields(frontmatter):
+        """Extract the (object, orbits, stage, domain, created) columns from frontmatter"""
+        orbits = frontmatter.get(config["prop_orbit"])
+        if isinstance(orbits, str):
+            orbits = [orbits]
+        return (
+            _text(frontmatter.get(config["prop_object"])),
+            json.dumps([str(o) for o in orbits]) if orbits else None,
+            _text(frontmatter.get(config["prop_stage"])),
+            _text(frontmatter.get(config["prop_domain"])),
+            _text(frontmatter.get(config["prop_created"])),
+        )
+
+    @classmethod
+    def _row(cls, path, st, frontmatter):
+        """Build the notes row for a file"""
+        if not isinstance(frontmatter, dict):
+            frontmatter = {}
+        return (
+            (path, st.st_mtime, st.st_size)
+            + cls._fields(frontmatter)
+            + (json.dumps(frontmatter, default=str),)
+        )
+
+    def record(self, path, frontmatter):
+        """Store the current stat signature and routing properties of a note"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        with self._lock:
+            self._conn.execute(INSERT, self._row(path, st, frontmatter))
+            self._conn.commit()
+
+    def record_many(self, notes):
+        """Store several (path, frontmatter) pairs in one transaction"""
+        rows = []
+        for path, frontmatter in notes:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            rows.append(self._row(path, st, frontmatter))
+        with self._lock:
+            self._conn.executemany(INSERT, rows)
+            self._conn.commit()
+
+    def restat(self, path):
+        """Store the current stat signature of a note whose frontmatter we left unchanged"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        with self._lock:
+            self._conn.execute("UPDATE notes SET mtime = ?, size = ? WHERE path = ?", (st.st_mtime, st.st_size, path))
+            self._conn.commit()
+
+    def rename(self, src_path, dest_path):
+        """Point a stored note at its new path; returns False if src_path was not stored
+
+        A stored dest_path row is only replaced when there is a src_path row to
+        take its place, so a late echo of a rename can't drop the live note.
+        """
+        with self._lock:
+            cursor = self._conn.execute("UPDATE OR REPLACE notes SET path = ? WHERE path = ?", (dest_path, src_path))
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def rename_tree(self, src_dir, dest_dir):
+        """Point every stored note under a moved directory at its new path"""
+        src_prefix = os.path.join(src_dir, "")
+        dest_prefix = os.path.join(dest_dir, "")
+        with self._lock:
+            self._conn.execute(
+                "UPDATE notes SET path = ? || substr(path, ?) WHERE substr(path, 1, ?) = ?",
+                (dest_prefix, len(src_prefix) + 1, len(src_prefix), src_prefix),
+            )
+            self._conn.commit()
+
+    def delete(self, path):
+        """Forget a note"""
+        with self._lock:
+            self._conn.execute("DELETE FROM notes WHERE path = ?", (path,))
+            self._conn.commit()
+
+    def delete_tree(self, src_dir):
+        """Forget every note under a deleted directory"""
+        src_prefix = os.path.join(src_dir, "")
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM notes WHERE substr(path, 1, ?) = ?", (len(src_prefix), src_prefix)
+            )
+            self._conn.commit()
+
+    def delete_many(self, paths):
+        """Forget several notes in one transaction"""
+        with self._lock:
+            self._conn.executemany("DELETE FROM notes WHERE path = ?", [(p,) for p in paths])
+            self._conn.commit()
+
+    def notes_under(self, directory):
+        """Return (path, mtime, object, orbits, created) for every note below directory"""
+        low = os.path.join(directory, "")
+        # Every path with the prefix sorts before the prefix with its separator bumped
+        high = low[:-1] + chr(ord(low[-1]) + 1)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, mtime, object, orbits, created FROM notes WHERE path >= ? AND path < ?",
+                (low, high),
+            ).fetchall()
+        return [
+            (path, mtime, object_type, json.loads(orbits) if orbits else [], created)
+            for path, mtime, object_type, orbits, created in rows
+        ]
+
+    def reextract(self):
+        """Re-derive the routing columns from the stored frontmatter (after property names change)
+
+        Returns the paths of notes stored without their frontmatter (recorded
+        before it was kept), which have to be re-read.
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT path, frontmatter FROM notes").fetchall()
+        updates = []
+        unread = []
+        for path, text in rows:
+            if text is None:
+                unread.append(path)
+                continue
+            try:
+                frontmatter = json.loads(text)
+            except ValueError:
+                unread.append(path)
+                continue
+            updates.append(self._fields(frontmatter) + (path,))
+        with self._lock:
+            self._conn.executemany(UPDATE_FIELDS, updates)
+            self._conn.commit()
+        return unread
+
+    def note_rows(self):
+        """Return (path, object, orbits, stage, domain) for every note"""
+        with self._lock:
+            rows = self._conn.execute("SELECT path, object, orbits, stage, domain FROM notes").fetchall()
+        return [
+            (path, object_type, json.loads(orbits) if orbits else [], stage, domain)
+            for path, object_type, orbits, stage, domain in rows
+        ]
+
+    def orbit_rows(self):
+        """Return (path, orbits) for every note that orbits something"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, orbits FROM notes WHERE orbits IS NOT NULL"
+            ).fetchall()
+        return [(path, json.loads(orbits)) for path, orbits in rows]
+
+    def paths_with_object(self, objects):
+        """Return the paths of notes whose object is one of objects"""
+        marks = ", ".join("?" for _ in objects)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT path FROM notes WHERE object IN ({marks})", tuple(objects)
+            ).fetchall()
+        return [path for (path,) in rows]
+
+    def diff(self, scanned):
+        """Compare scanned (path, mtime, size) tuples against the store
+
+        Returns (changed, missing): paths that are new or whose stat signature
+        differs, and stored paths that no longer exist.
+        """
+        stored = self.signatures()
+        changed = []
+        for path, mtime, size in scanned:
+            if stored.pop(path, None) != (mtime, size):
+                changed.append(path)
+        return changed, list(stored)
@@ -0,0 +1,322 @@
+"""
+ORBIT Materialized Views
+------------------------
+Keeps the tables in domain dashboards and .index.md files up to date from the
+persistent vault index, so those pages render without Dataview rescanning the
+vault. Each table lives between a pair of markers:
+
+    <!-- orbit:recent:start -->
+    ...
+    <!-- orbit:recent:end -->
+
+Note changes mark the views above them dirty; each dirty view is rewritten
+once its directory has been quiet for the settle time, and only if its
+content actually changed.
+"""
+
+import os
+import re
+import time
+import heapq
+import logging
+import threading
+
+from orbit_config import config
+from orbit_events import SettleScheduler, replace_own_file
+
+logger = logging.getLogger(__name__)
+
+INDEX = "index"
+DASHBOARD = "dashboard"
+
+# Frontmatter object types of notes that are dashboards for their directory
+DASHBOARD_OBJECTS = ("domain", "domaindashboard")
+
+# Setup copies the templates, dashboard markers included, into this vault directory
+TEMPLATES_DIR = "Templates"
+
+SECTIONS = {
+    DASHBOARD: ("projects", "inbox_projects", "inbox", "recent", "stats"),
+    INDEX: ("contents", "subdirectories", "recent", "stats"),
+}
+
+TITLES = {
+    "projects": "Designated Projects",
+    "inbox_projects": "Inbox Projects",
+    "inbox": "Notes in Inbox",
+    "recent": "Recent Activity",
+    "contents": "Contents",
+    "subdirectories": "Subdirectories",
+    "stats": "Statistics",
+}
+
+MARKER = re.compile(
+    r"<!-- orbit:(?P<name>[a-z_]+):start -->\n.*?<!-- orbit:(?P=name):end -->", re.DOTALL
+)
+
+
+def block(name, body):
+    """Wrap a rendered table in its section markers"""
+    return f"<!-- orbit:{name}:start -->\n{body}<!-- orbit:{name}:end -->"
+
+
+def _cell(value):
+    """Format a table cell, escaping the pipes that would split it"""
+    if value is None or value == []:
+        return ""
+    if isinstance(value, list):
+        value = ", ".join(str(v) for v in value)
+    return str(value).replace("|", "\\|").replace("\n", " ")
+
+
+class ViewMaintainer:
+    """Tracks dashboard and index files and rewrites their tables when notes change"""
+
+    def __init__(self, vault_path, store, moves, settle_time, recent_limit):
+        self.vault_path = os.path.abspath(vault_path)
+        self.store = store
+        # Our own writes are registered like moves, so their events are dropped
+        self.moves = moves
+        self.recent_limit = recent_limit
+        self.tmp_dir = os.path.join(self.vault_path, ".orbit", "tmp")
+        self.templates_dir = os.path.join(self.vault_path, TEMPLATES_DIR, "")
+        self._views = {}  # view path -> (kind, directory)
+        self._by_dir = {}  # directory -> set of view paths
+        self._lock = threading.Lock()
+        self.writes = 0
+        self.scheduler = SettleScheduler(self.render, settle_time)
+
+    def find_dashboards(self):
+        """Register the dashboard notes recorded in the store"""
+        for path in self.store.paths_with_object(DASHBOARD_OBJECTS):
+            self.register(path, DASHBOARD)
+
+    def start(self):
+        """Find dashboards in the store, then refresh every view in the background"""
+        self.find_dashboards()
+        self.scheduler.start()
+        self.refresh()
+
+    def refresh(self):
+        """Schedule a rewrite of every view"""
+        with self._lock:
+            views = list(self._views)
+        for path in views:
+            self.scheduler.schedule(path)
+
+    def stop(self):
+        self.scheduler.stop()
+
+    def register(self, path, kind):
+        """Start maintaining a view file, unless it is one of the vault's templates"""
+        if path.startswith(self.templates_dir):
+            return
+        directory = os.path.dirname(path)
+        with self._lock:
+            self._views[path] = (kind, directory)
+            self._by_dir.setdefault(directory, set()).add(path)
+
+    def unregister(self, path):
+        """Stop maintaining a view file"""
+        with self._lock:
+            view = self._views.pop(path, None)
+            if view is not None:
+                paths = self._by_dir.get(view[1])
+                if paths is not None:
+                    paths.discard(path)
+                    if not paths:
+                        del self._by_dir[view[1]]
+
+    def load(self, paths):
+        """Register the index files among scanned paths"""
+        for path in paths:
+            if os.path.basename(path) == config["hidden_index"]:
+                self.register(path, INDEX)
+
+    def discover(self, path, frontmatter=None):
+        """Register path if it is an index file or a dashboard note"""
+        if os.path.basename(path) == config["hidden_index"]:
+            self.register(path, INDEX)
+        elif isinstance(frontmatter, dict) and frontmatter.get(config["prop_object"]) in DASHBOARD_OBJECTS:
+            self.register(path, DASHBOARD)
+
+    def _covering(self, path):
+        """Return the views whose tables may include path"""
+        found = []
+        directory = os.path.dirname(path)
+        with self._lock:
+            while True:
+                found.extend(self._by_dir.get(directory, ()))
+                if directory == self.vault_path or len(directory) < len(self.vault_path):
+                    break
+                parent = os.path.dirname(directory)
+                if parent == directory:
+                    break
+                directory = parent
+        return found
+
+    def touch(self, *paths):
+        """Mark the views above each changed note (or directory) for a rewrite"""
+        dirty = set()
+        for path in paths:
+            dirty.update(self._covering(str(path)))
+        for view in dirty:
+            self.scheduler.schedule(view)
+
+    def moved(self, src_path, dest_path):
+        """Follow a moved view file or directory of view files"""
+        src_prefix = os.path.join(src_path, "")
+        with self._lock:
+            affected = [
+                (path, kind) for path, (kind, _) in self._views.items()
+                if path == src_path or path.startswith(src_prefix)
+            ]
+        for path, kind in affected:
+            self.unregister(path)
+            moved_path = dest_path + path[len(src_path):]
+            self.register(moved_path, kind)
+            # Links inside a moved view are relative to the vault, so they change too
+            self.scheduler.schedule(moved_path)
+        self.touch(src_path, dest_path)
+
+    def removed(self, path):
+        """Forget views at or below a deleted path and refresh the views above it"""
+        prefix = os.path.join(path, "")
+        with self._lock:
+            gone = [view for view in self._views if view == path or view.startswith(prefix)]
+        for view in gone:
+            self.unregister(view)
+        self.touch(path)
+
+    def render_all(self):
+        """Rewrite every view now (used by one-shot modes)"""
+        for path in list(self._views):
+            self.render(path)
+
+    def _link(self, path):
+        """Wiki link to a note, by vault-relative path"""
+        relative = os.path.relpath(path, self.vault_path)[:-3].replace(os.sep, "/")
+        return f"[[{relative}\\|{os.path.basename(path)[:-3]}]]"
+
+    def _recent(self, rows):
+        """The most recently created notes among rows"""
+        return heapq.nlargest(self.recent_limit, rows, key=lambda row: (row[4] or "", row[0]))
+
+    def _note_table(self, rows, empty):
+        if not rows:
+            return f"_{empty}_\n"
+        lines = ["| Note | Object | Projects | Created |", "| --- | --- | --- | --- |"]
+        for path, _, object_type, orbits, created in rows:
+            lines.append(f"| {self._link(path)} | {_cell(object_type)} | {_cell(orbits)} | {_cell(created)} |")
+        return "\n".join(lines) + "\n"
+
+    def _project_table(self, rows, empty):
+        if not rows:
+            return f"_{empty}_\n"
+        lines = ["| Project | Parent Projects | Created |", "| --- | --- | --- |"]
+        for path, _, _, orbits, created in sorted(rows, key=lambda row: os.path.basename(row[0]).lower()):
+            lines.append(f"| {self._link(path)} | {_cell(orbits)} | {_cell(created)} |")
+        return "\n".join(lines) + "\n"
+
+    def build(self, kind, directory, view_path):
+        """Render the section bodies of one view from the store"""
+        rows = [row for row in self.store.notes_under(directory) if row[0] != view_path]
+        notes = [row for row in rows if row[2] != "project" and row[2] not in DASHBOARD_OBJECTS]
+        inbox = os.path.join(directory, config["hidden_inbox"], "")
+        latest = max((row[1] for row in rows), default=None)
+
+        sections = {}
+        if kind == DASHBOARD:
+            projects = [row for row in rows if row[2] == "project"]
+            sections["projects"] = self._project_table(
+                [row for row in projects if not row[0].startswith(inbox)], "No projects yet"
+            )
+            sections["inbox_projects"] = self._project_table(
+                [row for row in projects if row[0].startswith(inbox)], "No projects in the inbox"
+            )
+            in_inbox = [row for row in notes if row[0].startswith(inbox)]
+            sections["inbox"] = self._note_table(self._recent(in_inbox), "Inbox is empty")
+        else:
+            children = sorted(
+                (row for row in rows if os.path.dirname(row[0]) == directory),
+                key=lambda row: os.path.basename(row[0]).lower(),
+            )
+            sections["contents"] = self._note_table(children, "No notes in this directory")
+            counts = {}
+            for row in rows:
+                relative = os.path.relpath(os.path.dirname(row[0]), directory)
+                if relative != ".":
+                    first = relative.split(os.sep, 1)[0]
+                    counts[first] = counts.get(first, 0) + 1
+            if counts:
+                lines = ["| Directory | Notes |", "| --- | --- |"]
+                lines += [f"| {_cell(name)} | {count} |" for name, count in sorted(counts.items())]
+                sections["subdirectories"] = "\n".join(lines) + "\n"
+            else:
+                sections["subdirectories"] = "_No subdirectories_\n"
+            in_inbox = [row for row in notes if row[0].startswith(inbox)]
+
+        sections["recent"] = self._note_table(self._recent(notes), "No notes yet")
+        stats = [
+            f"- Total notes: {len(rows)}",
+            f"- Projects: {sum(1 for row in rows if row[2] == 'project')}",
+            f"- In inbox: {len(in_inbox)}",
+        ]
+        if latest is not None:
+            stats.append(f"- Last updated: {time.strftime('%Y-%m-%d %H:%M', time.localtime(latest))}")
+        sections["stats"] = "\n".join(stats) + "\n"
+        return sections
+
+    def render(self, path):
+        """Rewrite the tables of one view file if they changed"""
+        with self._lock:
+            view = self._views.get(path)
+        if view is None:
+            return
+        kind, directory = view
+        try:
+            try:
+                st = os.stat(path)
+                with open(path, 'r', encoding='utf-8') as f:
+                    text = f.read()
+            except FileNotFoundError:
+                self.unregister(path)
+                return
+
+            sections = self.build(kind, directory, path)
+            present = set()
+
+            def replace(match):
+                name = match.group("name")
+                present.add(name)
+                if name not in sections:
+                    return match.group(0)
+                return block(name, sections[name])
+
+            updated = MARKER.sub(replace, text)
+            missing = [name for name in SECTIONS[kind] if name not in present]
+            if missing:
+                # Views created before the daemon maintained them get the sections appended
+                updated = updated.rstrip("\n") + "\n"
+                for name in missing:
+                    updated += f"\n## {TITLES[name]}\n\n{block(name, sections[name])}\n"
+            if updated == text:
+                return
+
+            if not replace_own_file(path, updated, (st.st_mtime_ns, st.st_size), self.moves, self.tmp_dir):
+                # Edited while we were rendering; try again once it settles
+                self.scheduler.schedule(path)
+                return
+            # Only the tables changed; keep catch-up from re-reading the dashboard
+            self.store.restat(path)
+            self.writes += 1
+            logger.info(f"Updated tables in {path}", extra={"path": path})
+
+        except Exception as e:
+            logger.error(f"Error updating tables in {path}: {str(e)}")
+
+    def stats(self):
+        """Return the number of maintained views, pending rewrites and writes"""
+        with self._lock:
+            views = len(self._views)
+        return {"views": views, "pending": self.scheduler.pending(), "writes": self.writes}
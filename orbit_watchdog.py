@@ -8,227 +8,781 @@ based on YAML frontmatter properties.
 
 import os
 import sys
+import json
 import time
-import logging
+import argparse
+import itertools
+import multiprocessing
+import urllib.request
+from urllib.parse import urlencode
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
-import yaml
-import re
-import shutil
 from datetime import datetime
 
 # Import configuration
-from orbit_config import config
-
-# Setup logging
-logging.basicConfig(
-    level=getattr(logging, config["log_level"]),
-    format='%(asctime)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S',
-    filename=config["log_file"],
-    filemode='a'
+import orbit_config
+from orbit_config import config, load_vaults
+from orbit_create import parse_request, render_note, sanitize_title
+from orbit_events import (
+    CREATED, DELETED, MODIFIED, MOVED, BackpressureGate, EventCoalescer, FairPool, KeyedLocks,
+    MoveRegistry, SettleScheduler, create_own_file
+)
+from orbit_frontmatter import FrontmatterCache, read_frontmatter, read_frontmatter_safe
+from orbit_graph import RELATIONS, OrbitGraph
+from orbit_index import OrbitIndex
+from orbit_journal import MoveJournal, move_path
+from orbit_logging import log_context, setup_logging
+from orbit_poller import SnapshotPoller
+from orbit_recorder import EventRecorder
+from orbit_reload import (
+    MATCHING_SETTINGS, PROPERTY_SETTINGS, RESTART_SETTINGS, ROUTING_SETTINGS, ConfigWatcher, changed_settings
 )
-logger = logging.getLogger(__name__)
-console = logging.StreamHandler()
-console.setLevel(getattr(logging, config["log_level"]))
-formatter = logging.Formatter('%(asctime)s - %(message)s')
-console.setFormatter(formatter)
-logger.addHandler(console)
+from orbit_satellites import SatelliteMaintainer
+from orbit_stats import Stats, StatsServer, StatsWriter
+from orbit_store import VaultStore, scan_vault, skipped_dir
+from orbit_views import ViewMaintainer
 
-# Dictionary to track recently modified files and their timestamps
-# This helps prevent processing the same file multiple times
-recently_modified = {}
-DEBOUNCE_SECONDS = config["debounce_time"]
+# Setup logging (queued, rotated, rate-limited per file)
+logger = setup_logging(__name__)
 
 class OrbitFileHandler:
     """Class to handle file operations for the ORBIT system"""
     
-    def __init__(self):
-        self.vault_path = Path(config["vault_path"])
+    def __init__(self, vault_config=None, dry_run=False, pool=None, pool_key=None):
+        # The vault's settings: the global config, or one vault of a vaults file
+        self.config = vault_config or config
+        self.vault_path = Path(self.config["vault_path"])
+        # The worker pool shared by every watched vault, which batches run on
+        # under pool_key; without one (reconcile) they get threads of their own
+        self.pool = pool
+        self.pool_key = pool_key
         logger.info(f"Initializing ORBIT file handler with vault path: {self.vault_path}")
+        
+        # Finish any moves a crash interrupted before looking at the vault. A
+        # dry run writes nothing: no journal, and an in-memory store
+        self.journal = None
+        if not dry_run:
+            self.journal = MoveJournal(self.config["get_journal_path"](), self.config["journal_max_bytes"])
+            replayed = self.journal.replay()
+            if replayed:
+                logger.info(f"Completed {replayed} moves interrupted by the last shutdown")
+        
+        # Scan the vault once; the same stat pass feeds the orbit index and
+        # the catch-up comparison against the persistent store
+        start = time.time()
+        self.scanned = list(scan_vault(self.vault_path, self.inbox_dirs()))
+        self.orbit_index = OrbitIndex(self.vault_path, self.config["fuzzy_match_ratio"])
+        self.orbit_index.build(path for path, _, _ in self.scanned)
+        logger.info(f"Indexed {len(self.orbit_index)} notes in {time.time() - start:.2f}s")
+        
+        self.store = VaultStore(":memory:" if dry_run else str(self.config["get_index_path"]()))
+        
+        # Which notes orbit which, across every orbit a note lists
+        self.graph = OrbitGraph(self.orbit_index, self.config["fuzzy_orbit_match"])
+        self.graph.build(self.store.orbit_rows())
+        
+        self.parse_cache = FrontmatterCache(self.config["parse_cache_size"])
+        
+        # Pending changes per path, merged until the path settles
+        self.changes = EventCoalescer(self.config["coalesce_ttl"], self.config["coalesce_max_entries"])
+        
+        # Our own in-flight moves, so their echo events can be dropped
+        self.moves = MoveRegistry(self.config["debounce_time"])
+        self.tmp_dir = os.path.join(self.vault_path, ".orbit", "tmp")
+        
+        # IDs tying together the log lines of one processed change
+        self.event_ids = itertools.count(1)
+        
+        # Serializes the exists-check and move for each target directory, so
+        # two workers can't both claim the same destination
+        self.directory_locks = KeyedLocks()
+        
+        # Tables in domain dashboards and .index.md files, rewritten as notes change
+        self.views = None
+        if self.config["materialized_views"]:
+            self.views = ViewMaintainer(
+                self.vault_path, self.store, self.moves,
+                self.config["view_settle_time"], self.config["view_recent_limit"]
+            )
+            self.views.load(path for path, _, _ in self.scanned)
+        
+        # Projects' satellites lists, rewritten once per debounce window
+        self.satellites = None
+        if self.config["maintain_satellites"]:
+            self.satellites = SatelliteMaintainer(
+                self.vault_path, self.store, self.graph, self.moves, self.config["debounce_time"]
+            )
+        
+        # Counters and per-stage timings, reported through .orbit/stats.json
+        # and the metrics endpoint
+        self.stats = Stats({"vault": self.config["vault_name"]} if self.config["vault_name"] else None)
+        self.stats.collect("parse_cache", self.parse_cache.stats)
+        self.stats.collect("coalescer", self.changes.stats)
+        self.stats.collect("echo", self.moves.stats)
+        self.stats.gauge("indexed_notes", lambda: len(self.orbit_index))
+        self.stats.collect("graph", self.graph.stats)
+        if self.views:
+            self.stats.collect("views", self.views.stats)
+        if self.satellites:
+            self.stats.collect("satellites", self.satellites.stats)
+    
+    def touch_views(self, *paths):
+        """Mark the dashboards and indexes above changed paths for a rewrite"""
+        if self.views:
+            self.views.touch(*paths)
+    
+    def touch_satellites(self, projects):
+        """Schedule rewrites of the projects whose satellites changed"""
+        if self.satellites:
+            self.satellites.touch(*projects)
+    
+    def note_parsed(self, path, frontmatter):
+        """Update the graph, views and satellites lists for freshly parsed frontmatter"""
+        if self.views:
+            self.views.discover(path, frontmatter)
+        self.touch_satellites(self.graph.update(
+            path, frontmatter.get(self.config["prop_orbit"]) if isinstance(frontmatter, dict) else None
+        ))
+    
+    def note_moved(self, src_path, dest_path):
+        """Update the graph, views and satellites lists for a moved note or directory"""
+        if self.views:
+            self.views.moved(src_path, dest_path)
+        self.touch_satellites(self.graph.move(src_path, dest_path))
+    
+    def note_removed(self, path):
+        """Update the graph, views and satellites lists for a deleted note or directory"""
+        if self.views:
+            self.views.removed(path)
+        self.touch_satellites(self.graph.remove(path))
+    
+    def reconfigure(self, changed, previous):
+        """Re-derive what depends on settings that were just reloaded
+        
+        previous holds the old values of the changed settings. Returns the
+        notes that have to be re-routed; the rest of the vault is left alone.
+        """
+        rows = {path: (object_type, orbits, stage) for path, object_type, orbits, stage, _ in self.store.note_rows()}
+        affected = set()
+        
+        if changed & PROPERTY_SETTINGS:
+            # Re-extract the renamed properties from the frontmatter kept in the store
+            unread = self.store.reextract()
+            if unread:
+                self.store.record_many((path, read_frontmatter_safe(path)) for path in unread)
+            updated = {path: (object_type, orbits, stage) for path, object_type, orbits, stage, _ in self.store.note_rows()}
+            affected.update(path for path, row in updated.items() if rows.get(path) != row)
+            logger.info(f"Re-extracted {', '.join(sorted(changed & PROPERTY_SETTINGS))} for {len(rows)} notes ({len(unread)} re-read)")
+            rows = updated
+        
+        if changed & MATCHING_SETTINGS:
+            # Near misses only answer queries and suggest names; nothing is re-routed
+            self.orbit_index.fuzzy_ratio = self.config["fuzzy_match_ratio"]
+            self.graph.fuzzy = self.config["fuzzy_orbit_match"]
+        
+        if changed & PROPERTY_SETTINGS:
+            self.graph.build(self.store.orbit_rows())
+            self.touch_satellites(self.graph.orbited())
+        
+        if changed & ROUTING_SETTINGS:
+            stages = set()
+            if "hidden_inbox" in changed:
+                stages.add("0")
+            if "stage_dirs" in changed:
+                old, new = previous["stage_dirs"], self.config["stage_dirs"]
+                stages.update(stage for stage in set(old) | set(new) if old.get(stage) != new.get(stage))
+            for path, (object_type, orbits, stage) in rows.items():
+                if object_type == "source":
+                    if "source_dir_name" in changed:
+                        affected.add(path)
+                elif orbits and stage in stages:
+                    affected.add(path)
+        
+        if changed & (PROPERTY_SETTINGS | ROUTING_SETTINGS):
+            # Cached routing decisions were made under the old settings
+            self.parse_cache.reset_routing()
+            if self.views:
+                self.views.refresh()
+        return sorted(affected)
+    
+    def catch_up(self):
+        """Process notes added or edited while the watchdog was not running"""
+        start = time.time()
+        scanned = [entry for entry in self.scanned if self.is_note(entry[0])]
+        self.scanned = []
+        changed, missing = self.store.diff(scanned)
+        if missing:
+            self.store.delete_many(missing)
+            for path in missing:
+                self.note_removed(path)
+        
+        logger.info(f"Catch-up: {len(changed)} changed, {len(missing)} removed since last run")
+        for file_path in changed:
+            self.process_file(file_path)
+        logger.info(f"Catch-up finished in {time.time() - start:.2f}s")
+    
+    def reconcile(self, dry_run=False, out=None):
+        """File the whole vault in one pass
+        
+        Parses every note's frontmatter across a process pool, resolves all of
+        them against the orbit index built at startup, and then executes the
+        resulting move plan (or writes it as JSONL when dry_run is set).
+        """
+        start = time.time()
+        paths = sorted(path for path, _, _ in self.scanned if self.is_note(path))
+        self.scanned = []
+        
+        parsed = self.parse_many(paths)
+        logger.info(f"Reconcile: parsed {len(parsed)} notes in {time.time() - start:.2f}s")
+        self.store.record_many((path, frontmatter) for path, frontmatter, _ in parsed)
+        self.graph.build(self.store.orbit_rows())
+        
+        plan = self.plan_moves(parsed)
+        moves = [step for step in plan if step["action"] == "move"]
+        logger.info(f"Reconcile: planned {len(moves)} moves out of {len(plan)} steps")
+        
+        if dry_run:
+            out = out or sys.stdout
+            for step in plan:
+                out.write(json.dumps(step, sort_keys=True) + "\n")
+            return plan
+        
+        moved = self.execute_plan(moves)
+        logger.info(
+            f"Reconcile: moved {moved} of {len(moves)} notes in {time.time() - start:.2f}s"
+        )
+        if self.satellites:
+            self.satellites.write_all()
+        if self.views:
+            self.views.find_dashboards()
+            self.views.render_all()
+        return plan
+    
+    def map_tasks(self, func, items):
+        """Run func over items on the shared worker pool, or on threads of our own; returns the results in order"""
+        if self.pool is not None:
+            return self.pool.map(self.pool_key, func, items)
+        with ThreadPoolExecutor(max_workers=self.config["worker_count"]) as executor:
+            return list(executor.map(func, items))
+    
+    def parse_many(self, paths):
+        """Parse the frontmatter of many notes, in parallel processes for large batches
+        
+        Returns a list of (path, frontmatter, error) tuples in input order.
+        Chunks are handed to the processes by worker pool tasks, so a batch
+        takes its turn with the other vaults' work. The processes are spawned
+        rather than forked, as a fork of the threaded daemon could inherit
+        locks (logging, sqlite) held by other threads.
+        """
+        chunksize = self.config["reconcile_chunk_size"]
+        if len(paths) < 2 * chunksize:
+            return [read_frontmatter_safe(path) for path in paths]
+        chunks = [paths[start:start + chunksize] for start in range(0, len(paths), chunksize)]
+        with ProcessPoolExecutor(
+            max_workers=self.config["reconcile_processes"], mp_context=multiprocessing.get_context("spawn")
+        ) as processes:
+            parsed = self.map_tasks(lambda chunk: list(processes.map(read_frontmatter_safe, chunk)), chunks)
+        return [result for chunk in parsed for result in chunk]
+    
+    def plan_moves(self, parsed):
+        """Resolve every parsed note to a plan step
+        
+        Each step is a dict with an action ("move", "conflict", "unresolved" or
+        "error") and the source path; moves and conflicts also carry the
+        destination. Notes that are already in place produce no step.
+        """
+        plan = []
+        claimed = set()
+        for path, frontmatter, error in parsed:
+            if error:
+                plan.append({"action": "error", "source": path, "error": error})
+                continue
+            if not isinstance(frontmatter, dict):
+                continue
+            
+            destination = self.route(path, frontmatter)
+            if destination is None:
+                plan.append({"action": "unresolved", "source": path})
+                continue
+            if Path(destination) == Path(path):
+                continue
+            
+            destination = str(destination)
+            if destination in claimed or os.path.exists(destination):
+                plan.append({"action": "conflict", "source": path, "destination": destination})
+            else:
+                claimed.add(destination)
+                plan.append({"action": "move", "source": path, "destination": destination})
+        return plan
+    
+    def execute_plan(self, moves):
+        """Carry out planned moves on the worker threads; returns how many succeeded
+        
+        Moves are journaled a chunk at a time, so a chunk shares one fsync of
+        the journal and one directory creation per destination directory.
+        """
+        moved = 0
+        chunksize = self.config["reconcile_chunk_size"]
+        for start in range(0, len(moves), chunksize):
+            chunk = moves[start:start + chunksize]
+            for directory in {os.path.dirname(step["destination"]) for step in chunk}:
+                os.makedirs(directory, exist_ok=True)
+            ids = self.journal.begin_many([(step["source"], step["destination"]) for step in chunk])
+            try:
+                results = self.map_tasks(
+                    lambda item: self.move_file(
+                        item[0]["source"], Path(item[0]["destination"]), journal_id=item[1]
+                    ),
+                    zip(chunk, ids),
+                )
+                moved += sum(1 for result in results if result)
+            finally:
+                self.journal.end_many(ids)
+        return moved
+    
+    def process_batch(self, paths):
+        """Handle the changes gathered during an event storm in one pass
+        
+        Like reconcile, but only for the given paths: the notes are parsed in
+        parallel, resolved against one snapshot of the orbit index and their
+        moves executed as a single plan.
+        """
+        with log_context(event_id=next(self.event_ids)), self.stats.timer("batch"):
+            start = time.time()
+            notes = []
+            for path in paths:
+                change = self.changes.take(path)
+                if change is not None:
+                    if change.action not in (CREATED, MODIFIED):
+                        # Deletions and bare renames were already applied to the index
+                        continue
+                    path = change.path
+                if self.is_note(path) and os.path.exists(path):
+                    notes.append(path)
+            
+            parsed = self.parse_many(notes)
+            self.store.record_many((path, frontmatter) for path, frontmatter, _ in parsed)
+            for path, frontmatter, _ in parsed:
+                self.note_parsed(path, frontmatter)
+            self.touch_views(*notes)
+            self.stats.incr("processed", len(parsed))
+            
+            with self.orbit_index.snapshot():
+                plan = self.plan_moves(parsed)
+            moves = [step for step in plan if step["action"] == "move"]
+            for step in plan:
+                if step["action"] == "error":
+                    self.stats.incr("failed", reason="parse")
+                elif step["action"] == "unresolved":
+                    self.stats.incr("failed", reason="unresolved")
+                elif step["action"] == "conflict":
+                    logger.warning(
+                        f"Destination file {step['destination']} already exists, not moving {step['source']}"
+                    )
+                    self.stats.incr("failed", reason="exists")
+            
+            moved = self.execute_plan(moves)
+            logger.info(
+                f"Batch: {len(paths)} changed paths, parsed {len(parsed)} notes, "
+                f"moved {moved} of {len(moves)} in {time.time() - start:.2f}s"
+            )
+    
+    def process_change(self, path):
+        """Act once on the merged change for a path that has settled"""
+        with log_context(event_id=next(self.event_ids)):
+            self._process_change(path)
+    
+    def _process_change(self, path):
+        """Body of process_change, run inside the change's log context"""
+        change = self.changes.take(path)
+        if change is None:
+            # Evicted or expired from the coalescing store; treat as a modification
+            self.process_file(path)
+            return
+        
+        if change.events > 1:
+            self.stats.incr("events_coalesced", change.events - 1)
+            logger.info(f"Coalesced {change.events} events for {path}: {change.describe()}", extra={"path": path})
+        # Deletions and bare renames were already applied to the index
+        if change.action in (CREATED, MODIFIED):
+            self.process_file(change.path)
+    
+    def inbox_dirs(self):
+        """Names of the hidden directories notes are filed into, which scans must not skip"""
+        return {self.config["hidden_inbox"], *self.config["stage_dirs"].values()}
+    
+    def is_note(self, file_path):
+        """True for markdown files that should be filed (not hidden or index files)"""
+        # Only process markdown files
+        if not file_path.endswith('.md'):
+            return False
+        
+        # Skip hidden files and index files
+        filename = os.path.basename(file_path)
+        if filename.startswith('.') or filename == self.config["hidden_index"]:
+            return False
+        
+        # Like the scan, leave notes in .trash, .obsidian and .orbit alone
+        relative = os.path.relpath(os.path.dirname(file_path), self.vault_path)
+        if relative == os.curdir:
+            return True
+        keep = self.inbox_dirs()
+        return not any(skipped_dir(name, keep) for name in relative.split(os.sep))
     
     def process_file(self, file_path):
         """Process a file based on its YAML frontmatter"""
+        with self.stats.trace() as timings:
+            with self.stats.timer("process"):
+                self._process_file(file_path)
+        # Files that were never parsed (not notes, already gone) aren't worth a line
+        if "parse" in timings:
+            logger.info(
+                f"Processed {file_path} in {timings['process']:.1f} ms",
+                extra={"path": file_path, "timings": timings}
+            )
+    
+    def _process_file(self, file_path):
+        """Body of process_file, timed as a whole"""
         try:
-            # Only process markdown files
-            if not file_path.endswith('.md'):
-                return
-            
-            # Skip hidden files and index files
-            filename = os.path.basename(file_path)
-            if filename.startswith('.') or filename == config["hidden_index"]:
+            if not self.is_note(file_path):
+                self.stats.incr("skipped", reason="not_note")
                 return
             
             # Skip files that don't exist (might have been deleted or moved)
-            if not os.path.exists(file_path):
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                self.stats.incr("skipped", reason="missing")
                 return
                 
-            logger.info(f"Processing file: {file_path}")
+            logger.debug(f"Processing file: {file_path}", extra={"path": file_path})
+            self.stats.incr("processed")
             
-            # Parse frontmatter
-            frontmatter = self.parse_frontmatter(file_path)
+            # Parse frontmatter (cached on file identity and stat signature)
+            try:
+                with self.stats.timer("parse"):
+                    entry, hit = self.parse_cache.load(file_path, st)
+            except Exception as e:
+                logger.error(f"Error parsing frontmatter in {file_path}: {str(e)}")
+                self.stats.incr("failed", reason="parse")
+                entry, hit = None, False
+            
+            frontmatter = entry.frontmatter if entry else None
+            if not hit:
+                self.store.record(file_path, frontmatter)
+                self.note_parsed(file_path, frontmatter)
+                self.touch_views(file_path)
             if not frontmatter:
-                logger.info(f"No frontmatter found in {file_path}, skipping")
+                logger.info(f"No frontmatter found in {file_path}, skipping", extra={"path": file_path})
+                self.stats.incr("skipped", reason="no_frontmatter")
+                return
+            
+            # Skip routing if the properties that decide the location haven't changed
+            if not self.parse_cache.needs_routing(entry):
+                logger.info(f"Routing properties of {file_path} unchanged, skipping", extra={"path": file_path})
+                self.stats.incr("skipped", reason="unchanged")
                 return
             
             # Process based on object type and orbit
-            self.handle_file_by_properties(file_path, frontmatter)
+            if self.handle_file_by_properties(file_path, frontmatter):
+                self.parse_cache.mark_processed(entry)
             
         except Exception as e:
             logger.error(f"Error processing file {file_path}: {str(e)}")
+            self.stats.incr("failed", reason="error")
     
     def parse_frontmatter(self, file_path):
         """Extract YAML frontmatter from a markdown file"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Check for YAML frontmatter
-            frontmatter_match = re.match(r'^---\s*\n(.*?)\n---\s*\n', content, re.DOTALL)
-            if not frontmatter_match:
-                return None
-            
-            # Parse YAML
-            yaml_text = frontmatter_match.group(1)
-            frontmatter = yaml.safe_load(yaml_text)
-            return frontmatter
+            # Only reads up to the closing fence (bounded by frontmatter_max_bytes)
+            return read_frontmatter(file_path)
             
         except Exception as e:
             logger.error(f"Error parsing frontmatter in {file_path}: {str(e)}")
             return None
     
     def handle_file_by_properties(self, file_path, frontmatter):
-        """Handle file based on its frontmatter properties"""
+        """Handle file based on its frontmatter properties
+        
+        Returns True once the file is where its properties say it belongs.
+        """
+        destination = self.route(file_path, frontmatter)
+        if destination is None:
+            self.stats.incr("failed", reason="unresolved")
+            return False
+        return self.move_file(file_path, destination)
+    
+    def route(self, file_path, frontmatter):
+        """Work out where a file belongs based on its frontmatter properties
+        
+        Returns the destination path (the file's own path if it stays where it
+        is), or None if the destination can't be resolved.
+        """
         # Get object type
-        object_type = frontmatter.get(config["prop_object"], "note")
+        object_type = frontmatter.get(self.config["prop_object"], "note")
         
         # Get orbits (parent projects)
-        orbits = frontmatter.get(config["prop_orbit"], [])
+        orbits = frontmatter.get(self.config["prop_orbit"], [])
         if isinstance(orbits, str):
             orbits = [orbits]  # Convert single string to list
         
         # Get stage
-        stage = frontmatter.get(config["prop_stage"], 0)
+        stage = frontmatter.get(self.config["prop_stage"], 0)
+        
+        # Notes caught in an orbit cycle stay put; each move would pull the
+        # rest of the cycle after it
+        if orbits and self.graph.in_cycle(file_path):
+            logger.warning(f"File {file_path} is part of an orbit cycle, leaving in place")
+            return Path(file_path)
         
         # Source files go to the source directory
         if object_type == "source":
-            logger.info(f"Handling source file: {file_path}")
-            self.handle_source_file(file_path, frontmatter, orbits)
+            logger.info(f"Handling source file: {file_path}", extra={"path": file_path})
+            return self.route_source_file(file_path, frontmatter, orbits)
         # Files with orbits go to the appropriate orbit directory
         elif orbits:
-            logger.info(f"Handling file with orbits: {file_path}, orbits: {orbits}, stage: {stage}")
-            self.handle_orbiting_file(file_path, frontmatter, orbits, stage)
+            logger.info(f"Handling file with orbits: {file_path}, orbits: {orbits}, stage: {stage}", extra={"path": file_path})
+            return self.route_orbiting_file(file_path, frontmatter, orbits, stage)
         # Handle other files (domain dashboards, etc.)
         else:
-            logger.info(f"Handling other file: {file_path}")
-            self.handle_other_file(file_path, frontmatter)
+            logger.info(f"Handling other file: {file_path}", extra={"path": file_path})
+            return self.route_other_file(file_path, frontmatter)
     
-    def handle_source_file(self, file_path, frontmatter, orbits):
-        """Handle source files - move to appropriate source directory"""
-        # If the file has orbits, move to the first orbit's source directory
+    def route_source_file(self, file_path, frontmatter, orbits):
+        """Source files belong in the appropriate source directory"""
+        # If the file has orbits, use the first resolvable orbit's source directory
         if orbits:
-            orbit_name = orbits[0]
-            orbit_path = self.find_orbit_path(orbit_name)
-            
+            orbit_path = self.find_first_orbit(file_path, orbits)
             if orbit_path:
-                # Create source directory if it doesn't exist
-                source_dir = orbit_path / config["source_dir_name"]
-                source_dir.mkdir(exist_ok=True)
-                
-                # Move file to source directory
-                self.move_file(file_path, source_dir / os.path.basename(file_path))
+                return orbit_path / self.config["source_dir_name"] / os.path.basename(file_path)
             else:
-                logger.warning(f"Could not find orbit {orbit_name} for source file {file_path}")
+                return None
         else:
-            # If no orbits, move to domain source directory
-            domain = frontmatter.get(config["prop_domain"], "")
+            # If no orbits, use the domain source directory
+            domain = frontmatter.get(self.config["prop_domain"], "")
             if domain:
                 domain_path = self.vault_path / domain
                 if domain_path.exists():
-                    source_dir = domain_path / config["source_dir_name"]
-                    source_dir.mkdir(exist_ok=True)
-                    self.move_file(file_path, source_dir / os.path.basename(file_path))
+                    return domain_path / self.config["source_dir_name"] / os.path.basename(file_path)
                 else:
                     logger.warning(f"Domain {domain} does not exist for source file {file_path}")
+                    return None
             else:
                 logger.warning(f"Source file {file_path} has no orbit or domain, leaving in place")
+                return Path(file_path)
     
-    def handle_orbiting_file(self, file_path, frontmatter, orbits, stage):
-        """Handle files that orbit other notes/projects"""
-        orbit_name = orbits[0]  # Use first orbit in list
-        orbit_path = self.find_orbit_path(orbit_name)
-        
+    def route_orbiting_file(self, file_path, frontmatter, orbits, stage):
+        """Files that orbit other notes/projects belong in their first resolvable orbit's directory"""
+        orbit_path = self.find_first_orbit(file_path, orbits)
         if not orbit_path:
-            logger.warning(f"Could not find orbit {orbit_name} for file {file_path}")
-            return
+            return None
         
-        # Determine target directory based on stage
-        if stage == 0 and config["hidden_inbox"]:
-            target_dir = orbit_path / config["hidden_inbox"]
-        elif str(stage) in config["stage_dirs"]:
-            target_dir = orbit_path / config["stage_dirs"][stage]
+        # Determine target directory based on stage; stage_dirs is keyed by the stage as a string
+        stage = str(stage)
+        if stage == "0" and self.config["hidden_inbox"]:
+            target_dir = orbit_path / self.config["hidden_inbox"]
+        elif stage in self.config["stage_dirs"]:
+            target_dir = orbit_path / self.config["stage_dirs"][stage]
         else:
             target_dir = orbit_path
         
-        # Create target directory if it doesn't exist
-        target_dir.mkdir(exist_ok=True)
-        
-        # Move file to target directory
-        self.move_file(file_path, target_dir / os.path.basename(file_path))
+        return target_dir / os.path.basename(file_path)
     
-    def handle_other_file(self, file_path, frontmatter):
-        """Handle files without orbits (domain dashboards, etc.)"""
-        # For now, just log and leave in place
-        logger.info(f"File {file_path} has no orbit, leaving in place")
+    def route_other_file(self, file_path, frontmatter):
+        """Files without orbits (domain dashboards, etc.) stay where they are"""
+        logger.info(f"File {file_path} has no orbit, leaving in place", extra={"path": file_path})
+        return Path(file_path)
+    
+    def find_first_orbit(self, file_path, orbits):
+        """Return the directory of the first of a file's orbits that resolves"""
+        for orbit_name in orbits:
+            orbit_path = self.find_orbit_path(orbit_name)
+            if orbit_path:
+                return orbit_path
+            suggestion = self.suggest_orbit(orbit_name)
+            hint = f" (did you mean {suggestion}?)" if suggestion else ""
+            logger.warning(f"Could not find orbit {orbit_name} for file {file_path}{hint}")
+        return None
     
     def find_orbit_path(self, orbit_name):
         """Find the path of an orbit (project) by name"""
-        # First, search for exact match in the vault
-        for root, dirs, files in os.walk(self.vault_path):
-            for file in files:
-                if file.endswith('.md') and file.lower() == f"{orbit_name.lower()}.md":
-                    return Path(root)
-        
-        # If not found, try to find a similar match
-        for root, dirs, files in os.walk(self.vault_path):
-            for file in files:
-                if file.endswith('.md') and orbit_name.lower() in file.lower():
-                    return Path(root)
-        
-        return None
+        # Exact match first, then a prefix/substring match; near misses are
+        # never used for filing, since the project may just not exist yet
+        with self.stats.timer("resolve"):
+            found = self.orbit_index.match(orbit_name, fuzzy=False)
+        return found[1] if found else None
+    
+    def suggest_orbit(self, orbit_name):
+        """Return the closest note name to an orbit that did not resolve, or None"""
+        if not self.config["fuzzy_orbit_match"]:
+            return None
+        found = self.orbit_index.locate(orbit_name, fuzzy=True)
+        return found.stem if found else None
     
-    def move_file(self, source, destination):
-        """Move a file to a new location"""
+    def move_file(self, source, destination, journal_id=None):
+        """Move a file to a new location
+        
+        The move is journaled first unless the caller already journaled it
+        (journal_id). Returns True if the file ended up at destination.
+        """
         try:
             # Skip if source and destination are the same
             if Path(source) == Path(destination):
-                logger.info(f"File {source} is already in the correct location")
-                return
-            
-            # Check if destination exists
-            if os.path.exists(destination):
-                logger.warning(f"Destination file {destination} already exists, not moving {source}")
-                return
+                logger.info(f"File {source} is already in the correct location", extra={"path": source})
+                return True
             
-            # Create parent directories if needed
-            os.makedirs(os.path.dirname(destination), exist_ok=True)
-            
-            # Move file
-            shutil.move(source, destination)
-            logger.info(f"Moved file {source} to {destination}")
+            with self.directory_locks(os.path.dirname(destination)):
+                # Check if destination exists
+                if os.path.exists(destination):
+                    logger.warning(f"Destination file {destination} already exists, not moving {source}")
+                    self.stats.incr("failed", reason="exists")
+                    return False
+                
+                # Create parent directories if needed
+                with self.stats.timer("mkdir"):
+                    os.makedirs(os.path.dirname(destination), exist_ok=True)
+                
+                # Move file, registering it so the observer's echo events are dropped
+                src_st = os.stat(source)
+                own_entry = journal_id is None
+                if own_entry:
+                    journal_id = self.journal.begin(source, destination)
+                self.moves.begin(source, destination)
+                try:
+                    with self.stats.timer("move"):
+                        move_path(source, destination)
+                finally:
+                    self.moves.end(source, destination)
+                    if own_entry:
+                        self.journal.end(journal_id)
             
-            # Update recently modified to prevent re-processing
-            recently_modified[str(destination)] = time.time()
+            self.parse_cache.moved(src_st, destination)
+            self.orbit_index.move(source, destination)
+            self.store.rename(str(source), str(destination))
+            self.touch_views(source, destination)
+            self.touch_satellites(self.graph.move(source, destination))
+            logger.info(f"Moved file {source} to {destination}", extra={"path": source})
+            self.stats.incr("moved")
+            return True
             
         except Exception as e:
             logger.error(f"Error moving file {source} to {destination}: {str(e)}")
+            self.stats.incr("failed", reason="move")
+            return False
+
+    def create_note(self, request):
+        """Create one note from an API request; raises ValueError if it can't be created"""
+        result = self.create_notes([request])[0]
+        if "error" in result:
+            raise ValueError(result["error"])
+        return result
+    
+    def create_notes(self, requests):
+        """Create notes from API requests, each written directly to its final location
+        
+        Returns one {"path": ...} or {"error": ...} result per request. Notes
+        are indexed as they are written, so later notes in the same batch can
+        orbit earlier ones.
+        """
+        results = []
+        created = []
+        for request in requests:
+            try:
+                path, frontmatter = self._create_note(request)
+            except (ValueError, OSError) as e:
+                if isinstance(e, OSError):
+                    logger.error(f"Error creating note {request}: {str(e)}")
+                self.stats.incr("failed", reason="create")
+                results.append({"error": str(e)})
+                continue
+            logger.info(f"Created note {path}", extra={"path": path})
+            created.append((path, frontmatter))
+            results.append({"path": path})
+        if created:
+            self.store.record_many(created)
+            self.touch_views(*(path for path, _ in created))
+            self.stats.incr("created", len(created))
+        return results
+    
+    def _create_note(self, request):
+        """Resolve, render and write one requested note; returns (path, frontmatter)"""
+        title, orbits, object_type, stage, domain, body = parse_request(request)
+        frontmatter = {
+            self.config["prop_object"]: object_type,
+            self.config["prop_orbit"]: orbits,
+            self.config["prop_stage"]: stage,
+        }
+        destination = self.route(str(self.vault_path / f"{sanitize_title(title)}.md"), frontmatter)
+        if destination is None:
+            raise ValueError(f"Could not resolve orbit {', '.join(orbits)}")
+        destination = str(destination)
+        if domain is None:
+            # Like the template: the top-level directory the note lands in
+            relative = os.path.relpath(destination, self.vault_path)
+            domain = relative.split(os.sep)[0] if os.sep in relative else ""
+        frontmatter[self.config["prop_domain"]] = domain
+        frontmatter[self.config["prop_created"]] = time.strftime("%Y-%m-%d")
+        text = render_note(
+            title, orbits, object_type, stage, domain, body, frontmatter[self.config["prop_created"]]
+        )
+        
+        with self.directory_locks(os.path.dirname(destination)):
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            try:
+                create_own_file(destination, text, self.moves, self.tmp_dir)
+            except FileExistsError:
+                raise ValueError(f"{destination} already exists")
+        self.orbit_index.add(destination)
+        self.note_parsed(destination, frontmatter)
+        return destination, frontmatter
 
 class OrbitEventHandler(FileSystemEventHandler):
     """Watchdog event handler for ORBIT system"""
     
-    def __init__(self, orbit_handler):
+    def __init__(self, orbit_handler, scheduler, gate=None, recorder=None):
         self.orbit_handler = orbit_handler
+        # Handlers only enqueue; the scheduler processes paths once they settle
+        self.scheduler = scheduler
+        # During event storms the gate takes paths into a batch instead
+        self.gate = gate
+        # Optional journal of every raw event, for replaying offline
+        self.recorder = recorder
+        self.echo = False
+        # The daemon's own state (index, stats) lives here and is never filed
+        self.state_dir = os.path.join(os.path.abspath(orbit_handler.vault_path), ".orbit", "")
+    
+    def dispatch(self, event):
+        """Handle an event, recording it (and whether it was an echo) when recording is on"""
+        if self.recorder is None:
+            return super().dispatch(event)
+        timestamp = time.time()
+        self.echo = False
+        try:
+            super().dispatch(event)
+        finally:
+            self.recorder.record(event, timestamp, self.echo)
+    
+    def schedule(self, kind, path, dest_path=None):
+        """Record an event and schedule its path for processing"""
+        if path.startswith(self.state_dir) and (dest_path or path).startswith(self.state_dir):
+            return
+        self.orbit_handler.stats.incr("events_received", kind=kind)
+        target = self.orbit_handler.changes.record(kind, path, dest_path)
+        if kind == MOVED:
+            self.scheduler.cancel(path)
+        if self.gate and self.gate.record(target):
+            return
+        self.scheduler.schedule(target)
+    
+    def is_echo(self, kind, path, dest_path=None):
+        """True for events generated by the daemon's own moves"""
+        if self.orbit_handler.moves.is_echo(kind, path, dest_path):
+            self.orbit_handler.stats.incr("events_dropped", kind=kind)
+            self.echo = True
+            return True
+        return False
     
     def on_modified(self, event):
         """Handle file modification events"""
@@ -237,17 +791,11 @@ class OrbitEventHandler(FileSystemEventHandler):
         
         # Normalize path for consistent handling
         file_path = os.path.abspath(event.src_path)
+        if self.is_echo(MODIFIED, file_path):
+            return
         
-        # Check if file was recently modified
-        if file_path in recently_modified:
-            if time.time() - recently_modified[file_path] < DEBOUNCE_SECONDS:
-                return  # Skip if modified too recently (debounce)
-        
-        # Record modification time
-        recently_modified[file_path] = time.time()
-        
-        # Process the file
-        self.orbit_handler.process_file(file_path)
+        # Process the file once it stops changing
+        self.schedule(MODIFIED, file_path)
     
     def on_created(self, event):
         """Handle file creation events"""
@@ -256,40 +804,401 @@ class OrbitEventHandler(FileSystemEventHandler):
         
         # Normalize path
         file_path = os.path.abspath(event.src_path)
+        if self.is_echo(CREATED, file_path):
+            return
+        self.orbit_handler.orbit_index.add(file_path)
+        if self.orbit_handler.views:
+            self.orbit_handler.views.discover(file_path)
+        
+        # Process once the file has settled, so it is fully written
+        self.schedule(CREATED, file_path)
+    
+    def on_deleted(self, event):
+        """Handle file and directory deletion events"""
+        path = os.path.abspath(event.src_path)
+        if event.is_directory:
+            self.orbit_handler.orbit_index.remove_tree(path)
+            self.orbit_handler.store.delete_tree(path)
+        elif not self.is_echo(DELETED, path):
+            self.orbit_handler.orbit_index.remove(path)
+            self.orbit_handler.store.delete(path)
+            self.schedule(DELETED, path)
+        else:
+            return
+        self.orbit_handler.note_removed(path)
+    
+    def on_moved(self, event):
+        """Handle file and directory move events
+        
+        A rename (e.g. in Obsidian) only updates the index and store; the note
+        is not re-parsed unless its content also changed.
+        """
+        src_path = os.path.abspath(event.src_path)
+        dest_path = os.path.abspath(event.dest_path)
+        if event.is_directory:
+            self.orbit_handler.orbit_index.move_tree(src_path, dest_path)
+            self.orbit_handler.store.rename_tree(src_path, dest_path)
+        elif not self.is_echo(MOVED, src_path, dest_path):
+            self.orbit_handler.orbit_index.move(src_path, dest_path)
+            self.orbit_handler.store.rename(src_path, dest_path)
+            self.schedule(MOVED, src_path, dest_path)
+        else:
+            return
+        self.orbit_handler.note_moved(src_path, dest_path)
+
+class WatchedVault:
+    """The handler, scheduler, backpressure gate and stats writer of one watched vault
+    
+    Settled changes of every vault, and the parsing and moves of its
+    batches, go to one shared FairPool, served round-robin between vaults.
+    """
+    
+    def __init__(self, vault_config, pool, record=False):
+        self.config = vault_config
+        self.name = vault_config["vault_name"] or Path(vault_config["vault_path"]).name
+        self.handler = OrbitFileHandler(vault_config, pool=pool, pool_key=self.name)
+        self.scheduler = SettleScheduler(
+            self.handler.process_change, vault_config["settle_time"], pool=pool, key=self.name
+        )
+        self.gate = BackpressureGate(
+            self.handler.process_batch, vault_config["batch_enter_rate"], vault_config["batch_exit_rate"],
+            vault_config["batch_quiet_time"], vault_config["batch_max_wait"]
+        )
+        self.recorder = None
+        if record or vault_config["record_events"]:
+            self.recorder = EventRecorder(
+                vault_config["get_event_log_path"](), self.handler.vault_path,
+                vault_config["event_log_max_bytes"], ignore=[os.path.join(self.handler.vault_path, ".orbit", "")]
+            )
+        self.event_handler = OrbitEventHandler(self.handler, self.scheduler, self.gate, self.recorder)
+        self.poller = None
+        
+        stats = self.handler.stats
+        stats.gauge("queue_pending", self.scheduler.pending)
+        stats.gauge("queue_backlog", self.scheduler.backlog)
+        stats.collect("backpressure", self.gate.stats)
+        if self.recorder:
+            stats.collect("recorder", self.recorder.stats)
+        self.stats_writer = StatsWriter(stats, vault_config["get_stats_path"](), vault_config["stats_interval"])
+    
+    def start(self):
+        """Catch up with changes made while stopped, then start the vault's threads"""
+        self.handler.catch_up()
+        if self.recorder:
+            self.recorder.open()
+            logger.info(f"Recording file events to {self.recorder.path}")
+        if self.handler.views:
+            self.handler.views.start()
+        if self.handler.satellites:
+            self.handler.satellites.start()
+        self.scheduler.start()
+        self.gate.start()
+        self.stats_writer.start()
+    
+    def echo_window(self):
+        """Seconds the echoes of our own moves are dropped for
         
-        # Record creation time
-        recently_modified[file_path] = time.time()
+        A poller reports a move up to one (backed-off) poll interval after it
+        happened, so a polled vault keeps its moves registered that much longer.
+        """
+        window = self.config["debounce_time"]
+        if self.poller:
+            window += self.config["poll_max_interval"]
+        return window
+    
+    def reconfigure(self, changed, previous):
+        """Apply reloaded settings to the running vault and re-route the notes they affect"""
+        settings = self.config
+        self.scheduler.settle_time = settings["settle_time"]
+        self.gate.enter_rate = settings["batch_enter_rate"]
+        self.gate.exit_rate = settings["batch_exit_rate"]
+        self.gate.quiet_time = settings["batch_quiet_time"]
+        self.gate.max_wait = settings["batch_max_wait"]
+        self.handler.changes.ttl = settings["coalesce_ttl"]
+        self.handler.moves.window = self.echo_window()
+        if self.handler.views:
+            self.handler.views.scheduler.settle_time = settings["view_settle_time"]
+            self.handler.views.recent_limit = settings["view_recent_limit"]
+        if self.handler.satellites:
+            self.handler.satellites.scheduler.settle_time = settings["debounce_time"]
+        if self.poller:
+            self.poller.min_interval = settings["poll_min_interval"]
+            self.poller.max_interval = settings["poll_max_interval"]
+            self.poller.full_scan_every = max(1, settings["poll_full_scan_every"])
         
-        # Process after a short delay to ensure file is fully written
-        time.sleep(0.5)
-        self.orbit_handler.process_file(file_path)
+        affected = self.handler.reconfigure(changed, previous)
+        for path in affected:
+            self.scheduler.schedule(path)
+        if affected:
+            logger.info(f"Re-routing {len(affected)} notes in {self.name} after the config change")
+        return affected
+    
+    def stop_intake(self):
+        """Stop taking new changes; already settled ones stay queued in the pool"""
+        self.gate.stop()
+        self.scheduler.stop()
+    
+    def close(self):
+        """Flush the vault's views, satellites and stats and close its store"""
+        if self.handler.views:
+            self.handler.views.stop()
+        if self.handler.satellites:
+            self.handler.satellites.stop()
+        self.stats_writer.stop()
+        if self.recorder:
+            self.recorder.close()
+        self.handler.store.close()
+        self.handler.journal.close()
+
+def select_vaults(vaults, name=None):
+    """The vaults named name (every vault when name is None)"""
+    if name is None:
+        return vaults
+    selected = [vault for vault in vaults if vault["vault_name"] == name]
+    if not selected:
+        raise ValueError(f"No vault named {name}")
+    return selected
+
+def bulk_requests(body):
+    """The note requests of a bulk creation body: a list, or an object with a notes list"""
+    if isinstance(body, dict):
+        body = body.get("notes")
+    if not isinstance(body, list):
+        raise ValueError("Expected a list of notes")
+    return body
+
+def query_graph(relation, name, offline=False, vault=None):
+    """Answer an orbit graph query from the running watchdog, or from the persisted index"""
+    vault = vault or config
+    if not offline and config["stats_port"]:
+        params = {"relation": relation, "name": name or ""}
+        if vault["vault_name"]:
+            params["vault"] = vault["vault_name"]
+        url = f"http://{config['stats_host']}:{config['stats_port']}/query?" + urlencode(params)
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                return json.load(response)
+        except (OSError, ValueError):
+            # No watchdog running; build the graph from the persisted index
+            pass
+    
+    store = VaultStore(str(vault["get_index_path"]()))
+    try:
+        orbit_index = OrbitIndex(vault["vault_path"], vault["fuzzy_match_ratio"])
+        orbit_index.build(store.signatures())
+        graph = OrbitGraph(orbit_index, vault["fuzzy_orbit_match"])
+        graph.build(store.orbit_rows())
+        return graph.query(relation, name)
+    finally:
+        store.close()
+
+def run_query(args, vault):
+    """Print the answer to a query subcommand; returns the exit status"""
+    if args.relation != "cycles" and not args.name:
+        print(f"{args.relation} needs an orbit name", file=sys.stderr)
+        return 2
+    answer = query_graph(args.relation, args.name, args.offline, vault)
+    if args.json:
+        print(json.dumps(answer, indent=2))
+        return 0
+    if args.relation != "cycles" and answer["note"] is None:
+        print(f"No note found for {args.name}", file=sys.stderr)
+        return 1
+    
+    def relative(path):
+        return os.path.relpath(path, vault["vault_path"])
+    
+    for result in answer["results"]:
+        if args.relation == "cycles":
+            print(" -> ".join(relative(path) for path in result))
+        else:
+            print(relative(result))
+    return 0
+
+def orbit_config_file():
+    """Path of the loaded orbit_config.py"""
+    return os.path.abspath(orbit_config.__file__)
+
+def apply_config(settings, watched):
+    """Swap reloaded settings into the live configuration and each watched vault"""
+    changed = changed_settings(config, settings)
+    restart = changed & RESTART_SETTINGS
+    if restart:
+        logger.warning(f"Config changes that take effect after a restart: {', '.join(sorted(restart))}")
+    changed -= restart
+    if not changed:
+        return
+    previous = {key: config[key] for key in changed}
+    # One update, so no reader sees half of the new settings
+    config.update({key: settings[key] for key in changed})
+    logger.info(f"Reloaded config: {', '.join(sorted(changed))}")
+    for vault in watched:
+        vault_changed = changed - set(vault.config.get("vault_overrides", ()))
+        if vault.config is not config:
+            vault.config.update({key: settings[key] for key in vault_changed})
+        if vault_changed:
+            vault.reconfigure(vault_changed, previous)
+
+def vault_routes(watched):
+    """Local API routes; a request picks its vault by name, defaulting to the first"""
+    by_name = {vault.name: vault.handler for vault in watched}
+    
+    def handler_for(name):
+        if not name:
+            return watched[0].handler
+        if name not in by_name:
+            raise ValueError(f"No vault named {name}")
+        return by_name[name]
+    
+    def vault_of(body):
+        return body.get("vault") if isinstance(body, dict) else None
+    
+    routes = {
+        "GET /query": lambda params: handler_for(params.get("vault")).graph.query(
+            params.get("relation"), params.get("name")
+        ),
+    }
+    if config["note_api"]:
+        routes["POST /notes"] = lambda body: handler_for(vault_of(body)).create_note(body)
+        routes["POST /notes/bulk"] = lambda body: {
+            "results": handler_for(vault_of(body)).create_notes(bulk_requests(body))
+        }
+    return routes
 
 def main():
     """Main function to start the ORBIT watchdog"""
-    orbit_handler = OrbitFileHandler()
-    event_handler = OrbitEventHandler(orbit_handler)
-    
-    observer = Observer()
-    observer.schedule(
-        event_handler, 
-        path=config["vault_path"], 
-        recursive=True
+    parser = argparse.ArgumentParser(description="ORBIT system watchdog")
+    parser.add_argument(
+        "--reconcile", action="store_true",
+        help="file the whole vault in one pass and exit instead of watching"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true",
+        help="with --reconcile, print the move plan as JSONL instead of moving files"
+    )
+    parser.add_argument(
+        "--poll", action="store_true",
+        help="detect changes by polling a stat snapshot instead of native file events"
+    )
+    parser.add_argument(
+        "--record", action="store_true",
+        help="record every file event to .orbit/events.log for replaying with orbit_bench.py replay"
     )
+    parser.add_argument(
+        "--vaults", metavar="FILE", default=config["vaults_file"],
+        help="YAML file listing the vaults to watch (default: VAULTS_FILE, else VAULT_PATH)"
+    )
+    parser.add_argument("--vault", metavar="NAME", help="only use the named vault of the vaults file")
+    subparsers = parser.add_subparsers(dest="command")
+    query = subparsers.add_parser(
+        "query", help="answer an orbit graph query, from the running watchdog if there is one"
+    )
+    query.add_argument("relation", choices=RELATIONS)
+    query.add_argument("name", nargs="?", help="orbit name of the note to ask about")
+    query.add_argument("--offline", action="store_true", help="always read the persisted index")
+    query.add_argument("--json", action="store_true", help="print the answer as JSON")
+    args = parser.parse_args()
+    if args.dry_run and not args.reconcile:
+        parser.error("--dry-run requires --reconcile")
+    try:
+        vaults = select_vaults(load_vaults(args.vaults), args.vault)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if args.command == "query":
+        return run_query(args, vaults[0])
+    
+    if args.reconcile:
+        for vault in vaults:
+            orbit_handler = OrbitFileHandler(vault, dry_run=args.dry_run)
+            orbit_handler.reconcile(dry_run=args.dry_run)
+            orbit_handler.store.close()
+            if orbit_handler.journal:
+                orbit_handler.journal.close()
+        return
+    
+    # One pool of workers shared fairly by every vault
+    pool = FairPool(config["worker_count"])
+    watched = [WatchedVault(vault, pool, args.record) for vault in vaults]
+    for vault in watched:
+        vault.start()
     
-    logger.info(f"Starting ORBIT watchdog for vault: {config['vault_path']}")
-    print(f"ORBIT watchdog started. Monitoring vault: {config['vault_path']}")
+    stats_server = None
+    if config["stats_port"]:
+        try:
+            stats_server = StatsServer(
+                [vault.handler.stats for vault in watched], config["stats_host"], config["stats_port"],
+                routes=vault_routes(watched)
+            )
+            logger.info(
+                f"Serving metrics on http://{config['stats_host']}:{config['stats_port']}/metrics"
+            )
+        except OSError as e:
+            logger.error(f"Could not start metrics endpoint: {str(e)}")
+    
+    # Native events for every vault come from one observer; polled vaults
+    # each get a poller of their own
+    observer = Observer()
+    pollers = []
+    for vault in watched:
+        if args.poll or vault.config["use_polling"]:
+            poller = SnapshotPoller(
+                vault.event_handler, vault.config["vault_path"],
+                vault.config["poll_min_interval"], vault.config["poll_max_interval"],
+                vault.config["poll_full_scan_every"],
+                ignore=[vault.event_handler.state_dir]
+            )
+            vault.handler.stats.collect("poller", poller.stats)
+            vault.poller = poller
+            vault.handler.moves.window = vault.echo_window()
+            pollers.append(poller)
+        else:
+            observer.schedule(
+                vault.event_handler, 
+                path=vault.config["vault_path"], 
+                recursive=True
+            )
+        logger.info(f"Starting ORBIT watchdog for vault: {vault.config['vault_path']}")
+        print(f"ORBIT watchdog started. Monitoring vault: {vault.config['vault_path']}")
     print("Press Ctrl+C to stop")
     
-    observer.start()
+    # Pick up edits to orbit_config.py without a restart
+    config_watcher = None
+    if config["config_reload"]:
+        config_watcher = ConfigWatcher(
+            orbit_config_file(), config, lambda settings: apply_config(settings, watched),
+            config["config_reload_interval"]
+        )
+        for vault in watched:
+            vault.handler.stats.collect("config", config_watcher.stats)
+    
+    pool.start()
+    if config_watcher:
+        config_watcher.start()
+    if stats_server:
+        stats_server.start()
+    observers = pollers + ([observer] if observer.emitters else [])
+    for running in observers:
+        running.start()
     try:
         while True:
             time.sleep(1)
     except KeyboardInterrupt:
         logger.info("ORBIT watchdog stopped by user")
         print("ORBIT watchdog stopped")
-        observer.stop()
+        for running in observers:
+            running.stop()
     
-    observer.join()
+    for running in observers:
+        running.join()
+    if config_watcher:
+        config_watcher.stop()
+    for vault in watched:
+        vault.stop_intake()
+    pool.stop()
+    if stats_server:
+        stats_server.stop()
+    for vault in watched:
+        vault.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file